@@ -1,19 +1,57 @@
+import click
 from flask import Flask
 from config import Config
-from extensions import db, migrate, ma, jwt
-from flasgger import Swagger
+from extensions import db, ma, jwt
+from .compression import init_compression
+from .datatransfer import init_data_transfer
+from .diagnostics import init_query_diagnostics
+from .partitions import init_partitions
+from .payloads import init_payloads
+from .ratelimit import init_rate_limiting
 
-def create_app():
+
+def _running_from_cli():
+    """
+    Vrai si l'application est créée par la commande `flask` (ex. `flask db upgrade`).
+    """
+    return click.get_current_context(silent=True) is not None
+
+
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
     from .auth import auth_bp
     app.register_blueprint(auth_bp, url_prefix='/auth')
     from .routes import api_bp
 
     app.register_blueprint(api_bp)
-    Swagger(app, template_file='Schemas/swagger.json')
+    from .stats import init_stats
+    init_stats(app)
+    from .batch import init_batch
+    init_batch(app)
+    from .events import init_events
+    init_events(app)
+    from .softdelete import init_soft_delete
+    init_soft_delete(app)
+    from .entitycache import init_entity_cache
+    init_entity_cache(app)
+    from .sharding import init_sharding
+    init_sharding(app)
+    if app.config['DOCS_ENABLED']:
+        from .utils import setup_swagger
+        setup_swagger(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_query_diagnostics(app)
+    init_data_transfer(app)
+    init_partitions(app)
+    if not app.config['STARTUP_OPTIMIZED'] or _running_from_cli():
+        from extensions import migrate
+        migrate.init_app(app, db)
     jwt.init_app(app)
     ma.init_app(app)
-    return app
\ No newline at end of file
+    init_rate_limiting(app)
+    init_compression(app)
+    init_payloads(app)
+    return app
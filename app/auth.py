@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, jsonify
 from extensions import db
 from .models import User
-from .schemas import UserSchema
+from .schemas import user_loader, user_dumper
+from .authorization import role_claims
+from .payloads import json_body, load_payload
+from .sharding import IdentityTaken, release_identities, reserve_identities
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, create_refresh_token
 from flask_jwt_extended import jwt_required, unset_jwt_cookies, get_jwt_identity
@@ -13,24 +16,38 @@ def register():
     """
     Enregistrement d'un nouvel utilisateur.
     """
-    data = request.get_json()
-    user_schema = UserSchema()
+    data = load_payload(user_loader, json_body())
 
-    # Vérifier si l'utilisateur existe déjà
-    if User.query.filter_by(email=data['email']).first():
+    # Vérifier si l'utilisateur existe déjà (y compris supprimé logiquement :
+    # la contrainte d'unicité porte sur toutes les lignes)
+    existing = User.query.execution_options(include_deleted=True)
+    if existing.filter_by(email=data['email']).first():
         return jsonify({"msg": "Email déjà utilisé"}), 400
+    if existing.filter_by(username=data['username']).first():
+        return jsonify({"msg": "Nom d'utilisateur déjà utilisé"}), 400
 
-    user = user_schema.load(data, session=db.session)
     new_user = User(
-        username=user.username,
-        email=user.email,
-        password=generate_password_hash(user.password)
+        username=data['username'],
+        email=data['email'],
+        password=generate_password_hash(data['password'])
     )
 
     db.session.add(new_user)
-    db.session.commit()
+    db.session.flush()
+    body = user_dumper.dump(new_user)
+    # Avec SHARD_URIS, l'unicité est garantie par user_identity sur la base principale
+    try:
+        claimed = reserve_identities(new_user.id, data)
+    except IdentityTaken:
+        db.session.rollback()
+        raise
+    try:
+        db.session.commit()
+    except Exception:
+        release_identities(claimed)
+        raise
 
-    return jsonify(user_schema.dump(new_user)), 201
+    return jsonify(body), 201
 
 
 @auth_bp.route('/login', methods=['POST'])
@@ -38,12 +55,13 @@ def login():
     """
     Authentifie un utilisateur et retourne les tokens JWT
     """
-    data = request.get_json()
-    user = User.query.filter_by(email=data['email']).first()
+    data = json_body()
+    user = User.query.filter_by(email=data.get('email')).first()
 
-    if user and check_password_hash(user.password, data['password']):
-        access_token = create_access_token(identity={'email': user.email})
-        refresh_token = create_refresh_token(identity={'email': user.email})
+    if user and check_password_hash(user.password, data.get('password', '')):
+        # Le rôle est embarqué dans le token : aucune lecture en base pour l'autorisation
+        access_token = create_access_token(identity=user.id, additional_claims=role_claims(user))
+        refresh_token = create_refresh_token(identity=user.id, additional_claims=role_claims(user))
         return jsonify({
             'access_token': access_token,
             'refresh_token': refresh_token
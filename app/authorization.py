@@ -0,0 +1,79 @@
+from flask import abort
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import select, true
+from extensions import db
+from .concurrency import forbidden
+from .models import User, Post, Comment
+
+ADMIN_ROLE = 'admin'
+DEFAULT_ROLE = 'user'
+
+# Colonne désignant le propriétaire de chaque ressource protégée
+OWNER_COLUMNS = {
+    User: User.id,
+    Post: Post.user_id,
+    Comment: Comment.user_id,
+}
+
+
+def role_claims(user):
+    """
+    Revendications ajoutées au JWT à la connexion : le rôle voyage avec le
+    token et n'est jamais relu en base pendant une requête.
+    """
+    return {'role': user.role or DEFAULT_ROLE}
+
+
+def current_user_id():
+    identity = get_jwt_identity()
+    if isinstance(identity, int) or (isinstance(identity, str) and identity.isdigit()):
+        return int(identity)
+    return None
+
+
+def current_role():
+    return get_jwt().get('role', DEFAULT_ROLE)
+
+
+def is_admin():
+    return current_role() == ADMIN_ROLE
+
+
+def owner_filter(model):
+    """
+    Condition SQL « la ligne appartient à l'utilisateur courant »,
+    toujours vraie pour un administrateur.
+    """
+    if is_admin():
+        return true()
+    return OWNER_COLUMNS[model] == current_user_id()
+
+
+def get_owned_or_404(model, id):
+    """
+    Charge une ligne et vérifie son propriétaire dans la même requête :
+    SELECT ..., user_id = :courant AS owned FROM ... WHERE id = :id
+    (404 si elle n'existe pas, 403 si elle appartient à un autre utilisateur).
+    """
+    statement = select(model, owner_filter(model).label('owned')).where(model.id == id)
+    row = db.session.execute(statement).first()
+    if row is None:
+        abort(404)
+    if not row.owned:
+        abort(forbidden())
+    return row[0]
+
+
+def check_author(data, field='user_id'):
+    """
+    Un utilisateur ne peut écrire qu'en son nom (l'administrateur au nom de tous).
+    """
+    if isinstance(data, dict) and field in data and not is_admin() and data[field] != current_user_id():
+        abort(forbidden())
+
+
+def check_role_change(data):
+    # Seul un administrateur attribue des rôles
+    if isinstance(data, dict) and 'role' in data and not is_admin():
+        abort(forbidden())
+
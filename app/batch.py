@@ -0,0 +1,187 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy.orm import Session
+from werkzeug.exceptions import HTTPException
+from extensions import db
+from .entitycache import invalidate_pending
+from .events import publish_pending
+
+batch_bp = Blueprint('batch', __name__)
+
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+READ_METHODS = ('GET', 'HEAD')
+# En-têtes des sous-réponses renvoyés au client
+FORWARDED_HEADERS = ('ETag', 'Location', 'Retry-After', 'X-RateLimit-Remaining')
+# Routes dont la réponse est un flux sans fin : elles bloqueraient le lot
+STREAMED_ENDPOINTS = ('events.stream_events',)
+
+
+def _bad_request(msg):
+    return jsonify({"msg": msg}), 400
+
+
+def _validate(subrequests, max_requests):
+    if not isinstance(subrequests, list) or not subrequests:
+        return "requests doit être une liste non vide"
+    if len(subrequests) > max_requests:
+        return f"Au plus {max_requests} sous-requêtes par lot"
+    for index, sub in enumerate(subrequests):
+        if not isinstance(sub, dict) or not isinstance(sub.get('path'), str) or not sub['path'].startswith('/'):
+            return f"Sous-requête {index} : chemin (path) commençant par / requis"
+        method = sub.get('method', 'GET')
+        if not isinstance(method, str) or method.upper() not in METHODS:
+            return f"Sous-requête {index} : méthode non supportée : {method}"
+        headers = sub.get('headers', {})
+        if not isinstance(headers, dict) or not all(isinstance(key, str) and isinstance(value, str)
+                                                    for key, value in headers.items()):
+            return f"Sous-requête {index} : headers doit être un objet de chaînes"
+        if sub['path'].split('?')[0].rstrip('/') == request.path.rstrip('/'):
+            return f"Sous-requête {index} : les lots imbriqués ne sont pas autorisés"
+        if _endpoint(sub) in STREAMED_ENDPOINTS:
+            return f"Sous-requête {index} : réponse en flux non disponible dans un lot : {sub['path']}"
+    return None
+
+
+def _endpoint(sub):
+    # Route visée par une sous-requête (None si aucune : elle répondra 404 ou 405)
+    adapter = current_app.url_map.bind_to_environ(request.environ)
+    try:
+        endpoint, _ = adapter.match(sub['path'].split('?')[0], method=sub.get('method', 'GET').upper())
+    except HTTPException:
+        return None
+    return endpoint
+
+
+def dispatch(app, sub, headers, environ_base):
+    """
+    Exécute une sous-requête dans l'application, sans passer par le réseau :
+    mêmes hooks (authentification, limitation de débit) qu'une requête HTTP.
+    """
+    method = sub.get('method', 'GET').upper()
+    with app.test_request_context(sub['path'], method=method, json=sub.get('body'),
+                                  headers={**headers, **sub.get('headers', {})},
+                                  environ_base=environ_base):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            # Pas de handle_exception : il relance l'erreur sous TESTING / PROPAGATE_EXCEPTIONS
+            # et ferait échouer tout le lot au lieu de cette seule sous-requête
+            app.logger.exception("Erreur dans la sous-requête %s %s", method, sub['path'])
+            response = jsonify({"msg": "Erreur interne du serveur"})
+            response.status_code = 500
+        if response.mimetype == 'text/event-stream':
+            # Filet de sécurité pour un flux non listé dans STREAMED_ENDPOINTS : il n'est pas consommé
+            response.close()
+            response = jsonify({"msg": "Réponse en flux non disponible dans un lot"})
+            response.status_code = 400
+
+    return {
+        'status': response.status_code,
+        'headers': {name: response.headers[name] for name in FORWARDED_HEADERS if name in response.headers},
+        'body': response.get_json(silent=True) if response.is_json else response.get_data(as_text=True) or None,
+    }
+
+
+def _isolated(app, sub, headers, environ_base):
+    # Nouveau contexte d'application : g et session SQLAlchemy propres à la sous-requête
+    with app.app_context():
+        return dispatch(app, sub, headers, environ_base)
+
+
+def run_independent(app, subrequests, headers, environ_base):
+    """
+    Les lectures consécutives s'exécutent en parallèle ; chaque écriture
+    attend les lectures qui la précèdent et s'exécute seule, dans l'ordre.
+    Un lot n'occupe jamais plus de BATCH_MAX_PARALLEL threads du pool partagé :
+    les autres lots continuent d'avancer.
+    """
+    executor = app.extensions['batch_executor']
+    slots = threading.BoundedSemaphore(app.config['BATCH_MAX_PARALLEL'])
+    results, reads = [None] * len(subrequests), []
+
+    def submit(i):
+        slots.acquire()
+        future = executor.submit(_isolated, app, subrequests[i], headers, environ_base)
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def flush_reads():
+        futures = [(i, submit(i)) for i in reads]
+        for i, future in futures:
+            results[i] = future.result()
+        reads.clear()
+
+    for i, sub in enumerate(subrequests):
+        if sub.get('method', 'GET').upper() in READ_METHODS:
+            reads.append(i)
+        else:
+            flush_reads()
+            results[i] = _isolated(app, sub, headers, environ_base)
+    flush_reads()
+    return results
+
+
+def run_transaction(app, subrequests, headers, environ_base):
+    """
+    Toutes les sous-requêtes partagent une transaction : les commit des routes
+    ne sont pas propagés, et la première erreur annule l'ensemble.
+    """
+    results = []
+    with app.app_context():
+        connection = db.engine.connect()
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode='rollback_only', info={'outer_transaction': True})
+        db.session.registry.set(session)
+        try:
+            for sub in subrequests:
+                result = dispatch(app, sub, headers, environ_base)
+                results.append(result)
+                if result['status'] >= 400:
+                    break
+            committed = len(results) == len(subrequests) and transaction.is_active
+            if committed:
+                transaction.commit()
+                publish_pending(session)
+                invalidate_pending(session)
+            elif transaction.is_active:
+                # Une route a pu déjà annuler la transaction (db.session.rollback())
+                transaction.rollback()
+        finally:
+            db.session.remove()
+            connection.close()
+
+    skipped = {'status': 424, 'headers': {}, 'body': {"msg": "Non exécutée : le lot a été annulé"}}
+    return results + [skipped] * (len(subrequests) - len(results)), committed
+
+
+@batch_bp.route('', methods=['POST'])
+def batch():
+    """
+    Exécute plusieurs appels d'API en un seul aller-retour HTTP.
+    Corps : {"requests": [{"method", "path", "body", "headers"}], "transaction": false}
+    """
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get('requests')
+    error = _validate(subrequests, current_app.config['BATCH_MAX_REQUESTS'])
+    if error:
+        return _bad_request(error)
+
+    app = current_app._get_current_object()
+    headers = {'Authorization': request.headers['Authorization']} if 'Authorization' in request.headers else {}
+    environ_base = {'REMOTE_ADDR': request.remote_addr}
+
+    if data.get('transaction'):
+        if 'shards' in current_app.extensions:
+            # Une transaction ne couvre qu'une base : pas d'atomicité entre shards
+            return _bad_request("Lots transactionnels indisponibles avec des données réparties (SHARD_URIS)")
+        responses, committed = run_transaction(app, subrequests, headers, environ_base)
+        return jsonify({'responses': responses, 'committed': committed})
+    return jsonify({'responses': run_independent(app, subrequests, headers, environ_base)})
+
+
+def init_batch(app):
+    app.extensions['batch_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['BATCH_MAX_WORKERS'], thread_name_prefix='batch')
+    app.register_blueprint(batch_bp, url_prefix='/batch')
@@ -0,0 +1,195 @@
+import gzip
+import hashlib
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : on se contente de gzip
+    brotli = None
+
+
+def _supported_encodings():
+    """
+    Encodages proposés au client, par ordre de préférence du serveur.
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding(accept_encodings):
+    """
+    Négocie l'encodage à partir de l'en-tête Accept-Encoding du client.
+    """
+    return accept_encodings.best_match(_supported_encodings())
+
+
+def coded_etag(etag, encoding):
+    """
+    Validateur d'une représentation encodée : chaque codage a le sien (RFC 9110).
+    """
+    return etag if encoding is None else f"{etag}-{encoding}"
+
+
+def decoded_etag(etag):
+    """
+    Validateur de la ressource, sans le suffixe d'encodage de coded_etag.
+    """
+    for encoding in ('br', 'gzip'):
+        if etag.endswith(f"-{encoding}"):
+            return etag[:-len(encoding) - 1]
+    return etag
+
+
+def compress_bytes(data, encoding, config):
+    """
+    Compresse un corps de réponse complet.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['COMPRESS_BR_LEVEL'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+
+def _stream_compress(chunks, encoding, config):
+    """
+    Compresse une réponse streamée morceau par morceau, sans la mettre en mémoire.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['COMPRESS_BR_LEVEL'])
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(config['COMPRESS_LEVEL'], zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def _is_compressible(response, config):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return False
+    return response.mimetype in config['COMPRESS_MIMETYPES']
+
+
+def _add_vary(response):
+    if 'Accept-Encoding' not in response.vary:
+        response.vary.add('Accept-Encoding')
+
+
+def compress_response(response):
+    """
+    Compresse la réponse (gzip ou brotli) si le client l'accepte
+    et si elle dépasse le seuil COMPRESS_MIN_SIZE.
+    """
+    config = current_app.config
+    if not _is_compressible(response, config):
+        return response
+
+    _add_vary(response)
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _stream_compress(response.response, encoding, config)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(compress_bytes(data, encoding, config))
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag is not None:
+        response.set_etag(coded_etag(etag, encoding), weak)
+    return response
+
+
+class PrecompressedAsset:
+    """
+    Réponse statique compressée une seule fois dans chaque encodage.
+    """
+
+    def __init__(self, body, mimetype, config):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.variants = {None: body}
+        for encoding in _supported_encodings():
+            self.variants[encoding] = compress_bytes(body, encoding, config)
+
+    def make_response(self):
+        encoding = choose_encoding(request.accept_encodings)
+        response = current_app.response_class(self.variants[encoding], mimetype=self.mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        _add_vary(response)
+        response.set_etag(coded_etag(self.etag, encoding))
+        return response.make_conditional(request)
+
+
+def _build_asset(app, endpoint, view_args=None):
+    # Appel direct de la vue : pas de hooks, et l'application reste configurable
+    response = app.make_response(app.view_functions[endpoint](**(view_args or {})))
+    if response.status_code != 200:
+        return None
+    return PrecompressedAsset(response.get_data(), response.mimetype, app.config)
+
+
+def serve_precompressed():
+    """
+    Sert directement les ressources statiques précompressées.
+    En mode STARTUP_OPTIMIZED, elles sont générées au premier accès.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    app = current_app._get_current_object()
+    if request.endpoint not in app.config['COMPRESS_PRECOMPRESS_ENDPOINTS']:
+        return None
+    assets = app.extensions['compression']
+    asset = assets.get(request.endpoint)
+    if asset is None:
+        asset = _build_asset(app, request.endpoint, request.view_args)
+        if asset is None:
+            return None
+        assets[request.endpoint] = asset
+    return asset.make_response()
+
+
+def precompress_assets(app, endpoints=None):
+    """
+    Génère et compresse une fois les réponses statiques (spec Swagger, page d'accueil).
+    """
+    assets = app.extensions['compression']
+    endpoints = app.config['COMPRESS_PRECOMPRESS_ENDPOINTS'] if endpoints is None else endpoints
+    rules = {rule.endpoint: rule for rule in app.url_map.iter_rules() if not rule.arguments}
+
+    for endpoint in endpoints:
+        rule = rules.get(endpoint)
+        if rule is None:
+            continue
+        with app.test_request_context(rule.rule):
+            asset = _build_asset(app, endpoint)
+        if asset is not None:
+            assets[endpoint] = asset
+
+
+def init_compression(app):
+    """
+    Active la compression négociée des réponses.
+    """
+    app.extensions['compression'] = {}
+    if not app.config['COMPRESS_ENABLED']:
+        return
+    app.before_request(serve_precompressed)
+    app.after_request(compress_response)
+    if not app.config['STARTUP_OPTIMIZED']:
+        precompress_assets(app)
@@ -0,0 +1,97 @@
+from flask import abort, jsonify, request
+from sqlalchemy import select, true, update
+from extensions import db
+from .compression import decoded_etag
+from .payloads import json_body, load_payload
+
+
+def _error(msg, status):
+    response = jsonify({"msg": msg})
+    response.status_code = status
+    return response
+
+
+def precondition_failed():
+    return _error("La ressource a été modifiée entre-temps, rechargez-la", 412)
+
+
+def forbidden():
+    return _error("Action non autorisée", 403)
+
+
+def versioned_response(data, version, status=200):
+    """
+    Réponse JSON portant la version de la ressource dans l'en-tête ETag.
+    """
+    response = jsonify(data)
+    response.status_code = status
+    response.set_etag(str(version))
+    return response
+
+
+def _if_match_tags():
+    # Versions citées par If-Match, qu'elles viennent d'une réponse compressée ou non
+    return {decoded_etag(tag) for tag in request.if_match.as_set()}
+
+
+def check_if_match(instance):
+    """
+    Compare l'en-tête If-Match à la version chargée (412 si elle diffère).
+    Sans If-Match, la mise à jour reste acceptée : le contrôle de
+    version_id_col au commit protège tout de même contre les écritures perdues.
+    """
+    if request.if_match and not request.if_match.star_tag and str(instance.version) not in _if_match_tags():
+        abort(precondition_failed())
+
+
+def if_match_version():
+    """
+    Version attendue par le client, lue dans If-Match (obligatoire : 428 sinon).
+    """
+    if not request.if_match or request.if_match.star_tag:
+        abort(_error("En-tête If-Match requis", 428))
+    tags = _if_match_tags()
+    if len(tags) != 1 or not next(iter(tags)).isdigit():
+        abort(precondition_failed())
+    return int(next(iter(tags)))
+
+
+def versioned_update(model, schema, id, prepare=None, owned=None):
+    """
+    Mise à jour partielle en un seul aller-retour :
+    UPDATE ... SET ..., version = version + 1 WHERE id = ? AND version = ? RETURNING *
+    sans charger la ligne au préalable. `owned` (condition SQL de propriété)
+    s'ajoute au WHERE : l'autorisation ne coûte aucune requête de plus.
+    `schema` est un chargeur partiel sans instance (voir app.schemas) : les
+    valeurs écrites sont celles qu'il désérialise, jamais le JSON brut.
+    """
+    version = if_match_version()
+    data = load_payload(schema, json_body())
+
+    table = model.__table__
+    values = {key: value for key, value in data.items()
+              if key in table.c and key not in ('id', 'version')}
+    if prepare is not None:
+        values = prepare(values)
+
+    owned = true() if owned is None else owned
+    # Requête Core : le critère global des suppressions logiques ne s'applique pas
+    active = table.c.deleted_at.is_(None) if 'deleted_at' in table.c else true()
+    statement = (
+        update(table)
+        .where(table.c.id == id, table.c.version == version, active, owned)
+        .values(**values, version=table.c.version + 1)
+        .returning(*table.c)
+    )
+    row = db.session.execute(statement).first()
+    if row is None:
+        db.session.rollback()
+        # Chemin d'échec uniquement : distinguer ressource absente, interdite et version périmée
+        current = db.session.execute(select(owned.label('owned')).select_from(table).where(table.c.id == id, active)).first()
+        if current is None:
+            abort(404)
+        if not current.owned:
+            return forbidden()
+        return precondition_failed()
+    db.session.commit()
+    return versioned_response(schema.dump(row), row.version)
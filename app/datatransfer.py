@@ -0,0 +1,360 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from heapq import merge
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import DateTime, Integer, column, delete, func, insert, select, text
+from sqlalchemy import table as table_clause
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from .sharding import SHARDED_TABLES
+
+data_cli = AppGroup('data', help="Export et import en masse des tables.")
+
+DEFAULT_TABLES = ('user', 'category', 'post', 'comment')
+FORMATS = ('ndjson', 'csv')
+EXPORT_STATE = '_export.json'
+IMPORT_STATE = '_import.json'
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_state(path, state):
+    # Écriture atomique : un état n'est jamais à moitié écrit
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def get_tables(names):
+    tables = []
+    for name in names:
+        if name not in db.metadata.tables:
+            raise click.ClickException(f"Table inconnue : {name}")
+        tables.append(db.metadata.tables[name])
+    return tables
+
+
+def dependency_levels(tables):
+    """
+    Regroupe les tables par niveau de clés étrangères : une table n'est
+    importée qu'après toutes les tables qu'elle référence.
+    """
+    names = {table.name for table in tables}
+    levels, placed = [], set()
+    remaining = list(tables)
+    while remaining:
+        level = [table for table in remaining
+                 if all(fk.column.table.name in placed or fk.column.table.name not in names
+                        or fk.column.table is table
+                        for fk in table.foreign_keys)]
+        if not level:
+            raise click.ClickException("Dépendances circulaires entre les tables")
+        levels.append(level)
+        placed.update(table.name for table in level)
+        remaining = [table for table in remaining if table not in level]
+    return levels
+
+
+def _engines(table):
+    """
+    Moteurs qui portent `table` : la base principale, ou chaque shard
+    (SHARD_URIS) pour les tables réparties.
+    """
+    router = current_app.extensions.get('shards')
+    if router is None or table.name not in SHARDED_TABLES:
+        return {None: db.engine}
+    return {shard_id: router.engine(shard_id) for shard_id in router.shard_ids}
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value, from_csv):
+    if value is None:
+        return None
+    if from_csv and value == '':
+        # En CSV, NULL et chaîne vide ne se distinguent pas
+        return None if column.nullable else ''
+    if isinstance(column.type, DateTime):
+        return datetime.datetime.fromisoformat(value)
+    if from_csv and isinstance(column.type, Integer):
+        return int(value)
+    return value
+
+
+def _write_part(path, fmt, columns, rows):
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows([_encode_value(value) for value in row] for row in rows)
+        else:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, map(_encode_value, row)))) + '\n')
+    os.replace(tmp, path)
+
+
+def _read_part(path, fmt, table):
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            records = csv.DictReader(f)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        return [{name: _decode_value(table.c[name], value, fmt == 'csv') for name, value in record.items()}
+                for record in records]
+
+
+@contextmanager
+def shared_snapshot():
+    """
+    Sous PostgreSQL, ouvre une transaction REPEATABLE READ et exporte son
+    instantané (pg_export_snapshot) : les exports parallèles l'adoptent et
+    lisent tous les tables au même instant. La transaction reste ouverte
+    tant que le bloc s'exécute. Ailleurs, produit None.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        yield None
+        return
+    with db.engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn:
+        with conn.begin():
+            yield conn.execute(text('SELECT pg_export_snapshot()')).scalar()
+
+
+def export_table(table, directory, fmt, chunk_size, snapshot=None):
+    """
+    Exporte une table par morceaux de `chunk_size` lignes (pagination par clé,
+    mémoire constante). Chaque morceau est un fichier gzip écrit de façon
+    atomique, et l'état permet de reprendre après une interruption.
+    Tous les morceaux sont lus dans une même transaction REPEATABLE READ,
+    sur l'instantané `snapshot` s'il est fourni (voir shared_snapshot).
+    Une table répartie est lue sur tous les shards (une transaction par
+    shard, fusion par identifiant) : la cohérence est garantie shard par
+    shard, pas entre shards ni avec les tables de la base principale.
+    """
+    table_dir = os.path.join(directory, table.name)
+    os.makedirs(table_dir, exist_ok=True)
+    state_path = os.path.join(table_dir, EXPORT_STATE)
+    columns = [column.name for column in table.c]
+    state = _load_state(state_path) or {
+        'table': table.name, 'format': fmt, 'columns': columns,
+        'parts': [], 'last_id': None, 'rows': 0, 'done': False,
+    }
+    if state['format'] != fmt or state['columns'] != columns:
+        raise click.ClickException(f"{table_dir} contient un export incompatible")
+    if state['done']:
+        return state
+
+    pk = table.c.id
+    engines = _engines(table)
+    with ExitStack() as stack:
+        connections = []
+        for engine in engines.values():
+            options = {'isolation_level': 'REPEATABLE READ'} if engine.dialect.name == 'postgresql' else {}
+            conn = stack.enter_context(engine.connect().execution_options(**options))
+            stack.enter_context(conn.begin())
+            if snapshot is not None and None in engines:
+                # Identifiant produit par le serveur (hexadécimal et tirets) : doit être la première instruction
+                conn.execute(text(f"SET TRANSACTION SNAPSHOT '{snapshot}'"))
+            connections.append(conn)
+        while True:
+            statement = select(table).order_by(pk).limit(chunk_size)
+            if state['last_id'] is not None:
+                statement = statement.where(pk > state['last_id'])
+            # Les `chunk_size` plus petits identifiants, tous shards confondus
+            rows = list(merge(*(conn.execute(statement).all() for conn in connections),
+                              key=lambda row: row.id))[:chunk_size]
+            if not rows:
+                break
+            name = f"part-{len(state['parts']) + 1:05d}.{fmt}.gz"
+            _write_part(os.path.join(table_dir, name), fmt, columns, rows)
+            state['parts'].append({'file': name, 'first_id': rows[0].id, 'last_id': rows[-1].id, 'rows': len(rows)})
+            state['last_id'] = rows[-1].id
+            state['rows'] += len(rows)
+            _save_state(state_path, state)
+
+    state['done'] = True
+    _save_state(state_path, state)
+    return state
+
+
+def _copy_text(value):
+    # Format texte de COPY : \N pour NULL, échappement des séparateurs
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(' ')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy_rows(conn, table, rows):
+    """
+    Charge les lignes via COPY ... FROM STDIN (psycopg2 copy_expert).
+    """
+    preparer = conn.dialect.identifier_preparer
+    columns = [column.name for column in table.c]
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_text(row[name]) for name in columns) + '\n')
+    buffer.seek(0)
+    sql = (f"COPY {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+           f"FROM STDIN WITH (FORMAT text)")
+    conn.connection.cursor().copy_expert(sql, buffer)
+
+
+def _reset_sequence(conn, table):
+    name = conn.dialect.identifier_preparer.format_table(table)
+    conn.execute(text(f"SELECT setval(pg_get_serial_sequence(:table, 'id'), "
+                      f"COALESCE((SELECT MAX(id) FROM {name}), 1))"), {'table': name})
+
+
+def _upsert(conn, table, rows):
+    """
+    Insère les lignes d'un morceau, en remplaçant celles dont l'identifiant
+    existe déjà (import rejoué). Les lignes de la table absentes du morceau
+    ne sont jamais touchées.
+    """
+    columns = [column.name for column in table.c if column.name != 'id']
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        # COPY vers une table temporaire, puis INSERT ... ON CONFLICT depuis celle-ci
+        preparer = conn.dialect.identifier_preparer
+        staging = table_clause(f'_import_{table.name}', *[column(c.name) for c in table.c])
+        conn.execute(text(f"CREATE TEMPORARY TABLE {preparer.format_table(staging)} "
+                          f"(LIKE {preparer.format_table(table)}) ON COMMIT DROP"))
+        _copy_rows(conn, staging, rows)
+        statement = postgresql.insert(table).from_select([c.name for c in table.c], select(staging))
+        # Contrainte nommée plutôt que (id) : la clé de comment partitionnée inclut date_commented
+        conn.execute(statement.on_conflict_do_update(
+            constraint=f'{table.name}_pkey', set_={name: statement.excluded[name] for name in columns}))
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(table)
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.id], set_={name: statement.excluded[name] for name in columns}), rows)
+    else:
+        conn.execute(delete(table).where(table.c.id.in_([row['id'] for row in rows])))
+        conn.execute(insert(table), rows)
+
+
+def import_table(table, directory, restart=False):
+    """
+    Importe les morceaux exportés d'une table, un morceau par transaction.
+    Chaque morceau est inséré en remplaçant les identifiants déjà présents :
+    le rejouer après une interruption ne crée pas de doublons, et les lignes
+    préexistantes hors de l'export restent en place.
+    Les lignes d'une table répartie vont au shard de leur identifiant (une
+    transaction par shard et par morceau) ; la séquence de la table est
+    ensuite avancée au-delà des identifiants importés.
+    """
+    table_dir = os.path.join(directory, table.name)
+    export_state = _load_state(os.path.join(table_dir, EXPORT_STATE))
+    if export_state is None or not export_state['done']:
+        raise click.ClickException(f"Export incomplet ou absent pour {table.name}")
+
+    progress_path = os.path.join(table_dir, IMPORT_STATE)
+    progress = None if restart else _load_state(progress_path)
+    imported = set(progress['parts']) if progress else set()
+
+    router = current_app.extensions.get('shards')
+    engines = _engines(table)
+    max_id = 0
+    with ExitStack() as stack:
+        connections = {key: stack.enter_context(engine.connect()) for key, engine in engines.items()}
+        for part in export_state['parts']:
+            if part['file'] in imported:
+                continue
+            rows = _read_part(os.path.join(table_dir, part['file']), export_state['format'], table)
+            by_shard = {}
+            for row in rows:
+                by_shard.setdefault(None if None in engines else router.shard_for_id(row['id']), []).append(row)
+            for key, shard_rows in by_shard.items():
+                with connections[key].begin():
+                    _upsert(connections[key], table, shard_rows)
+            imported.add(part['file'])
+            _save_state(progress_path, {'parts': sorted(imported)})
+        if None not in engines:
+            max_id = max((conn.execute(select(func.max(table.c.id))).scalar() or 0
+                          for conn in connections.values()), default=0)
+        elif db.engine.dialect.name == 'postgresql':
+            with connections[None].begin():
+                _reset_sequence(connections[None], table)
+    if max_id:
+        router.advance_sequence(table.name, max_id)
+    return export_state['rows']
+
+
+def run_by_level(app, func, levels, jobs):
+    """
+    Exécute `func(table)` en parallèle pour les tables d'un même niveau,
+    niveau après niveau ; chaque tâche a son contexte et sa connexion.
+    """
+    def task(table):
+        with app.app_context():
+            return table.name, func(table)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for level in levels:
+            results.update(executor.map(task, level))
+    return results
+
+
+@data_cli.command('export')
+@click.argument('directory', type=click.Path(file_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default='ndjson', show_default=True)
+@click.option('--tables', default=','.join(DEFAULT_TABLES), show_default=True)
+@click.option('--chunk-size', default=5000, show_default=True)
+@click.option('--jobs', default=4, show_default=True, help="Tables exportées en parallèle.")
+def export_command(directory, fmt, tables, chunk_size, jobs):
+    """
+    Exporte les tables en NDJSON ou CSV compressés (reprend un export interrompu).
+    """
+    app = current_app._get_current_object()
+    os.makedirs(directory, exist_ok=True)
+    tables = get_tables(tables.split(','))
+    with shared_snapshot() as snapshot:
+        results = run_by_level(app, lambda t: export_table(t, directory, fmt, chunk_size, snapshot),
+                               [tables], jobs)
+    for name, state in results.items():
+        click.echo(f"{name} : {state['rows']} lignes, {len(state['parts'])} fichiers")
+
+
+@data_cli.command('import')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--tables', default=','.join(DEFAULT_TABLES), show_default=True)
+@click.option('--jobs', default=4, show_default=True, help="Tables importées en parallèle (par niveau de FK).")
+@click.option('--restart', is_flag=True, help="Ignore l'état d'un import précédent.")
+def import_command(directory, tables, jobs, restart):
+    """
+    Importe un export : COPY sous PostgreSQL, executemany par lots sinon.
+    """
+    app = current_app._get_current_object()
+    if db.engine.dialect.name == 'sqlite':
+        jobs = 1  # SQLite n'accepte qu'un écrivain à la fois
+    levels = dependency_levels(get_tables(tables.split(',')))
+    results = run_by_level(app, lambda t: import_table(t, directory, restart), levels, jobs)
+    for name, rows in results.items():
+        click.echo(f"{name} : {rows} lignes importées")
+
+
+def init_data_transfer(app):
+    app.cli.add_command(data_cli)
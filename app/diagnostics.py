@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+
+import click
+from flask import current_app, has_request_context, request
+from flask.cli import AppGroup
+from sqlalchemy import event
+from extensions import db
+
+logger = logging.getLogger('app.slow_queries')
+
+queries_cli = AppGroup('queries', help="Diagnostic des requêtes SQL lentes.")
+
+# Journal NDJSON dans le dossier instance si SLOW_QUERY_LOG_FILE n'est pas défini
+DEFAULT_LOG_FILE = 'slow_queries.ndjson'
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+# `::type` (conversion PostgreSQL) n'est pas un paramètre nommé
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+# Modules qui exécutent les requêtes pour le compte des routes
+_SKIPPED_FILES = {__file__, os.path.join(os.path.dirname(__file__), 'sharding.py')}
+
+
+def normalize_statement(statement):
+    """
+    Forme normalisée d'une requête : littéraux et paramètres remplacés par ?,
+    listes IN (?, ?, ...) repliées, espaces compactés.
+    """
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER.sub('?', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    statement = _IN_LIST.sub('(?+)', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+def fingerprint(statement):
+    return hashlib.sha1(normalize_statement(statement).encode('utf-8')).hexdigest()[:12]
+
+
+def redact_parameters(parameters):
+    """
+    Remplace chaque valeur par son type (et sa longueur pour les chaînes).
+    """
+    def redact(value):
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes)):
+            return f'<{type(value).__name__}:{len(value)}>'
+        return f'<{type(value).__name__}>'
+
+    if isinstance(parameters, dict):
+        return {key: redact(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(p) if isinstance(p, (dict, list, tuple)) else redact(p) for p in parameters]
+    return redact(parameters)
+
+
+def _call_site(root_path):
+    # Première frame du code applicatif (hors de ce module et du routage des shards) qui a déclenché la requête
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(root_path) and frame.filename not in _SKIPPED_FILES:
+            return f'{os.path.relpath(frame.filename, root_path)}:{frame.lineno} ({frame.name})'
+    return None
+
+
+class SlowQueryLog:
+    """
+    Agrège les requêtes lentes par empreinte de requête normalisée.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            entry = self.entries.get(record['fingerprint'])
+            if entry is None:
+                entry = self.entries[record['fingerprint']] = {
+                    'fingerprint': record['fingerprint'],
+                    'statement': normalize_statement(record['statement']),
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'endpoints': set(),
+                    'call_sites': set(),
+                    'plan': None,
+                }
+            entry['count'] += 1
+            entry['total_ms'] += record['duration_ms']
+            entry['max_ms'] = max(entry['max_ms'], record['duration_ms'])
+            if record.get('endpoint'):
+                entry['endpoints'].add(record['endpoint'])
+            if record.get('call_site'):
+                entry['call_sites'].add(record['call_site'])
+            if record.get('plan'):
+                entry['plan'] = record['plan']
+
+    def has_plan(self, key):
+        entry = self.entries.get(key)
+        return entry is not None and entry['plan'] is not None
+
+    def report(self, sort='total_ms', limit=None):
+        entries = sorted(self.entries.values(), key=lambda e: e[sort], reverse=True)
+        return entries[:limit] if limit else entries
+
+    @classmethod
+    def from_file(cls, path):
+        log = cls()
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    log.add(json.loads(line))
+        return log
+
+
+class QueryDiagnostics:
+    """
+    Chronomètre chaque requête SQL via les événements du moteur et consigne
+    celles qui dépassent SLOW_QUERY_THRESHOLD_MS.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.root_path = app.root_path
+        self.threshold = config['SLOW_QUERY_THRESHOLD_MS']
+        self.log_file = config['SLOW_QUERY_LOG_FILE']
+        self.redact = config['SLOW_QUERY_REDACT_PARAMS']
+        self.explain_rate = config['SLOW_QUERY_EXPLAIN_SAMPLE_RATE']
+        self.explain_analyze = config['SLOW_QUERY_EXPLAIN_ANALYZE']
+        self.log = SlowQueryLog()
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info['query_start'].pop()) * 1000
+        if duration_ms < self.threshold:
+            return
+
+        record = {
+            'fingerprint': fingerprint(statement),
+            'statement': statement,
+            'duration_ms': round(duration_ms, 3),
+            'parameters': redact_parameters(parameters) if self.redact else parameters,
+            'endpoint': request.endpoint if has_request_context() else None,
+            'call_site': _call_site(self.root_path),
+            'plan': None,
+        }
+        if self._should_explain(conn, statement, executemany, record['fingerprint']):
+            record['plan'] = self.explain(cursor, statement, parameters)
+
+        self.log.add(record)
+        logger.warning("Requête lente (%.1f ms) [%s] %s — %s",
+                       duration_ms, record['endpoint'], record['call_site'], normalize_statement(statement))
+        if self.log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_file)), exist_ok=True)
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def _should_explain(self, conn, statement, executemany, key):
+        # EXPLAIN ANALYZE réexécute la requête : uniquement les SELECT, sous PostgreSQL
+        return (
+            self.explain_rate > 0
+            and conn.dialect.name == 'postgresql'
+            and not executemany
+            and statement.lstrip().upper().startswith('SELECT')
+            and not self.log.has_plan(key)
+            and random.random() < self.explain_rate
+        )
+
+    def explain(self, cursor, statement, parameters):
+        options = 'ANALYZE, BUFFERS, FORMAT TEXT' if self.explain_analyze else 'FORMAT TEXT'
+        # Curseur DBAPI brut : pas de nouvel événement. Le point de sauvegarde
+        # isole l'EXPLAIN de la transaction en cours : une erreur ne l'interrompt
+        # pas et ce qu'a exécuté ANALYZE est annulé.
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                explain_cursor.execute(f'EXPLAIN ({options}) {statement}', parameters)
+                return '\n'.join(row[0] for row in explain_cursor.fetchall())
+            except Exception as error:
+                logger.info("EXPLAIN impossible : %s", error)
+                return None
+            finally:
+                explain_cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                explain_cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+        finally:
+            explain_cursor.close()
+
+
+@queries_cli.command('report')
+@click.option('--file', 'path', help="Journal NDJSON (SLOW_QUERY_LOG_FILE par défaut).")
+@click.option('--sort', type=click.Choice(['total_ms', 'max_ms', 'count']), default='total_ms')
+@click.option('--limit', default=20, show_default=True)
+@click.option('--plans/--no-plans', default=False, help="Afficher les plans EXPLAIN capturés.")
+def report_command(path, sort, limit, plans):
+    """
+    Affiche les requêtes lentes agrégées par empreinte.
+    """
+    path = path or current_app.config['SLOW_QUERY_LOG_FILE']
+    if not path:
+        raise click.ClickException("Journal désactivé : renseigner SLOW_QUERY_LOG_FILE ou passer --file.")
+    if not os.path.exists(path):
+        raise click.ClickException(f"Aucune requête lente consignée dans {path}.")
+
+    for entry in SlowQueryLog.from_file(path).report(sort=sort, limit=limit):
+        click.echo(f"[{entry['fingerprint']}] {entry['count']} appels, "
+                   f"total {entry['total_ms']:.1f} ms, max {entry['max_ms']:.1f} ms")
+        click.echo(f"  {entry['statement']}")
+        for endpoint in sorted(entry['endpoints']):
+            click.echo(f"  route : {endpoint}")
+        for call_site in sorted(entry['call_sites']):
+            click.echo(f"  appel : {call_site}")
+        if plans and entry['plan']:
+            click.echo('  ' + entry['plan'].replace('\n', '\n  '))
+
+
+def init_query_diagnostics(app):
+    """
+    Branche le journal des requêtes lentes sur les moteurs de l'application.
+    """
+    app.cli.add_command(queries_cli)
+    if app.config['SLOW_QUERY_LOG_FILE'] is None:
+        # Journal par défaut, lu par `flask queries report` (chaîne vide : désactivé)
+        app.config['SLOW_QUERY_LOG_FILE'] = os.path.join(app.instance_path, DEFAULT_LOG_FILE)
+    if not app.config['SLOW_QUERY_ENABLED']:
+        return
+    diagnostics = QueryDiagnostics(app)
+    app.extensions['query_diagnostics'] = diagnostics
+    shards = app.extensions['shards'].engines.values() if 'shards' in app.extensions else ()
+    with app.app_context():
+        for engine in [*db.engines.values(), *shards]:
+            diagnostics.attach(engine)
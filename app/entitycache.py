@@ -0,0 +1,313 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import abort, current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+from sqlalchemy.sql.visitors import iterate
+from werkzeug.utils import import_string
+from extensions import db
+from .models import User, Post, Comment, Category
+
+logger = logging.getLogger(__name__)
+
+CACHED_MODELS = (User, Post, Comment, Category)
+CACHED_TABLES = {model.__table__.name for model in CACHED_MODELS}
+
+
+def cache_key(table_name, id):
+    return f"entity:{table_name}:{id}"
+
+
+def generation_key(table_name):
+    # Génération courante d'une table dans le cache partagé (voir EntityCache._shared_keys)
+    return f"entity-generation:{table_name}"
+
+
+def version_key(key):
+    # Version courante d'une clé dans le cache partagé, changée à chaque invalidation
+    return f"entity-version:{key}"
+
+
+class LRUCache:
+    """
+    Cache local au processus : au plus `max_size` entrées, chacune valable
+    `ttl` secondes, les moins récemment lues évincées en premier.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    # Chargement en cours d'une clé, partagé par les requêtes concurrentes
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False
+
+
+class EntityCache:
+    """
+    Lignes sérialisées indexées par clé primaire : LRU du processus devant
+    un cache partagé optionnel (ENTITY_CACHE_SHARED, "module:Classe" exposant
+    get(key), set(key, value, ttl) et delete(keys)). Un seul chargement en
+    base par clé et par processus à la fois.
+
+    Dans le cache partagé, chaque clé porte la génération de sa table et
+    sa propre version : une écriture qui touche toute une table (UPDATE
+    sans identifiants) change la génération, une écriture sur une ligne
+    change sa version. Une valeur chargée avant l'écriture, même par un
+    autre processus, est alors écrite sous une clé que plus personne ne lit.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.local = LRUCache(config['ENTITY_CACHE_SIZE'], config['ENTITY_CACHE_TTL'])
+        shared = config['ENTITY_CACHE_SHARED']
+        self.shared = import_string(shared)() if shared else None
+        self.shared_ttl = config['ENTITY_CACHE_SHARED_TTL']
+        self.lock_timeout = config['ENTITY_CACHE_LOCK_TIMEOUT']
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _get_shared(self, key):
+        try:
+            raw = self.shared.get(key)
+        except Exception as error:
+            # Le cache partagé est une optimisation : la base reste la référence
+            logger.warning("Cache partagé indisponible : %s", error)
+            return None
+        return None if raw is None else json.loads(raw)
+
+    def _set_shared(self, key, value, ttl=None):
+        try:
+            self.shared.set(key, json.dumps(value), ttl or self.shared_ttl)
+        except Exception as error:
+            logger.warning("Cache partagé indisponible : %s", error)
+
+    def _shared_keys(self, keys):
+        """
+        Clés du cache partagé pour `keys` : "entity:post:1@<génération>.<version>".
+        Une génération ou une version absente vaut "0" ; None si le cache est injoignable.
+        """
+        def current(name):
+            raw = self.shared.get(name)
+            return '0' if raw is None else json.loads(raw)
+
+        try:
+            generations = {table: current(generation_key(table)) for table in {key.split(':')[1] for key in keys}}
+            return {key: f"{key}@{generations[key.split(':')[1]]}.{current(version_key(key))}" for key in keys}
+        except Exception as error:
+            logger.warning("Cache partagé indisponible : %s", error)
+            return None
+
+    def get_or_load(self, key, loader):
+        """
+        Valeur de `key` depuis le cache local, le cache partagé ou `loader()`.
+        Une valeur None (ligne absente) n'est pas mise en cache.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        # Génération et version lues avant le chargement : une invalidation
+        # pendant celui-ci, dans n'importe quel processus, rend l'entrée écrite inaccessible
+        shared_key = None
+        if self.shared is not None:
+            shared_key = (self._shared_keys([key]) or {}).get(key)
+        if shared_key is not None:
+            value = self._get_shared(shared_key)
+            if value is not None:
+                self.local.set(key, value)
+                return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            # Une autre requête charge déjà cette clé : on attend son résultat
+            if flight.done.wait(self.lock_timeout) and not flight.stale:
+                if flight.error is not None:
+                    raise flight.error
+                return flight.value
+            return loader()
+
+        try:
+            value = flight.value = loader()
+            # Une écriture validée pendant le chargement rend la valeur périmée
+            if value is not None and not flight.stale:
+                self.local.set(key, value)
+                if shared_key is not None:
+                    self._set_shared(shared_key, value)
+            return value
+        except Exception as error:
+            # Les requêtes en attente échouent de la même façon plutôt que de recevoir None (404)
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def invalidate(self, keys, tables=()):
+        with self._lock:
+            for key, flight in self._flights.items():
+                if key in keys or key.split(':')[1] in tables:
+                    flight.stale = True
+        self.local.delete(keys)
+        for table in tables:
+            self.local.delete_prefix(cache_key(table, ''))
+        if self.shared is None:
+            return
+        # Nouvelles génération et versions (jamais réutilisées) ; elles survivent aux entrées qu'elles masquent
+        for table in tables:
+            self._set_shared(generation_key(table), uuid.uuid4().hex, 2 * self.shared_ttl)
+        keys = [key for key in keys if key.split(':')[1] not in tables]
+        shared_keys = self._shared_keys(keys) if keys else None
+        for key in keys:
+            self._set_shared(version_key(key), uuid.uuid4().hex, 2 * self.shared_ttl)
+        if shared_keys:
+            # Anciennes entrées désormais inaccessibles : libérées sans attendre leur expiration
+            try:
+                self.shared.delete(list(shared_keys.values()))
+            except Exception as error:
+                logger.warning("Cache partagé indisponible : %s", error)
+
+
+def _pending(session):
+    return session.info.setdefault('entity_cache_pending', (set(), set()))
+
+
+def _collect_flushed(session, flush_context):
+    """
+    Après chaque flush : clés des lignes modifiées ou supprimées via l'ORM.
+    """
+    keys, _ = _pending(session)
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, CACHED_MODELS) and instance.id is not None:
+            keys.add(cache_key(instance.__table__.name, instance.id))
+
+
+def _statement_ids(statement, table):
+    # Identifiants ciblés par WHERE id = :x ou id IN (...), None si indéterminables
+    ids = []
+    for element in iterate(statement.whereclause) if statement.whereclause is not None else ():
+        left = getattr(element, 'left', None)
+        if (isinstance(element, BinaryExpression) and getattr(left, 'name', None) == 'id'
+                and getattr(getattr(left, 'table', None), 'name', None) == table.name):
+            right = element.right
+            if element.operator is operators.eq and isinstance(right, BindParameter):
+                ids.append(right.value)
+            elif element.operator is operators.in_op and isinstance(right, BindParameter):
+                ids.extend(right.value)
+    return ids or None
+
+
+def _collect_bulk(execute_state):
+    """
+    UPDATE/DELETE émis directement (ex. PATCH en une requête) : clés extraites
+    du WHERE, ou toute la table à défaut.
+    """
+    if not (execute_state.is_update or execute_state.is_delete):
+        return
+    table = execute_state.statement.table
+    if getattr(table, 'name', None) not in CACHED_TABLES:
+        return
+    keys, tables = _pending(execute_state.session)
+    ids = _statement_ids(execute_state.statement, table)
+    if ids is None:
+        tables.add(table.name)
+    else:
+        keys.update(cache_key(table.name, id) for id in ids)
+
+
+def invalidate_pending(session):
+    """
+    Invalide les clés modifiées par la session (après un commit réel).
+    """
+    keys, tables = session.info.pop('entity_cache_pending', (set(), set()))
+    if (keys or tables) and has_app_context():
+        cache = current_app.extensions.get('entity_cache')
+        if cache is not None:
+            cache.invalidate(keys, tables)
+
+
+def _invalidate_after_commit(session):
+    # Session liée à une transaction externe (lot /batch) : invalidation au commit de celle-ci
+    if not session.info.get('outer_transaction'):
+        invalidate_pending(session)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('entity_cache_pending', None)
+
+
+def cached_entity(model, schema, id):
+    """
+    Ligne `id` sérialisée par `schema`, depuis le cache (404 si absente).
+    """
+    def load():
+        instance = db.session.get(model, id)
+        return None if instance is None else schema.dump(instance)
+
+    cache = current_app.extensions.get('entity_cache')
+    data = load() if cache is None else cache.get_or_load(cache_key(model.__table__.name, id), load)
+    if data is None:
+        abort(404)
+    return data
+
+
+def init_entity_cache(app):
+    if not app.config['ENTITY_CACHE_ENABLED']:
+        return
+    app.extensions['entity_cache'] = EntityCache(app)
+    if not event.contains(Session, 'after_flush', _collect_flushed):
+        event.listen(Session, 'after_flush', _collect_flushed)
+        event.listen(Session, 'do_orm_execute', _collect_bulk)
+        event.listen(Session, 'after_commit', _invalidate_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
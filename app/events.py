@@ -0,0 +1,276 @@
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import Blueprint, current_app, has_app_context, jsonify, request
+from flask_jwt_extended import jwt_required
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from extensions import db
+from .models import Post, Comment
+
+logger = logging.getLogger(__name__)
+
+events_bp = Blueprint('events', __name__)
+
+NOTIFY_CHANNEL = 'blog_events'
+# Reconnexion de l'écoute LISTEN : attente doublée à chaque échec (plafonnée),
+# abandon après LISTEN_MAX_FAILURES échecs consécutifs
+LISTEN_MAX_BACKOFF = 30
+LISTEN_MAX_FAILURES = 8
+# Délai de reconnexion conseillé aux clients (champ retry, Retry-After), en secondes
+RECONNECT_DELAY = 3
+
+
+class EventBroker:
+    """
+    Tampon circulaire des derniers événements du processus. Les abonnés
+    attendent sur une Condition : une connexion inactive ne coûte rien
+    tant qu'aucun événement n'arrive.
+    """
+
+    def __init__(self, size):
+        self._events = deque(maxlen=size)
+        self._seq = 0
+        self._positions = {}
+        self._condition = threading.Condition()
+
+    @property
+    def latest(self):
+        return self._seq
+
+    def publish(self, data):
+        with self._condition:
+            self._seq += 1
+            if len(self._events) == self._events.maxlen:
+                del self._positions[self._events[0][1]['id']]
+            self._events.append((self._seq, data))
+            self._positions[data['id']] = self._seq
+            self._condition.notify_all()
+
+    def position(self, event_id):
+        """
+        Position interne de l'événement `event_id`, None s'il a quitté le tampon.
+        """
+        with self._condition:
+            return self._positions.get(event_id)
+
+    def _since(self, seq):
+        # Les positions sont contiguës : accès direct à la fin du tampon
+        missing = min(self._seq - seq, len(self._events))
+        return [data for _, data in list(self._events)[len(self._events) - missing:]]
+
+    def wait(self, seq, timeout):
+        """
+        Événements postérieurs à `seq`, en attendant au plus `timeout` secondes.
+        """
+        with self._condition:
+            if self._seq <= seq:
+                self._condition.wait(timeout)
+            return self._since(seq), self._seq
+
+
+def _event_data(obj):
+    if isinstance(obj, Post):
+        return {'type': 'post.created', 'id': obj.id, 'post_id': obj.id, 'category_id': obj.category_id,
+                'user_id': obj.user_id, 'title': obj.title, 'excerpt': obj.excerpt}
+    return {'type': 'comment.created', 'id': obj.id, 'post_id': obj.post_id, 'user_id': obj.user_id,
+            'content': obj.content}
+
+
+def _collect_new_objects(session, flush_context):
+    """
+    Après chaque flush : mémorise les publications et commentaires créés.
+    Sous PostgreSQL, le NOTIFY part dans la même transaction et n'est
+    délivré qu'au commit (jamais en cas de rollback).
+    """
+    if not has_app_context() or 'events' not in current_app.extensions:
+        return
+    new = [{'event_id': uuid.uuid4().hex, **_event_data(obj)}
+           for obj in session.new if isinstance(obj, (Post, Comment))]
+    if not new:
+        return
+    if session.get_bind().dialect.name == 'postgresql':
+        for data in new:
+            session.connection().execute(text("SELECT pg_notify(:channel, :payload)"),
+                                         {'channel': NOTIFY_CHANNEL, 'payload': json.dumps(data)})
+    else:
+        session.info.setdefault('pending_events', []).extend(new)
+
+
+def publish_pending(session):
+    """
+    Publie les événements en attente d'une session (après un commit réel).
+    """
+    pending = session.info.pop('pending_events', None)
+    if pending and has_app_context() and 'events' in current_app.extensions:
+        broker = current_app.extensions['events']
+        for data in pending:
+            broker.publish(_as_event(data))
+
+
+def _publish_after_commit(session):
+    # Session liée à une transaction externe (lot /batch) : publication au commit de celle-ci
+    if not session.info.get('outer_transaction'):
+        publish_pending(session)
+
+
+def _discard_after_rollback(session, previous_transaction):
+    session.info.pop('pending_events', None)
+
+
+def _as_event(data):
+    data = dict(data)
+    return {'id': data.pop('event_id'), 'type': data.pop('type'), 'data': data}
+
+
+def _listen(app, broker, connected):
+    """
+    Une session LISTEN : ne rend la main qu'en levant une exception
+    (connexion perdue), la connexion est alors écartée du pool.
+    """
+    with app.app_context():
+        connection = db.engine.raw_connection()
+    try:
+        dbapi_connection = connection.dbapi_connection
+        dbapi_connection.autocommit = True
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        connected()
+        while True:
+            if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notify = dbapi_connection.notifies.pop(0)
+                broker.publish(_as_event(json.loads(notify.payload)))
+    finally:
+        connection.invalidate()
+
+
+def listen_notifications(app, broker):
+    """
+    Thread d'écoute LISTEN/NOTIFY (PostgreSQL) : chaque worker reçoit les
+    événements de tous les workers, dans l'ordre des commits. Une connexion
+    perdue est rouverte avec une attente croissante ; après trop d'échecs
+    consécutifs, le thread s'arrête et le prochain abonnement le relance.
+    """
+    state = app.extensions['events_listener']
+    failures = [0]
+
+    def connected():
+        failures[0] = 0
+
+    try:
+        while failures[0] < LISTEN_MAX_FAILURES:
+            try:
+                _listen(app, broker, connected)
+            except Exception as error:
+                delay = min(2 ** failures[0], LISTEN_MAX_BACKOFF)
+                failures[0] += 1
+                logger.warning("Écoute %s interrompue (%s), nouvel essai dans %s s", NOTIFY_CHANNEL, error, delay)
+                time.sleep(delay)
+        logger.error("Écoute %s abandonnée après %s échecs", NOTIFY_CHANNEL, failures[0])
+    finally:
+        with state['lock']:
+            if state['thread'] is threading.current_thread():
+                state['thread'] = None
+
+
+def _ensure_listener(app):
+    # Démarré au premier abonnement, donc après le fork des workers
+    state = app.extensions['events_listener']
+    with state['lock']:
+        if state['thread'] is None:
+            state['thread'] = threading.Thread(target=listen_notifications,
+                                               args=(app, app.extensions['events']),
+                                               name='events-listener', daemon=True)
+            state['thread'].start()
+
+
+def _matches(event, post_id, category_id):
+    data = event['data']
+    if post_id is not None and data['post_id'] != post_id:
+        return False
+    if category_id is not None and data.get('category_id') != category_id:
+        return False
+    return True
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+
+def stream(broker, seq, post_id, category_id, heartbeat, max_duration, reset=False):
+    yield f"retry: {RECONNECT_DELAY * 1000}\n\n"
+    if reset:
+        # Last-Event-ID trop ancien : le client doit recharger les listes
+        yield "event: reset\ndata: {}\n\n"
+    deadline = time.monotonic() + max_duration
+    while time.monotonic() < deadline:
+        events, seq = broker.wait(seq, min(heartbeat, max(deadline - time.monotonic(), 0)))
+        sent = False
+        for event in events:
+            if _matches(event, post_id, category_id):
+                sent = True
+                yield format_event(event)
+        if not sent:
+            yield ": ping\n\n"
+
+
+@events_bp.route('', methods=['GET'])
+@jwt_required()
+def stream_events():
+    """
+    Flux Server-Sent Events des nouvelles publications et des nouveaux commentaires
+    (?post_id=, ?category_id=), avec reprise via l'en-tête Last-Event-ID
+    """
+    app = current_app._get_current_object()
+    broker = app.extensions['events']
+    slots = app.extensions['events_streams']
+    # Chaque flux occupe un thread du worker (gthread) : au-delà d'EVENTS_MAX_STREAMS, l'API serait bloquée
+    if slots is not None and not slots.acquire(blocking=False):
+        response = jsonify({"msg": "Trop de flux d'événements ouverts, réessayez plus tard"})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(RECONNECT_DELAY)
+        return response
+    if db.engine.dialect.name == 'postgresql':
+        _ensure_listener(app)
+
+    seq, reset = broker.latest, False
+    last_event_id = request.headers.get('Last-Event-ID')
+    if last_event_id:
+        position = broker.position(last_event_id)
+        if position is None:
+            seq, reset = 0, True
+        else:
+            seq = position
+
+    response = app.response_class(
+        stream(broker, seq,
+               request.args.get('post_id', type=int), request.args.get('category_id', type=int),
+               app.config['EVENTS_HEARTBEAT'], app.config['EVENTS_MAX_DURATION'], reset),
+        mimetype='text/event-stream',
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    if slots is not None:
+        # Appelé à la fermeture de la réponse, même si le flux n'a jamais été lu
+        response.call_on_close(slots.release)
+    return response
+
+
+def init_events(app):
+    app.extensions['events'] = EventBroker(app.config['EVENTS_BUFFER_SIZE'])
+    app.extensions['events_listener'] = {'lock': threading.Lock(), 'thread': None}
+    max_streams = app.config['EVENTS_MAX_STREAMS']
+    app.extensions['events_streams'] = threading.BoundedSemaphore(max_streams) if max_streams else None
+    app.register_blueprint(events_bp, url_prefix='/events')
+    if not event.contains(Session, 'after_flush', _collect_new_objects):
+        event.listen(Session, 'after_flush', _collect_new_objects)
+        event.listen(Session, 'after_commit', _publish_after_commit)
+        event.listen(Session, 'after_soft_rollback', _discard_after_rollback)
@@ -1,14 +1,57 @@
 from app import db
+from sqlalchemy import text
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 import datetime
-
-
-class User(db.Model):
+import math
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+
+def summarize(content):
+    """
+    Extrait (coupé sur un mot), nombre de mots et temps de lecture d'un contenu.
+    """
+    words = content.split()
+    text = ' '.join(words)
+    excerpt = text
+    if len(text) > EXCERPT_LENGTH:
+        cut = text[:EXCERPT_LENGTH + 1]
+        cut = cut.rsplit(' ', 1)[0] if ' ' in cut else text[:EXCERPT_LENGTH]
+        excerpt = cut.rstrip('.,;:!?') + '…'
+    return {
+        'excerpt': excerpt,
+        'word_count': len(words),
+        'reading_time': max(1, math.ceil(len(words) / WORDS_PER_MINUTE)),
+    }
+
+
+def active_index(name, *columns):
+    """
+    Index partiel limité aux lignes non supprimées (WHERE deleted_at IS NULL).
+    """
+    active = text('deleted_at IS NULL')
+    return db.Index(name, *columns, postgresql_where=active, sqlite_where=active)
+
+
+class SoftDeleteMixin:
+    """
+    Suppression logique : les lignes marquées sont masquées de toutes les
+    requêtes ORM (voir app.softdelete) puis purgées hors des heures de pointe.
+    """
+    deleted_at = db.Column(db.DateTime, nullable=True)
+
+
+class User(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), default="user")
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     posts = db.relationship('Post', backref='author', lazy=True)
 
@@ -22,26 +65,54 @@ class User(db.Model):
         return check_password_hash(self.password, password)
 
 
-class Post(db.Model):
+class Post(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(120), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    date_posted = db.Column(db.DateTime, default=datetime.datetime.now())
+    date_posted = db.Column(db.DateTime, default=datetime.datetime.now)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True, index=True)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+    # Dérivés de content, recalculés à chaque écriture (voir summarize)
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 1), nullable=True)
+    word_count = db.Column(db.Integer, nullable=True)
+    reading_time = db.Column(db.Integer, nullable=True)
+
+    __mapper_args__ = {'version_id_col': version}
+    # Index partiels seulement : les lignes supprimées ne sont lues que par la purge
+    __table_args__ = (
+        active_index('ix_post_active_date_posted', 'date_posted'),
+        active_index('ix_post_active_user_id', 'user_id'),
+    )
 
     comments = db.relationship('Comment', backref='post', lazy=True)
 
     def __repr__(self):
         return f'<Post {self.title}>'
 
+    @validates('content')
+    def _summarize_content(self, key, content):
+        if content is not None:
+            for name, value in summarize(content).items():
+                setattr(self, name, value)
+        return content
+
 
-class Comment(db.Model):
+class Comment(SoftDeleteMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    date_commented = db.Column(db.DateTime, default=datetime.datetime.now())
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    # Clé de partitionnement sous PostgreSQL : évaluée à chaque insertion
+    date_commented = db.Column(db.DateTime, default=datetime.datetime.now, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
+    __table_args__ = (
+        active_index('ix_comment_active_post_id', 'post_id', 'date_commented'),
+        # Partitions mensuelles sous PostgreSQL (migration et `flask partitions maintain`)
+        {'info': {'partition_by': 'date_commented'}},
+    )
 
     def __repr__(self):
         return f'<Comment {self.id}>'
@@ -50,8 +121,69 @@ class Comment(db.Model):
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    version = db.Column(db.Integer, nullable=False, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}
 
     posts = db.relationship('Post', backref='category', lazy=True)
 
     def __repr__(self):
         return f'<Category {self.name}>'
+
+
+class StatsRollup(db.Model):
+    """
+    Statistiques précalculées par `flask stats refresh`.
+    """
+    __tablename__ = 'stats_rollup'
+
+    name = db.Column(db.String(50), primary_key=True)
+    params = db.Column(db.String(200), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    refreshed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<StatsRollup {self.name} {self.params}>'
+
+
+class ShardSequence(db.Model):
+    """
+    Compteurs d'identifiants des tables réparties (base principale, voir app.sharding).
+    """
+    __tablename__ = 'shard_sequence'
+
+    name = db.Column(db.String(50), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<ShardSequence {self.name} {self.next_value}>'
+
+
+class ShardSlot(db.Model):
+    """
+    Attribution des slots de hachage aux shards (modifiée par `flask shards rebalance`).
+    """
+    __tablename__ = 'shard_slot'
+
+    slot = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    shard = db.Column(db.String(50), nullable=False)
+    # Slot en cours de déplacement : écritures refusées jusqu'à sa réattribution
+    moving = db.Column(db.Boolean, nullable=False, server_default=db.false())
+
+    def __repr__(self):
+        return f'<ShardSlot {self.slot} {self.shard}>'
+
+
+class UserIdentity(db.Model):
+    """
+    Emails et noms d'utilisateur réservés (base principale) : avec SHARD_URIS,
+    les contraintes d'unicité de la table user ne valent que dans un shard.
+    """
+    __tablename__ = 'user_identity'
+
+    kind = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(120), primary_key=True)
+    user_id = db.Column(db.BigInteger, nullable=True)
+
+    def __repr__(self):
+        return f'<UserIdentity {self.kind} {self.value}>'
@@ -0,0 +1,161 @@
+import datetime
+import re
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, select, text
+from extensions import db
+from .sharding import SHARDED_TABLES
+
+partitions_cli = AppGroup('partitions', help="Partitions mensuelles (PostgreSQL).")
+
+PARTITION_NAME = re.compile(r'^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name, month):
+    return f"{table_name}_p{month:%Y_%m}"
+
+
+def partitioned_tables():
+    """
+    Tables déclarant une clé de partitionnement dans leur `info`
+    (voir Comment.__table_args__) : {table: colonne}.
+    """
+    return {table: table.info['partition_by'] for table in db.metadata.sorted_tables
+            if 'partition_by' in table.info}
+
+
+def create_partition_sql(preparer, table_name, month):
+    return (f"CREATE TABLE IF NOT EXISTS {preparer.quote(partition_name(table_name, month))} "
+            f"PARTITION OF {preparer.quote(table_name)} "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')")
+
+
+def is_partitioned(conn, table_name):
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid))"
+    ), {'name': table_name}).scalar()
+
+
+def attached_partitions(conn, table_name):
+    """
+    Partitions mensuelles attachées à `table_name` : {nom: premier jour du mois}.
+    """
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :name AND pg_table_is_visible(parent.oid)"
+    ), {'name': table_name}).scalars()
+    partitions = {}
+    for name in rows:
+        match = PARTITION_NAME.match(name)
+        if match and match['table'] == table_name:
+            partitions[name] = datetime.datetime(int(match['year']), int(match['month']), 1)
+    return partitions
+
+
+def create_future_partitions(conn, table_name, now, ahead):
+    """
+    Crée les partitions du mois courant et des `ahead` mois suivants.
+    """
+    existing = attached_partitions(conn, table_name)
+    created = []
+    for offset in range(ahead + 1):
+        month = add_months(month_start(now), offset)
+        name = partition_name(table_name, month)
+        if name not in existing:
+            conn.execute(text(create_partition_sql(conn.dialect.identifier_preparer, table_name, month)))
+            created.append(name)
+    return created
+
+
+def detach_old_partitions(conn, table_name, cutoff, drop=False):
+    """
+    Détache (ou supprime) les partitions entièrement antérieures à `cutoff` :
+    une opération sur le catalogue, sans DELETE ligne à ligne. Une partition
+    détachée reste une table ordinaire, à archiver (pg_dump) puis supprimer.
+    """
+    preparer = conn.dialect.identifier_preparer
+    removed = []
+    for name, month in sorted(attached_partitions(conn, table_name).items(), key=lambda item: item[1]):
+        if add_months(month, 1) > cutoff:
+            continue
+        conn.execute(text(f"ALTER TABLE {preparer.quote(table_name)} DETACH PARTITION {preparer.quote(name)}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {preparer.quote(name)}"))
+        removed.append(name)
+    return removed
+
+
+def purge_unpartitioned(table, column, cutoff, batch_size, engine=None):
+    """
+    Repli sans partitionnement (SQLite, shards...) : rétention par petits lots de DELETE.
+    """
+    engine = engine or db.engine
+    total = 0
+    while True:
+        ids = select(table.c.id).where(table.c[column] < cutoff).order_by(table.c.id).limit(batch_size)
+        with engine.begin() as conn:
+            count = conn.execute(delete(table).where(table.c.id.in_(ids))).rowcount
+        total += count
+        if count < batch_size:
+            return total
+
+
+@partitions_cli.command('maintain')
+@click.option('--ahead', type=int, help="Mois futurs à créer (PARTITION_MONTHS_AHEAD par défaut).")
+@click.option('--retention', type=int,
+              help="Mois conservés ; au-delà, partitions détachées (PARTITION_RETENTION_MONTHS par défaut).")
+@click.option('--drop', is_flag=True, help="Supprimer les partitions au lieu de les détacher.")
+@click.option('--batch-size', default=1000, show_default=True, help="Lots de DELETE sans partitionnement.")
+def maintain_command(ahead, retention, drop, batch_size):
+    """
+    Crée les partitions à venir et applique la rétention (à planifier chaque jour).
+    """
+    config = current_app.config
+    ahead = config['PARTITION_MONTHS_AHEAD'] if ahead is None else ahead
+    retention = config['PARTITION_RETENTION_MONTHS'] if retention is None else retention
+    now = datetime.datetime.now()
+    cutoff = add_months(month_start(now), -retention) if retention else None
+
+    router = current_app.extensions.get('shards')
+    for table, column in partitioned_tables().items():
+        if router is not None and table.name in SHARDED_TABLES:
+            # Tables des shards créées par `flask shards init`, sans partitions : rétention par DELETE
+            click.echo(f"{table.name} : table répartie entre les shards, non partitionnée")
+            if cutoff is not None:
+                for shard_id in router.shard_ids:
+                    count = purge_unpartitioned(table, column, cutoff, batch_size, router.engine(shard_id))
+                    click.echo(f"{table.name} ({shard_id}) : {count} lignes antérieures à {cutoff:%Y-%m-%d} supprimées")
+            continue
+        with db.engine.begin() as conn:
+            partitioned = is_partitioned(conn, table.name)
+            if partitioned:
+                for name in create_future_partitions(conn, table.name, now, ahead):
+                    click.echo(f"{table.name} : partition {name} créée")
+                if cutoff is not None:
+                    for name in detach_old_partitions(conn, table.name, cutoff, drop):
+                        click.echo(f"{table.name} : partition {name} {'supprimée' if drop else 'détachée'}")
+        if not partitioned:
+            click.echo(f"{table.name} : table non partitionnée ({db.engine.dialect.name})")
+            if cutoff is not None:
+                count = purge_unpartitioned(table, column, cutoff, batch_size)
+                click.echo(f"{table.name} : {count} lignes antérieures à {cutoff:%Y-%m-%d} supprimées")
+
+
+def init_partitions(app):
+    app.cli.add_command(partitions_cli)
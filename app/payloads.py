@@ -0,0 +1,40 @@
+from flask import abort, jsonify, request
+from marshmallow import ValidationError
+
+
+def _bad_request(payload):
+    response = jsonify(payload)
+    response.status_code = 400
+    abort(response)
+
+
+def json_body():
+    """
+    Corps JSON de la requête, qui doit être un objet (400 sinon).
+    Sa taille est bornée par MAX_CONTENT_LENGTH (413 au-delà).
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        _bad_request({"msg": "Le corps de la requête doit être un objet JSON"})
+    return data
+
+
+def load_payload(loader, data, **options):
+    """
+    Valide `data` avec un chargeur précompilé (voir app.schemas) et retourne
+    un dictionnaire ; les erreurs de validation donnent une réponse 400.
+    `options` est transmis à load (instance et session d'un schéma ORM).
+    """
+    try:
+        return loader.load(data, **options)
+    except ValidationError as error:
+        _bad_request(error.messages)
+
+
+def handle_too_large(error):
+    max_size = request.max_content_length
+    return jsonify({"msg": f"Corps de requête trop volumineux (maximum {max_size} octets)"}), 413
+
+
+def init_payloads(app):
+    app.register_error_handler(413, handle_too_large)
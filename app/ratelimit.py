@@ -0,0 +1,157 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+from flask_jwt_extended import decode_token
+from werkzeug.utils import import_string
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(limit):
+    """
+    Convertit "10/minute" en (débit en jetons par seconde, capacité du seau).
+    """
+    count, period = limit.split('/')
+    count, period = int(count), period.strip().rstrip('s')
+    if period not in PERIODS:
+        raise ValueError(f"Période de limite inconnue : {limit}")
+    return count / PERIODS[period], count
+
+
+class MemoryStore:
+    """
+    Seaux à jetons en mémoire du processus, en O(1) par requête.
+    Les clés les moins récemment utilisées sont évincées au-delà de max_keys.
+
+    Un backend partagé (Redis, memcached...) doit exposer la même méthode
+    `consume` et être déclaré dans RATELIMIT_STORAGE ("module:Classe").
+    """
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, rate, capacity, cost=1):
+        """
+        Retire `cost` jetons du seau `key`.
+        Retourne (autorisé, jetons restants, secondes avant nouvel essai).
+        """
+        now = self.clock()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, retry_after
+
+
+class RateLimiter:
+    """
+    Limitation de débit par client (identité JWT ou adresse IP) et par
+    route/blueprint, avec un plafond global de requêtes simultanées.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        storage = config['RATELIMIT_STORAGE']
+        self.store = import_string(storage)() if storage else MemoryStore(config['RATELIMIT_MAX_KEYS'])
+        self.default = config['RATELIMIT_DEFAULT']
+        self.limits = config['RATELIMIT_LIMITS']
+        self.max_in_flight = config['RATELIMIT_MAX_IN_FLIGHT']
+        self.in_flight_exempt = set(config['RATELIMIT_IN_FLIGHT_EXEMPT'])
+        self.shed_retry_after = config['RATELIMIT_SHED_RETRY_AFTER']
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._parsed = {}
+
+    def _resolve_limit(self):
+        # La règle la plus précise l'emporte : route, puis blueprint, puis défaut
+        for scope in (request.endpoint, request.blueprint):
+            if scope in self.limits:
+                return scope, self.limits[scope]
+        return 'default', self.default
+
+    def _parse(self, limit):
+        if limit not in self._parsed:
+            self._parsed[limit] = parse_limit(limit)
+        return self._parsed[limit]
+
+    @staticmethod
+    def client_key():
+        """
+        Identité JWT si un jeton valide est fourni, adresse IP sinon.
+        """
+        auth = request.headers.get('Authorization', '')
+        if auth.startswith('Bearer '):
+            try:
+                return f"jwt:{decode_token(auth[7:])['sub']}"
+            except Exception:
+                pass
+        return f"ip:{request.remote_addr}"
+
+    def acquire_slot(self):
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def before_request(self):
+        if self.max_in_flight and request.endpoint not in self.in_flight_exempt:
+            if not self.acquire_slot():
+                response = jsonify({"msg": "Service surchargé, réessayez plus tard"})
+                response.headers['Retry-After'] = str(self.shed_retry_after)
+                return response, 503
+            g._ratelimit_slot = True
+
+        scope, limit = self._resolve_limit()
+        if not limit:
+            return None
+        rate, capacity = self._parse(limit)
+        allowed, remaining, retry_after = self.store.consume(f"{scope}:{self.client_key()}", rate, capacity)
+        g._ratelimit = (capacity, int(remaining))
+        if not allowed:
+            response = jsonify({"msg": "Trop de requêtes"})
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response, 429
+        return None
+
+    def after_request(self, response):
+        state = g.pop('_ratelimit', None)
+        if state is not None:
+            capacity, remaining = state
+            response.headers['X-RateLimit-Limit'] = str(capacity)
+            response.headers['X-RateLimit-Remaining'] = str(remaining)
+        return response
+
+    def teardown_request(self, exc):
+        if g.pop('_ratelimit_slot', False):
+            self.release_slot()
+
+
+def init_rate_limiting(app):
+    """
+    Installe la limitation de débit et le délestage sur l'application.
+    """
+    if not app.config['RATELIMIT_ENABLED']:
+        return
+    limiter = RateLimiter(app)
+    app.extensions['ratelimit'] = limiter
+    app.before_request(limiter.before_request)
+    app.after_request(limiter.after_request)
+    app.teardown_request(limiter.teardown_request)
@@ -1,26 +1,100 @@
-from flask import Blueprint, jsonify, request, render_template
+import datetime
+
+from flask import Blueprint, jsonify, request, render_template, current_app, url_for, abort
 from . import db
-from .models import User, Post, Comment, Category
+from .models import User, Post, Comment, Category, summarize
 from .schemas import UserSchema, PostSchema, CommentSchema, CategorySchema
+from .schemas import user_dumper, post_loader, post_dumper, comment_loader, comment_dumper
+from .schemas import user_updater, post_updater, comment_updater, category_updater
+from .concurrency import check_if_match, precondition_failed, versioned_response, versioned_update
+from .authorization import check_author, check_role_change, get_owned_or_404, owner_filter
+from .softdelete import check_parents, delete_instance
+from .payloads import json_body, load_payload
+from .entitycache import cached_entity
+from .sharding import dump_all, update_identities
 from flask_jwt_extended import jwt_required
-from flasgger import swag_from
+from sqlalchemy import select
+from sqlalchemy.orm import defer
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.security import generate_password_hash
 
 
 api_bp = Blueprint('api', __name__)
 
+
+@api_bp.errorhandler(StaleDataError)
+def handle_stale_data(error):
+    """
+    Conflit de version détecté au commit (mise à jour concurrente)
+    """
+    db.session.rollback()
+    return precondition_failed()
+
+
+def ids_arg():
+    """
+    Identifiants demandés via ?ids=1,2,3 (dédoublonnés, dans l'ordre), None si absent
+    """
+    raw = request.args.get('ids')
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        abort(400, description="ids doit être une liste d'entiers séparés par des virgules")
+    max_ids = current_app.config['BATCH_GET_MAX_IDS']
+    if not ids or len(ids) > max_ids:
+        abort(400, description=f"ids doit contenir entre 1 et {max_ids} identifiants")
+    return ids
+
+
+def date_filters(column):
+    """
+    Conditions ?since=&until= (AAAA-MM-JJ, borne de fin exclue) sur `column` ;
+    sous PostgreSQL, elles limitent la lecture aux partitions concernées
+    """
+    filters = []
+    for name, compare in (('since', column.__ge__), ('until', column.__lt__)):
+        value = request.args.get(name)
+        if value:
+            try:
+                filters.append(compare(datetime.datetime.fromisoformat(value)))
+            except ValueError:
+                abort(400, description=f"{name} doit être une date au format AAAA-MM-JJ")
+    return filters
+
+
+def dump_by_ids(query, model, schema, ids):
+    """
+    Charge plusieurs lignes en une requête WHERE id IN (...), dans l'ordre demandé
+    """
+    rows = {row.id: row for row in query.filter(model.id.in_(ids))}
+    return jsonify({
+        'items': schema.dump([rows[id] for id in ids if id in rows]),
+        'missing': [id for id in ids if id not in rows],
+    })
+
+
+@api_bp.errorhandler(400)
+def handle_bad_request(error):
+    return jsonify({"msg": error.description}), 400
+
 @api_bp.route('/')
 def accueil():
-    return render_template('index.html')
+    docs_url = url_for('flasgger.apidocs') if 'flasgger.apidocs' in current_app.view_functions else None
+    return render_template('index.html', docs_url=docs_url)
 
 @api_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
     """
-    Récupère la liste des utilisateurs
+    Récupère la liste des utilisateurs (ou une sélection via ?ids=1,2,3)
     """
-    users = User.query.all()
     user_schema = UserSchema(many=True)
-    return jsonify(user_schema.dump(users))
+    ids = ids_arg()
+    if ids is not None:
+        return dump_by_ids(User.query, User, user_schema, ids)
+    return jsonify(dump_all(select(User), user_schema))
 
 
 @api_bp.route('/users/<int:id>', methods=['GET'])
@@ -29,33 +103,56 @@ def get_user(id):
     """
     Récupère un utilisateur par son ID
     """
-    user = User.query.get_or_404(id)
-    user_schema = UserSchema()
-    return jsonify(user_schema.dump(user))
+    data = cached_entity(User, user_dumper, id)
+    return versioned_response(data, data['version'])
 
 
 @api_bp.route('/users/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_user(id):
     """
-    Met à jour un utilisateur
+    Met à jour un utilisateur (lui-même ou un administrateur)
     """
-    user = User.query.get_or_404(id)
-    data = request.get_json()
+    user = get_owned_or_404(User, id)
+    check_if_match(user)
+    data = json_body()
+    check_role_change(data)
     user_schema = UserSchema()
-    updated_user = user_schema.load(data, instance=user, session=db.session)
-    db.session.commit()
-    return jsonify(user_schema.dump(updated_user))
+
+    def update():
+        updated_user = load_payload(user_schema, data, instance=user, session=db.session)
+        if 'password' in data:
+            # Validé en clair, stocké haché comme avec PATCH
+            updated_user.set_password(updated_user.password)
+        db.session.commit()
+        return versioned_response(user_schema.dump(updated_user), updated_user.version)
+
+    return update_identities(id, data, update)
+
+@api_bp.route('/users/<int:id>', methods=['PATCH'])
+@jwt_required()
+def patch_user(id):
+    """
+    Met à jour partiellement un utilisateur en une seule requête (If-Match requis)
+    """
+    check_role_change(json_body())
+
+    def hash_password(values):
+        if 'password' in values:
+            values['password'] = generate_password_hash(values['password'])
+        return values
+
+    return update_identities(id, json_body(), lambda: versioned_update(
+        User, user_updater, id, prepare=hash_password, owned=owner_filter(User)))
 
 @api_bp.route('/users/<int:id>', methods=['DELETE'])
 @jwt_required()
 def delete_user(id):
     """
-    Supprime un utilisateur
+    Supprime un utilisateur (lui-même ou un administrateur)
     """
-    user = User.query.get_or_404(id)
-    db.session.delete(user)
-    db.session.commit()
+    user = get_owned_or_404(User, id)
+    delete_instance(user)
     return '', 204
 
 
@@ -65,11 +162,19 @@ def delete_user(id):
 @jwt_required()
 def get_posts():
     """
-    Récupère la liste des publications
+    Récupère la liste des publications (ou une sélection via ?ids=1,2,3),
+    extraits seulement ; ?include_content=true pour le contenu complet
     """
-    posts = Post.query.all()
-    post_schema = PostSchema(many=True)
-    return jsonify(post_schema.dump(posts))
+    if request.args.get('include_content', 'false').lower() == 'true':
+        options = ()
+        post_schema = PostSchema(many=True)
+    else:
+        options = (defer(Post.content),)
+        post_schema = PostSchema(many=True, exclude=('content',))
+    ids = ids_arg()
+    if ids is not None:
+        return dump_by_ids(Post.query.options(*options), Post, post_schema, ids)
+    return jsonify(dump_all(select(Post).options(*options), post_schema))
 
 
 # Récupérer une publication par son ID
@@ -79,9 +184,8 @@ def get_post(id):
     """
     Récupère une publication par son ID
     """
-    post = Post.query.get_or_404(id)
-    post_schema = PostSchema()
-    return jsonify(post_schema.dump(post))
+    data = cached_entity(Post, post_dumper, id)
+    return versioned_response(data, data['version'])
 
 
 # Créer une nouvelle publication
@@ -91,19 +195,16 @@ def create_post():
     """
     Crée une nouvelle publication
     """
-    data = request.get_json()
-    post_schema = PostSchema()
-    post_data = post_schema.load(data, session=db.session)
-    new_post = Post(
-        title = post_data.title,
-        content = post_data.content,
-        date_posted = post_data.date_posted,
-        user_id = post_data.user_id,
-        category_id = post_data.category_id
-    )
+    data = load_payload(post_loader, json_body())
+    check_author(data)
+    check_parents(data)
+    new_post = Post(**data)
     db.session.add(new_post)
+    db.session.flush()
+    # Sérialisée avant le commit : la ligne n'est pas relue après expiration
+    body = post_dumper.dump(new_post)
     db.session.commit()
-    return jsonify(post_schema.dump(new_post)), 201
+    return jsonify(body), 201
 
 
 # Mettre à jour une publication
@@ -111,14 +212,35 @@ def create_post():
 @jwt_required()
 def update_post(id):
     """
-    Met à jour une publication existante
+    Met à jour une publication existante (auteur ou administrateur)
     """
-    post = Post.query.get_or_404(id)
-    data = request.get_json()
+    post = get_owned_or_404(Post, id)
+    check_if_match(post)
+    data = json_body()
+    check_author(data)
+    check_parents(data)
     post_schema = PostSchema()
-    updated_post = post_schema.load(data, instance=post, session=db.session)
+    updated_post = load_payload(post_schema, data, instance=post, session=db.session)
     db.session.commit()
-    return jsonify(post_schema.dump(updated_post))
+    return versioned_response(post_schema.dump(updated_post), updated_post.version)
+
+
+# Mettre à jour partiellement une publication
+@api_bp.route('/posts/<int:id>', methods=['PATCH'])
+@jwt_required()
+def patch_post(id):
+    """
+    Met à jour partiellement une publication en une seule requête (If-Match requis)
+    """
+    check_author(json_body())
+    check_parents(json_body())
+
+    def summarize_content(values):
+        if 'content' in values:
+            values.update(summarize(values['content']))
+        return values
+
+    return versioned_update(Post, post_updater, id, prepare=summarize_content, owned=owner_filter(Post))
 
 
 # Supprimer une publication
@@ -126,11 +248,10 @@ def update_post(id):
 @jwt_required()
 def delete_post(id):
     """
-    Supprime une publication par son ID
+    Supprime une publication par son ID (auteur ou administrateur)
     """
-    post = Post.query.get_or_404(id)
-    db.session.delete(post)
-    db.session.commit()
+    post = get_owned_or_404(Post, id)
+    delete_instance(post)
     return '', 204
 
 
@@ -141,11 +262,15 @@ def delete_post(id):
 @jwt_required()
 def get_comments():
     """
-    Récupère la liste des commentaires
+    Récupère la liste des commentaires (ou une sélection via ?ids=1,2,3),
+    éventuellement restreinte à une période (?since=&until=)
     """
-    comments = Comment.query.all()
     comment_schema = CommentSchema(many=True)
-    return jsonify(comment_schema.dump(comments))
+    filters = date_filters(Comment.date_commented)
+    ids = ids_arg()
+    if ids is not None:
+        return dump_by_ids(Comment.query.filter(*filters), Comment, comment_schema, ids)
+    return jsonify(dump_all(select(Comment).where(*filters), comment_schema))
 
 
 # Récupérer un commentaire par son ID
@@ -155,9 +280,8 @@ def get_comment(id):
     """
     Récupère un commentaire par son ID
     """
-    comment = Comment.query.get_or_404(id)
-    comment_schema = CommentSchema()
-    return jsonify(comment_schema.dump(comment))
+    data = cached_entity(Comment, comment_dumper, id)
+    return versioned_response(data, data['version'])
 
 
 # Créer un nouveau commentaire
@@ -167,19 +291,15 @@ def create_comment():
     """
     Crée un nouveau commentaire
     """
-    data = request.get_json()
-    comment_schema = CommentSchema()
-    comment_data = comment_schema.load(data, session=db.session)
-    new_comment = Comment(
-    content = comment_data.content,
-    date_commented = comment_data.date_commented,
-    user_id = comment_data.user_id,
-    post_id = comment_data.post_id
-
-    )
+    data = load_payload(comment_loader, json_body())
+    check_author(data)
+    check_parents(data)
+    new_comment = Comment(**data)
     db.session.add(new_comment)
+    db.session.flush()
+    body = comment_dumper.dump(new_comment)
     db.session.commit()
-    return jsonify(comment_schema.dump(new_comment)), 201
+    return jsonify(body), 201
 
 
 # Mettre à jour un commentaire
@@ -187,14 +307,29 @@ def create_comment():
 @jwt_required()
 def update_comment(id):
     """
-    Met à jour un commentaire existant
+    Met à jour un commentaire existant (auteur ou administrateur)
     """
-    comment = Comment.query.get_or_404(id)
-    data = request.get_json()
+    comment = get_owned_or_404(Comment, id)
+    check_if_match(comment)
+    data = json_body()
+    check_author(data)
+    check_parents(data)
     comment_schema = CommentSchema()
-    updated_comment = comment_schema.load(data, instance=comment, session=db.session)
+    updated_comment = load_payload(comment_schema, data, instance=comment, session=db.session)
     db.session.commit()
-    return jsonify(comment_schema.dump(updated_comment))
+    return versioned_response(comment_schema.dump(updated_comment), updated_comment.version)
+
+
+# Mettre à jour partiellement un commentaire
+@api_bp.route('/comments/<int:id>', methods=['PATCH'])
+@jwt_required()
+def patch_comment(id):
+    """
+    Met à jour partiellement un commentaire en une seule requête (If-Match requis)
+    """
+    check_author(json_body())
+    check_parents(json_body())
+    return versioned_update(Comment, comment_updater, id, owned=owner_filter(Comment))
 
 
 # Supprimer un commentaire
@@ -202,11 +337,10 @@ def update_comment(id):
 @jwt_required()
 def delete_comment(id):
     """
-    Supprime un commentaire par son ID
+    Supprime un commentaire par son ID (auteur ou administrateur)
     """
-    comment = Comment.query.get_or_404(id)
-    db.session.delete(comment)
-    db.session.commit()
+    comment = get_owned_or_404(Comment, id)
+    delete_instance(comment)
     return '', 204
 
 
@@ -216,10 +350,13 @@ def delete_comment(id):
 @jwt_required()
 def get_categories():
     """
-    Récupère la liste des catégories
+    Récupère la liste des catégories (ou une sélection via ?ids=1,2,3)
     """
-    categories = Category.query.all()
     category_schema = CategorySchema(many=True)
+    ids = ids_arg()
+    if ids is not None:
+        return dump_by_ids(Category.query, Category, category_schema, ids)
+    categories = Category.query.all()
     return jsonify(category_schema.dump(categories))
 
 
@@ -230,9 +367,9 @@ def create_category():
     """
     Crée une nouvelle catégorie
     """
-    data = request.get_json()
+    data = json_body()
     category_schema = CategorySchema()
-    category_data = category_schema.load(data, session=db.session)
+    category_data = load_payload(category_schema, data, session=db.session)
     new_category = Category(name = category_data.name)
     db.session.add(new_category)
     db.session.commit()
@@ -246,12 +383,23 @@ def update_category(id):
     """
     Met à jour une catégorie existante
     """
-    category = Category.query.get_or_404(id)
-    data = request.get_json()
+    category = db.get_or_404(Category, id)
+    check_if_match(category)
+    data = json_body()
     category_schema = CategorySchema()
-    updated_category = category_schema.load(data, instance=category, session=db.session)
+    updated_category = load_payload(category_schema, data, instance=category, session=db.session)
     db.session.commit()
-    return jsonify(category_schema.dump(updated_category))
+    return versioned_response(category_schema.dump(updated_category), updated_category.version)
+
+
+# Mettre à jour partiellement une catégorie
+@api_bp.route('/categories/<int:id>', methods=['PATCH'])
+@jwt_required()
+def patch_category(id):
+    """
+    Met à jour partiellement une catégorie en une seule requête (If-Match requis)
+    """
+    return versioned_update(Category, category_updater, id)
 
 
 # Supprimer une catégorie
@@ -261,7 +409,7 @@ def delete_category(id):
     """
     Supprime une catégorie par son ID
     """
-    category = Category.query.get_or_404(id)
+    category = db.get_or_404(Category, id)
     db.session.delete(category)
     db.session.commit()
     return '', 204
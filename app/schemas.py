@@ -6,6 +6,7 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = User
         load_instance = True
+        exclude = ('deleted_at',)
 
     username = fields.String(
         required=True,
@@ -44,12 +45,15 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
 
     created_at = fields.DateTime(dump_only=True)
 
+    version = fields.Integer(dump_only=True)
+
 
 
 class PostSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Post
         load_instance = True
+        exclude = ('deleted_at',)
 
     title = fields.String(
         required=True,
@@ -90,11 +94,18 @@ class PostSchema(ma.SQLAlchemyAutoSchema):
         }
     )
 
+    version = fields.Integer(dump_only=True)
+
+    excerpt = fields.String(dump_only=True)
+    word_count = fields.Integer(dump_only=True)
+    reading_time = fields.Integer(dump_only=True)
+
 
 class CommentSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = Comment
         load_instance = True
+        exclude = ('deleted_at',)
 
     content = fields.String(
         required=True,
@@ -125,6 +136,8 @@ class CommentSchema(ma.SQLAlchemyAutoSchema):
         }
     )
 
+    version = fields.Integer(dump_only=True)
+
 
 class CategorySchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -145,4 +158,19 @@ class CategorySchema(ma.SQLAlchemyAutoSchema):
         }
     )
 
-
+    version = fields.Integer(dump_only=True)
+
+
+# Instances précompilées des routes de création : les chargeurs valident
+# en dictionnaire (sans instance ORM), la route construit le modèle une fois
+user_loader = UserSchema(load_instance=False, only=('username', 'email', 'password'))
+post_loader = PostSchema(load_instance=False, only=('title', 'content', 'user_id', 'category_id'))
+comment_loader = CommentSchema(load_instance=False, only=('content', 'user_id', 'post_id'))
+# Mises à jour partielles (PATCH) : mêmes règles, champs tous facultatifs
+user_updater = UserSchema(load_instance=False, partial=True)
+post_updater = PostSchema(load_instance=False, partial=True)
+comment_updater = CommentSchema(load_instance=False, partial=True)
+category_updater = CategorySchema(load_instance=False, partial=True)
+user_dumper = UserSchema()
+post_dumper = PostSchema()
+comment_dumper = CommentSchema()
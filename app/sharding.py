@@ -0,0 +1,599 @@
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from heapq import merge
+from operator import itemgetter
+
+import click
+from flask import current_app, jsonify
+from flask.cli import AppGroup
+from sqlalchemy import (BigInteger, Integer, MetaData, Table, and_, create_engine, delete, event, inspect, insert,
+                        or_, select, tuple_, update)
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList
+from sqlalchemy.sql.util import find_tables
+from extensions import db
+from .models import User, Post, Comment, ShardSequence, ShardSlot, UserIdentity
+
+shards_cli = AppGroup('shards', help="Répartition des données par utilisateur sur plusieurs bases.")
+
+# Base principale (SQLALCHEMY_DATABASE_URI) : catégories, statistiques, séquences et slots
+GLOBAL = 'global'
+# Tables réparties par utilisateur, parentes d'abord ; les autres restent dans la base principale
+SHARDED_MODELS = (User, Post, Comment)
+SHARDED_TABLES = {model.__table__.name for model in SHARDED_MODELS}
+# Colonnes dont la valeur porte le slot de l'utilisateur (voir ShardRouter.assign_id)
+SHARD_KEYS = {'user': ('id',), 'post': ('id', 'user_id'), 'comment': ('id', 'user_id')}
+# Champs uniques de l'utilisateur, réservés dans user_identity sur la base principale
+IDENTITY_MESSAGES = {'email': "Email déjà utilisé", 'username': "Nom d'utilisateur déjà utilisé"}
+
+
+class SlotMovingError(Exception):
+    """
+    Écriture sur un slot gelé par `flask shards rebalance` (réponse 503).
+    """
+
+
+class IdentityTaken(Exception):
+    """
+    Email ou nom d'utilisateur déjà réservé par un autre utilisateur (réponse 400).
+    """
+
+    def __init__(self, kind):
+        super().__init__(kind)
+        self.kind = kind
+
+
+def statement_table(statement):
+    """
+    Table visée par une instruction : la première table répartie de son FROM,
+    None pour du SQL textuel.
+    """
+    if isinstance(statement, Table):
+        return statement
+    table = getattr(statement, 'table', None)  # INSERT, UPDATE, DELETE
+    if isinstance(table, Table):
+        return table
+    if not hasattr(statement, 'get_final_froms'):
+        return None
+    tables = [table for from_ in statement.get_final_froms() for table in find_tables(from_)]
+    return next((table for table in tables if table.name in SHARDED_TABLES), tables[0] if tables else None)
+
+
+def _conjuncts(clause):
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        for element in clause.clauses:
+            yield from _conjuncts(element)
+    else:
+        yield clause
+
+
+def shard_key_values(statement, table, parameters=None):
+    """
+    Valeurs des clés de shard fixées par le WHERE (col = x ou col IN (...) au
+    premier niveau des AND), None si l'instruction peut toucher tous les shards.
+    """
+    where = getattr(statement, 'whereclause', None)
+    if where is None:
+        return None
+    parameters = parameters if isinstance(parameters, dict) else {}
+    found = {}
+    for element in _conjuncts(where):
+        if not isinstance(element, BinaryExpression) or element.operator not in (operators.eq, operators.in_op):
+            continue
+        column, value = element.left, element.right
+        if not isinstance(value, BindParameter):
+            column, value = value, column
+        if (not isinstance(value, BindParameter) or getattr(column, 'name', None) not in SHARD_KEYS[table.name]
+                or getattr(getattr(column, 'table', None), 'name', None) != table.name):
+            continue
+        value = parameters.get(value.key, value.effective_value)
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if all(isinstance(item, int) for item in values):
+            found.setdefault(column.name, []).extend(values)
+    # L'identifiant de la ligne prime sur celui de son auteur
+    return next((found[name] for name in SHARD_KEYS[table.name] if found.get(name)), None)
+
+
+def shard_metadata():
+    """
+    Schéma des shards : tables réparties seulement, identifiants en BIGINT (ils
+    portent le slot) et sans clé étrangère hors de la base ou de l'utilisateur
+    (catégorie d'une publication, publication d'un commentaire).
+    """
+    metadata = MetaData()
+    for model in SHARDED_MODELS:
+        table = model.__table__.to_metadata(metadata)
+        for constraint in list(table.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split('.')[0] != 'user':
+                table.constraints.discard(constraint)
+                for fk in constraint.elements:
+                    fk.parent.foreign_keys.discard(fk)
+                    table.foreign_keys.discard(fk)
+        for column in table.columns:
+            if isinstance(column.type, Integer) and (column.primary_key or column.name.endswith('_id')):
+                column.type = BigInteger()
+    return metadata
+
+
+class ShardRouter:
+    """
+    Route les utilisateurs et leurs publications et commentaires vers l'un des
+    shards de SHARD_URIS. Chaque identifiant vaut séquence * SHARD_SLOTS + slot :
+    le slot d'un utilisateur est un hachage stable (CRC32) de sa séquence, ses
+    lignes reprennent le sien, et `id % SHARD_SLOTS` désigne le shard sans
+    aucune lecture. L'attribution slot -> shard est stockée dans shard_slot.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        # Moteurs propres au routeur : des binds Flask-SQLAlchemy seraient partagés par toutes les applications
+        options = config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+        self.engines = {f'shard{index}': create_engine(uri, **options)
+                        for index, uri in enumerate(config['SHARD_URIS'])}
+        self.shard_ids = list(self.engines)
+        self.slots = config['SHARD_SLOTS']
+        self.id_block = config['SHARD_ID_BLOCK']
+        self.map_ttl = config['SHARD_MAP_TTL']
+        self.executor = ThreadPoolExecutor(max_workers=config['SHARD_FANOUT_WORKERS'] or len(self.shard_ids),
+                                           thread_name_prefix='shard')
+        self._assignment = None
+        self._moving = frozenset()
+        self._loaded_at = 0.0
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def engine(self, shard_id):
+        return db.engine if shard_id == GLOBAL else self.engines[shard_id]
+
+    def default_assignment(self):
+        return [self.shard_ids[slot % len(self.shard_ids)] for slot in range(self.slots)]
+
+    def assignment(self):
+        """
+        Shard de chaque slot, relu dans shard_slot au plus toutes les SHARD_MAP_TTL secondes.
+        """
+        now = time.monotonic()
+        if self._assignment is None or now - self._loaded_at >= self.map_ttl:
+            with self.engine(GLOBAL).connect() as conn:
+                rows = conn.execute(select(ShardSlot.slot, ShardSlot.shard, ShardSlot.moving)).all()
+            assignment = self.default_assignment()
+            for slot, shard, _ in rows:
+                if slot < self.slots:
+                    assignment[slot] = shard
+            self._moving = frozenset(slot for slot, _, moving in rows if moving)
+            self._assignment, self._loaded_at = assignment, now
+        return self._assignment
+
+    def moving_slots(self):
+        # Même relecture que l'attribution : un gel est vu par tous les processus après SHARD_MAP_TTL
+        self.assignment()
+        return self._moving
+
+    def check_writable(self, ids):
+        """
+        Refuse (SlotMovingError) une écriture sur un slot en cours de
+        déplacement ; `ids` None (lignes indéterminées) : refusée dès qu'un
+        slot est gelé.
+        """
+        moving = self.moving_slots()
+        if moving and (ids is None or any(value % self.slots in moving for value in ids)):
+            raise SlotMovingError("Données en cours de déplacement entre shards, réessayez plus tard")
+
+    def freeze_slots(self, slots):
+        """
+        Gèle exactement `slots` (et dégèle les autres, restes d'un déplacement interrompu).
+        """
+        table = ShardSlot.__table__
+        with self.engine(GLOBAL).begin() as conn:
+            conn.execute(update(table).values(moving=table.c.slot.in_(list(slots))))
+        self._assignment = None
+
+    def assign_slot(self, slot, shard_id):
+        table = ShardSlot.__table__
+        with self.engine(GLOBAL).begin() as conn:
+            if not conn.execute(update(table).where(table.c.slot == slot)
+                                .values(shard=shard_id, moving=False)).rowcount:
+                conn.execute(insert(table).values(slot=slot, shard=shard_id))
+        self._assignment = None
+
+    def save_missing_slots(self):
+        """
+        Enregistre l'attribution par défaut des slots absents de shard_slot.
+        """
+        table = ShardSlot.__table__
+        with self.engine(GLOBAL).begin() as conn:
+            saved = set(conn.execute(select(table.c.slot)).scalars())
+            rows = [{'slot': slot, 'shard': shard} for slot, shard in enumerate(self.default_assignment())
+                    if slot not in saved]
+            if rows:
+                conn.execute(insert(table), rows)
+        self._assignment = None
+        return len(rows)
+
+    def shard_for_id(self, value):
+        return self.assignment()[value % self.slots]
+
+    def _reserve(self, name):
+        """
+        Réserve SHARD_ID_BLOCK valeurs de la séquence `name` (transaction courte
+        sur la base principale) : un aller-retour pour tout un bloc d'insertions.
+        """
+        table = ShardSequence.__table__
+        while True:
+            with self.engine(GLOBAL).begin() as conn:
+                end = conn.execute(
+                    update(table).where(table.c.name == name)
+                    .values(next_value=table.c.next_value + self.id_block)
+                    .returning(table.c.next_value)
+                ).scalar()
+            if end is not None:
+                return end - self.id_block
+            try:
+                with self.engine(GLOBAL).begin() as conn:
+                    conn.execute(insert(table).values(name=name, next_value=1 + self.id_block))
+                return 1
+            except IntegrityError:
+                # Séquence créée entre-temps par un autre processus
+                continue
+
+    def next_sequence(self, name):
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                start = self._reserve(name)
+                block = self._blocks[name] = [start, start + self.id_block]
+            block[0] += 1
+            return block[0] - 1
+
+    def advance_sequence(self, name, max_id):
+        """
+        Place la séquence `name` au-delà de l'identifiant `max_id` (après un
+        import : les identifiants importés ne sont pas réattribués).
+        """
+        table = ShardSequence.__table__
+        value = max_id // self.slots + 1
+        with self.engine(GLOBAL).begin() as conn:
+            advanced = conn.execute(update(table).where(table.c.name == name, table.c.next_value < value)
+                                    .values(next_value=value)).rowcount
+            if not advanced and conn.execute(select(table.c.name).where(table.c.name == name)).first() is None:
+                conn.execute(insert(table).values(name=name, next_value=value))
+        with self._lock:
+            self._blocks.pop(name, None)
+
+    def assign_id(self, instance):
+        sequence = self.next_sequence(instance.__table__.name)
+        if isinstance(instance, User):
+            slot = zlib.crc32(str(sequence).encode()) % self.slots
+        else:
+            slot = instance.user_id % self.slots
+        instance.id = sequence * self.slots + slot
+
+    def shard_chooser(self, mapper, instance, clause=None, **kw):
+        table = inspect(mapper).local_table if mapper is not None else statement_table(clause)
+        if table is None or table.name not in SHARDED_TABLES:
+            return GLOBAL
+        if instance is not None and instance.id is not None:
+            return self.shard_for_id(instance.id)
+        values = shard_key_values(clause, table) if clause is not None else None
+        if values is None or len({self.shard_for_id(value) for value in values}) != 1:
+            raise InvalidRequestError(f"Shard indéterminé pour une instruction sur {table.name}")
+        return self.shard_for_id(values[0])
+
+    def identity_chooser(self, mapper, primary_key, **kw):
+        if mapper.local_table.name not in SHARDED_TABLES:
+            return [GLOBAL]
+        return [self.shard_for_id(primary_key[0])]
+
+    def execute_chooser(self, orm_context):
+        """
+        Shards d'une instruction : ceux des clés fixées par le WHERE, tous sinon
+        (exécution successive, résultats concaténés ; voir dump_all pour les listes).
+        """
+        statement = orm_context.statement
+        table = statement_table(statement)
+        if table is None or table.name not in SHARDED_TABLES:
+            return [GLOBAL]
+        values = shard_key_values(statement, table, orm_context.parameters)
+        if orm_context.is_update or orm_context.is_delete or orm_context.is_insert:
+            self.check_writable(values or None)
+        if not values:
+            return self.shard_ids
+        return sorted({self.shard_for_id(value) for value in values})
+
+    def fan_out(self, statement, dump, key):
+        """
+        Exécute `statement` sur tous les shards en parallèle et fusionne les
+        résultats sérialisés, chacun déjà trié par `key`.
+        """
+        app = current_app._get_current_object()
+        futures = [self.executor.submit(_load_shard, app, self.engine(shard_id), statement, dump)
+                   for shard_id in self.shard_ids]
+        return list(merge(*(future.result() for future in futures), key=key))
+
+    def rows(self, statement):
+        """
+        Lignes de `statement` sur chaque shard, en parallèle : une liste par
+        shard, à fusionner par l'appelant (agrégats partiels, par exemple).
+        """
+        app = current_app._get_current_object()
+        futures = [self.executor.submit(_load_shard, app, self.engine(shard_id), statement, None)
+                   for shard_id in self.shard_ids]
+        return [future.result() for future in futures]
+
+
+def _load_shard(app, engine, statement, dump):
+    # Session propre au thread, liée à un seul shard
+    with app.app_context(), Session(engine) as session:
+        if dump is None:
+            return session.execute(statement).all()
+        return dump(session.scalars(statement).all())
+
+
+def dump_all(statement, schema):
+    """
+    Toutes les lignes de `statement` sérialisées par `schema` (many=True). Sur
+    une table répartie, les shards sont interrogés en parallèle, triés par
+    identifiant (ordre de création), et leurs résultats fusionnés.
+    """
+    router = current_app.extensions.get('shards')
+    model = statement.column_descriptions[0]['entity']
+    if router is None or model.__table__.name not in SHARDED_TABLES:
+        return schema.dump(db.session.scalars(statement).all())
+    return router.fan_out(statement.order_by(model.id), schema.dump, itemgetter('id'))
+
+
+def _assign_ids(session, flush_context, instances):
+    """
+    Avant chaque flush : identifiant (et donc shard) des nouvelles lignes
+    réparties, puis refus des écritures sur un slot gelé.
+    """
+    router = getattr(session, 'router', None)
+    if router is None:
+        return
+    for instance in session.new:
+        if isinstance(instance, SHARDED_MODELS) and instance.id is None:
+            router.assign_id(instance)
+    router.check_writable([instance.id for instance in (*session.new, *session.dirty, *session.deleted)
+                           if isinstance(instance, SHARDED_MODELS)])
+
+
+def reserve_identities(user_id, values):
+    """
+    Réserve pour `user_id` l'email et le nom d'utilisateur présents dans
+    `values` (table unique de la base principale, transaction courte) et
+    retourne les réservations créées. IdentityTaken si l'un est déjà
+    réservé par un autre utilisateur. Sans SHARD_URIS, rien à faire : les
+    contraintes de la table user suffisent.
+    """
+    router = current_app.extensions.get('shards')
+    wanted = {(kind, values[kind]) for kind in IDENTITY_MESSAGES if isinstance(values.get(kind), str)}
+    if router is None or not wanted:
+        return []
+    table = UserIdentity.__table__
+    key = tuple_(table.c.kind, table.c.value)
+    for attempt in range(2):
+        try:
+            with router.engine(GLOBAL).begin() as conn:
+                owners = dict(((kind, value), owner) for kind, value, owner in conn.execute(
+                    select(table.c.kind, table.c.value, table.c.user_id).where(key.in_(list(wanted)))))
+                for (kind, _), owner in sorted(owners.items()):
+                    if owner != user_id:
+                        raise IdentityTaken(kind)
+                claimed = sorted(wanted - set(owners))
+                if claimed:
+                    conn.execute(insert(table), [{'kind': kind, 'value': value, 'user_id': user_id}
+                                                 for kind, value in claimed])
+            return claimed
+        except IntegrityError:
+            # Réservée entre la lecture et l'insertion : la relecture désigne le champ pris
+            continue
+    raise IdentityTaken(sorted(wanted)[0][0])
+
+
+def release_identities(claimed=(), user_id=None, keep=None):
+    """
+    Libère les réservations `claimed`, ou celles de `user_id` (toutes, ou
+    seulement celles remplacées par les valeurs de `keep` après un changement).
+    """
+    router = current_app.extensions.get('shards')
+    if router is None:
+        return
+    table = UserIdentity.__table__
+    if user_id is None:
+        if not claimed:
+            return
+        condition = tuple_(table.c.kind, table.c.value).in_(list(claimed))
+    elif keep is None:
+        condition = table.c.user_id == user_id
+    else:
+        replaced = [(kind, keep[kind]) for kind in IDENTITY_MESSAGES if isinstance(keep.get(kind), str)]
+        if not replaced:
+            return
+        condition = and_(table.c.user_id == user_id, or_(*(
+            and_(table.c.kind == kind, table.c.value != value) for kind, value in replaced)))
+    with router.engine(GLOBAL).begin() as conn:
+        conn.execute(delete(table).where(condition))
+
+
+def update_identities(user_id, values, update_user):
+    """
+    Exécute `update_user()` (réponse de la route) en réservant d'abord les
+    nouveaux email et nom d'utilisateur de `values` ; après succès, les
+    anciens sont libérés, après échec les nouveaux.
+    """
+    claimed = reserve_identities(user_id, values)
+    if not claimed:
+        return update_user()
+    try:
+        response = update_user()
+    except BaseException:
+        release_identities(claimed)
+        raise
+    if response.status_code < 400:
+        release_identities(user_id=user_id, keep=values)
+    else:
+        release_identities(claimed)
+    return response
+
+
+def plan_rebalance(assignment, shard_ids):
+    """
+    Déplacements [(slot, source, cible)] répartissant les slots à parts égales
+    entre `shard_ids`, en déplaçant le moins de slots possible.
+    """
+    owned = {shard: [] for shard in shard_ids}
+    for slot, shard in enumerate(assignment):
+        if shard not in owned:
+            raise ValueError(f"Slot {slot} attribué à un shard absent de SHARD_URIS : {shard}")
+        owned[shard].append(slot)
+    base, extra = divmod(len(assignment), len(shard_ids))
+    # Les shards les plus chargés gardent les parts arrondies au-dessus
+    ordered = sorted(shard_ids, key=lambda shard: -len(owned[shard]))
+    quotas = {shard: base + (index < extra) for index, shard in enumerate(ordered)}
+    surplus = [(slot, shard) for shard in ordered for slot in owned[shard][quotas[shard]:]]
+    moves = []
+    for shard in ordered:
+        for _ in range(quotas[shard] - len(owned[shard])):
+            slot, source = surplus.pop()
+            moves.append((slot, source, shard))
+    return sorted(moves)
+
+
+def _delete_slot(engine, in_slot, batch_size):
+    # Enfants d'abord, par lots (transactions courtes)
+    for model in reversed(SHARDED_MODELS):
+        table = model.__table__
+        while True:
+            ids = select(table.c.id).where(in_slot(table)).limit(batch_size)
+            with engine.begin() as conn:
+                if conn.execute(delete(table).where(table.c.id.in_(ids))).rowcount < batch_size:
+                    break
+
+
+def copy_slot(router, slot, source, target, batch_size):
+    """
+    Copie les lignes d'un slot (suppressions logiques comprises) de `source`
+    vers `target`, puis lui attribue le slot, ce qui le dégèle : {table:
+    lignes copiées}. Le slot doit être gelé depuis SHARD_MAP_TTL secondes
+    (voir ShardRouter.freeze_slots) : plus aucun processus n'y écrit.
+    """
+    def in_slot(table):
+        return table.c.id % router.slots == slot
+
+    # Restes d'un déplacement interrompu
+    _delete_slot(router.engine(target), in_slot, batch_size)
+    copied = {}
+    for model in SHARDED_MODELS:
+        table = model.__table__
+        copied[table.name] = 0
+        last = None
+        while True:
+            query = select(table).where(in_slot(table)).order_by(table.c.id).limit(batch_size)
+            if last is not None:
+                query = query.where(table.c.id > last)
+            with router.engine(source).connect() as conn:
+                rows = [dict(row) for row in conn.execute(query).mappings()]
+            if not rows:
+                break
+            with router.engine(target).begin() as conn:
+                conn.execute(insert(table), rows)
+            copied[table.name] += len(rows)
+            last = rows[-1]['id']
+    router.assign_slot(slot, target)
+    return copied
+
+
+def _router():
+    router = current_app.extensions.get('shards')
+    if router is None:
+        raise click.ClickException("SHARD_URIS est vide : aucune répartition configurée.")
+    return router
+
+
+@shards_cli.command('init')
+def init_command():
+    """
+    Crée le schéma de chaque shard, enregistre l'attribution des nouveaux
+    slots et réserve l'email et le nom des utilisateurs existants.
+    """
+    router = _router()
+    metadata = shard_metadata()
+    for shard_id in router.shard_ids:
+        metadata.create_all(router.engine(shard_id))
+        click.echo(f"{shard_id} : schéma à jour")
+    click.echo(f"{router.save_missing_slots()} slots attribués")
+
+    users = User.__table__
+    reserved = 0
+    for rows in router.rows(select(users.c.id, users.c.email, users.c.username)):
+        for row in rows:
+            reserved += len(reserve_identities(row.id, {'email': row.email, 'username': row.username}))
+    click.echo(f"{reserved} identités réservées")
+
+
+@shards_cli.command('rebalance')
+@click.option('--dry-run', is_flag=True, help="Afficher les déplacements sans les exécuter.")
+@click.option('--batch-size', default=1000, show_default=True, help="Lignes copiées ou supprimées par lot.")
+@click.option('--grace', type=float, help="Attente après le gel des slots puis avant la suppression à la source "
+                                          "(SHARD_MAP_TTL par défaut).")
+def rebalance_command(dry_run, batch_size, grace):
+    """
+    Répartit les slots à parts égales entre les shards de SHARD_URIS (après
+    l'ajout d'un shard). Les slots à déplacer sont d'abord gelés : une fois
+    le gel relu par tous les processus, leurs écritures sont refusées (503)
+    et la copie ne peut rien manquer. Chaque slot est ensuite copié puis
+    réattribué, ce qui le dégèle ; les lignes source ne sont supprimées
+    qu'une fois l'attribution relue par les autres processus. Relancer la
+    commande reprend un rééquilibrage interrompu.
+    """
+    router = _router()
+    try:
+        moves = plan_rebalance(router.assignment(), router.shard_ids)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    if dry_run:
+        for slot, source, target in moves:
+            click.echo(f"slot {slot} : {source} -> {target}")
+        return
+    # Appelé même sans déplacement : dégèle les restes d'une exécution interrompue
+    router.freeze_slots([slot for slot, _, _ in moves])
+    if not moves:
+        click.echo("Slots déjà équilibrés")
+        return
+    grace = router.map_ttl if grace is None else grace
+    click.echo(f"{len(moves)} slots gelés, attente de {grace:g} s")
+    time.sleep(grace)
+    for slot, source, target in moves:
+        copied = copy_slot(router, slot, source, target, batch_size)
+        click.echo(f"slot {slot} : {source} -> {target} ("
+                   + ', '.join(f"{name} {count}" for name, count in copied.items()) + ")")
+    time.sleep(grace)
+    for slot, source, _ in moves:
+        _delete_slot(router.engine(source), lambda table, slot=slot: table.c.id % router.slots == slot, batch_size)
+    click.echo(f"{len(moves)} slots déplacés")
+
+
+def handle_slot_moving(error):
+    response = jsonify({"msg": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(current_app.extensions['shards'].map_ttl)
+    return response
+
+
+def handle_identity_taken(error):
+    return jsonify({"msg": IDENTITY_MESSAGES[error.kind]}), 400
+
+
+def init_sharding(app):
+    app.cli.add_command(shards_cli)
+    if not app.config['SHARD_URIS']:
+        return
+    app.extensions['shards'] = ShardRouter(app)
+    app.register_error_handler(SlotMovingError, handle_slot_moving)
+    app.register_error_handler(IdentityTaken, handle_identity_taken)
+    if not event.contains(Session, 'before_flush', _assign_ids):
+        event.listen(Session, 'before_flush', _assign_ids)
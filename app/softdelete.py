@@ -0,0 +1,198 @@
+import datetime
+import time
+
+import click
+from flask import abort, current_app, jsonify
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, exists, or_, select, update
+from sqlalchemy.orm import Session, with_loader_criteria
+from extensions import db
+from .models import SoftDeleteMixin, User, Post, Comment, Category
+from .sharding import release_identities
+
+purge_cli = AppGroup('purge', help="Purge des lignes supprimées logiquement.")
+
+# Ordre de purge : les tables référencées en dernier
+PURGE_ORDER = (Comment, Post, User)
+
+# Parents qu'une écriture peut désigner : modèle et message si absent
+PARENTS = {
+    'user_id': (User, "Utilisateur introuvable"),
+    'post_id': (Post, "Publication introuvable"),
+    'category_id': (Category, "Catégorie introuvable"),
+}
+
+
+def _hide_deleted(execute_state):
+    """
+    Critère global : toute requête ORM SELECT (y compris les chargements de
+    relations) ignore les lignes dont deleted_at est renseigné, sauf
+    execution_options(include_deleted=True).
+    """
+    if (execute_state.is_select
+            and not execute_state.is_column_load
+            and not execute_state.is_relationship_load
+            and not execute_state.execution_options.get('include_deleted', False)):
+        execute_state.statement = execute_state.statement.options(
+            with_loader_criteria(SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+def check_parents(data):
+    """
+    Refuse (400) une écriture qui rattache une ligne à un parent absent ou
+    supprimé logiquement (chargé via la session : _hide_deleted s'applique).
+    Un enfant actif sous un parent masqué empêcherait aussi sa purge.
+    """
+    for field, (model, msg) in PARENTS.items():
+        value = data.get(field) if isinstance(data, dict) else None
+        if isinstance(value, int) and db.session.get(model, value) is None:
+            response = jsonify({"msg": msg})
+            response.status_code = 400
+            abort(response)
+
+
+def _cascade(model, condition, now):
+    table = model.__table__
+    db.session.execute(
+        update(table)
+        .where(condition, table.c.deleted_at.is_(None))
+        .values(deleted_at=now, version=table.c.version + 1)
+    )
+
+
+def soft_delete(instance):
+    """
+    Marque une ligne comme supprimée ; la suppression d'une publication
+    masque aussi ses commentaires, celle d'un utilisateur ses publications,
+    ses commentaires et ceux laissés sous ses publications (une instruction
+    UPDATE par table).
+    """
+    now = datetime.datetime.now()
+    instance.deleted_at = now
+    comments = Comment.__table__
+    if isinstance(instance, Post):
+        _cascade(Comment, comments.c.post_id == instance.id, now)
+    elif isinstance(instance, User):
+        posts = Post.__table__
+        # Identifiants lus avant l'UPDATE : une sous-requête ne verrait que le shard de l'utilisateur
+        post_ids = db.session.execute(
+            select(posts.c.id).where(posts.c.user_id == instance.id, posts.c.deleted_at.is_(None))
+        ).scalars().all()
+        _cascade(Post, posts.c.user_id == instance.id, now)
+        _cascade(Comment, or_(comments.c.user_id == instance.id, comments.c.post_id.in_(post_ids)), now)
+
+
+def delete_instance(instance):
+    """
+    Suppression logique si SOFT_DELETE_ENABLED, suppression définitive sinon.
+    """
+    if current_app.config['SOFT_DELETE_ENABLED'] and isinstance(instance, SoftDeleteMixin):
+        soft_delete(instance)
+        db.session.commit()
+        return
+    user_id = instance.id if isinstance(instance, User) else None
+    db.session.delete(instance)
+    db.session.commit()
+    if user_id is not None:
+        release_identities(user_id=user_id)
+
+
+def _purgeable(model, cutoff):
+    table = model.__table__
+    condition = table.c.deleted_at < cutoff
+    # Ne jamais purger une ligne encore référencée par une ligne restante
+    for other in db.metadata.sorted_tables:
+        for fk in other.foreign_keys:
+            if fk.column.table is table:
+                condition &= ~exists().where(fk.parent == table.c.id)
+    return condition
+
+
+def _purge_batches(engine, table, condition, batch_size, pause, referenced=None):
+    """
+    Supprime sur `engine`, par lots de `batch_size` lignes (une transaction
+    courte par lot), les lignes qui vérifient `condition` ; `referenced(ids)`
+    désigne celles à conserver malgré tout. Retourne les identifiants supprimés.
+    """
+    purged, last = [], None
+    while True:
+        query = select(table.c.id).where(condition).order_by(table.c.id).limit(batch_size)
+        if last is not None:
+            query = query.where(table.c.id > last)
+        with engine.begin() as conn:
+            ids = conn.execute(query).scalars().all()
+            kept = referenced(ids) if referenced is not None and ids else set()
+            doomed = [id for id in ids if id not in kept]
+            if doomed:
+                conn.execute(delete(table).where(table.c.id.in_(doomed)))
+        purged.extend(doomed)
+        if len(ids) < batch_size:
+            return purged
+        last = ids[-1]
+        time.sleep(pause)
+
+
+def _referenced_on_other_shards(router, shard_id, table):
+    # Commentaires d'autres utilisateurs, rangés sur leur propre shard
+    def referenced(ids):
+        found = set()
+        for other in router.shard_ids:
+            if other == shard_id:
+                continue
+            for model in PURGE_ORDER:
+                for fk in model.__table__.foreign_keys:
+                    if fk.column.table is table and model.__table__ is not table:
+                        with router.engine(other).connect() as conn:
+                            found.update(conn.execute(select(fk.parent).where(fk.parent.in_(ids)).distinct())
+                                         .scalars())
+        return found
+    return referenced
+
+
+def purge_deleted(cutoff, batch_size, pause=0.0):
+    """
+    Supprime définitivement, par lots de `batch_size` lignes (une transaction
+    courte par lot), les lignes supprimées logiquement avant `cutoff`. Avec
+    SHARD_URIS, chaque shard est purgé à son tour ; une ligne encore
+    référencée depuis un autre shard est conservée.
+    """
+    router = current_app.extensions.get('shards')
+    purged = {}
+    for model in PURGE_ORDER:
+        table = model.__table__
+        condition = _purgeable(model, cutoff)
+        if router is None:
+            purged[table.name] = len(_purge_batches(db.engine, table, condition, batch_size, pause))
+            continue
+        purged[table.name] = 0
+        for shard_id in router.shard_ids:
+            ids = _purge_batches(router.engine(shard_id), table, condition, batch_size, pause,
+                                 _referenced_on_other_shards(router, shard_id, table))
+            purged[table.name] += len(ids)
+            if model is User:
+                for id in ids:
+                    release_identities(user_id=id)
+    return purged
+
+
+@purge_cli.command('deleted')
+@click.option('--older-than', 'days', type=int, help="Rétention en jours (SOFT_DELETE_RETENTION_DAYS par défaut).")
+@click.option('--batch-size', type=int, help="Lignes par lot (SOFT_DELETE_PURGE_BATCH par défaut).")
+@click.option('--pause', default=0.1, show_default=True, help="Pause entre deux lots, en secondes.")
+def purge_command(days, batch_size, pause):
+    """
+    Purge définitive des lignes supprimées (à planifier hors des heures de pointe).
+    """
+    config = current_app.config
+    days = config['SOFT_DELETE_RETENTION_DAYS'] if days is None else days
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+    purged = purge_deleted(cutoff, batch_size or config['SOFT_DELETE_PURGE_BATCH'], pause)
+    for name, count in purged.items():
+        click.echo(f"{name} : {count} lignes purgées")
+
+
+def init_soft_delete(app):
+    app.cli.add_command(purge_cli)
+    if not event.contains(Session, 'do_orm_execute', _hide_deleted):
+        event.listen(Session, 'do_orm_execute', _hide_deleted)
@@ -0,0 +1,316 @@
+import datetime
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import click
+from flask import Blueprint, current_app, jsonify, request
+from flask.cli import AppGroup
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func, select
+from extensions import db
+from .models import User, Post, Comment, Category, StatsRollup
+
+stats_bp = Blueprint('stats', __name__)
+stats_cli = AppGroup('stats', help="Statistiques agrégées.")
+
+BUCKETS = ('day', 'week', 'month')
+
+
+class TTLCache:
+    """
+    Cache clé/valeur en mémoire avec expiration, borné à `max_size` entrées :
+    les moins récemment lues sont évincées en premier.
+    """
+
+    def __init__(self, ttl, max_size=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            # Les entrées expirées jamais relues (paramètres variés) finissent en tête et sont évincées d'abord
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _date_bucket(column, bucket):
+    """
+    Expression SQL tronquant une date au jour, à la semaine (lundi) ou au mois.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        return func.date_trunc(bucket, column)
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.strftime('%Y-%m-01' if bucket == 'month' else '%Y-%m-%d', column)
+
+
+def _period(value):
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    return str(value)
+
+
+def _shard_rows(statement):
+    """
+    Lignes de `statement` sur chaque shard (avec SHARD_URIS), à fusionner :
+    None si les données ne sont pas réparties.
+    """
+    router = current_app.extensions.get('shards')
+    return None if router is None else [row for rows in router.rows(statement) for row in rows]
+
+
+def _summed(rows):
+    # Somme des comptes partiels (dernière colonne) par clé (premières colonnes)
+    counts = Counter()
+    for row in rows:
+        counts[tuple(row[:-1])] += row[-1]
+    return counts
+
+
+def posts_per_category():
+    count = func.count(Post.id).label('count')
+    partial = _shard_rows(select(Post.category_id, count).group_by(Post.category_id))
+    if partial is not None:
+        counts = {key[0]: value for key, value in _summed(partial).items()}
+        ids = [id for id in counts if id is not None]
+        names = dict(db.session.execute(select(Category.id, Category.name).where(Category.id.in_(ids))).all())
+        rows = sorted(counts.items(), key=lambda item: (-item[1], item[0] is not None, item[0] or 0))
+        return [{'category_id': id, 'name': names.get(id), 'count': value} for id, value in rows]
+
+    statement = (
+        select(Post.category_id, Category.name, count)
+        .outerjoin(Category, Post.category_id == Category.id)
+        .group_by(Post.category_id, Category.name)
+        .order_by(count.desc(), Post.category_id)
+    )
+    return [{'category_id': row.category_id, 'name': row.name, 'count': row.count}
+            for row in db.session.execute(statement)]
+
+
+def posts_per_period(bucket='day', since=None, until=None):
+    period = _date_bucket(Post.date_posted, bucket).label('period')
+    statement = select(period, func.count(Post.id).label('count')).group_by(period).order_by(period)
+    if since is not None:
+        statement = statement.where(Post.date_posted >= since)
+    if until is not None:
+        statement = statement.where(Post.date_posted < until)
+    partial = _shard_rows(statement)
+    if partial is not None:
+        counts = _summed((_period(row.period), row.count) for row in partial)
+        return [{'period': key[0], 'count': value} for key, value in sorted(counts.items())]
+    return [{'period': _period(row.period), 'count': row.count} for row in db.session.execute(statement)]
+
+
+def top_commenters(limit=10):
+    count = func.count(Comment.id).label('count')
+    statement = (
+        select(User.id, User.username, count)
+        .join(Comment, Comment.user_id == User.id)
+        .group_by(User.id, User.username)
+        .order_by(count.desc(), User.id)
+        .limit(limit)
+    )
+    # Les commentaires d'un utilisateur sont tous sur son shard : les meilleurs de chaque shard suffisent
+    rows = _shard_rows(statement)
+    if rows is not None:
+        rows = sorted(rows, key=lambda row: (-row.count, row.id))[:limit]
+    else:
+        rows = db.session.execute(statement)
+    return [{'user_id': row.id, 'username': row.username, 'count': row.count} for row in rows]
+
+
+def comments_per_post(limit=10):
+    count = func.count(Comment.id).label('count')
+    # Les commentaires d'une publication sont répartis sur les shards de leurs auteurs
+    partial = _shard_rows(select(Comment.post_id, count).group_by(Comment.post_id))
+    if partial is not None:
+        counts = {key[0]: value for key, value in _summed(partial).items()}
+        titles = dict(db.session.execute(select(Post.id, Post.title).where(Post.id.in_(list(counts)))).all())
+        if len(titles) < limit:
+            # Publications sans commentaire, comme la jointure externe ci-dessous
+            for rows in current_app.extensions['shards'].rows(select(Post.id, Post.title).order_by(Post.id).limit(limit)):
+                titles.update((row.id, row.title) for row in rows if row.id not in titles)
+        rows = sorted(((id, counts.get(id, 0)) for id in titles), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{'post_id': id, 'title': titles[id], 'count': value} for id, value in rows]
+
+    statement = (
+        select(Post.id, Post.title, count)
+        .outerjoin(Comment, Comment.post_id == Post.id)
+        .group_by(Post.id, Post.title)
+        .order_by(count.desc(), Post.id)
+        .limit(limit)
+    )
+    return [{'post_id': row.id, 'title': row.title, 'count': row.count}
+            for row in db.session.execute(statement)]
+
+
+STATS = {
+    'posts-per-category': posts_per_category,
+    'posts-per-period': posts_per_period,
+    'top-commenters': top_commenters,
+    'comments-per-post': comments_per_post,
+}
+
+# Paramètres par défaut précalculés par `flask stats refresh`
+ROLLUP_DEFAULTS = {
+    'posts-per-category': {},
+    'posts-per-period': {'bucket': 'day'},
+    'top-commenters': {'limit': 10},
+    'comments-per-post': {'limit': 10},
+}
+
+
+def _params_key(params):
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _bad_request(msg):
+    return jsonify({"msg": msg}), 400
+
+
+def _limit_arg():
+    limit = request.args.get('limit', 10, type=int)
+    if limit is None or limit < 1:
+        return None
+    return min(limit, current_app.config['STATS_MAX_LIMIT'])
+
+
+def _date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.datetime.combine(datetime.date.fromisoformat(value), datetime.time.min)
+
+
+def _serve(name, params):
+    """
+    Sert une statistique depuis la table de cumul, le cache TTL ou la base.
+    """
+    key = _params_key(params)
+    cache = current_app.extensions['stats_cache']
+
+    source, data = 'cache', cache.get((name, key))
+    if data is None and current_app.config['STATS_USE_ROLLUP']:
+        rollup = db.session.get(StatsRollup, (name, key))
+        max_age = datetime.timedelta(seconds=current_app.config['STATS_ROLLUP_MAX_AGE'])
+        if rollup is not None and datetime.datetime.now() - rollup.refreshed_at <= max_age:
+            source, data = 'rollup', json.loads(rollup.payload)
+    if data is None:
+        source, data = 'live', STATS[name](**params)
+    if source != 'cache':
+        cache.set((name, key), data)
+
+    response = jsonify(data)
+    response.headers['X-Stats-Source'] = source
+    response.cache_control.max_age = current_app.config['STATS_CACHE_TTL']
+    return response
+
+
+@stats_bp.route('/posts-per-category', methods=['GET'])
+@jwt_required()
+def get_posts_per_category():
+    """
+    Nombre de publications par catégorie
+    """
+    return _serve('posts-per-category', {})
+
+
+@stats_bp.route('/posts-per-period', methods=['GET'])
+@jwt_required()
+def get_posts_per_period():
+    """
+    Nombre de publications par jour, semaine ou mois (?bucket=&since=&until=)
+    """
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        return _bad_request(f"bucket doit valoir {', '.join(BUCKETS)}")
+    try:
+        since, until = _date_arg('since'), _date_arg('until')
+    except ValueError:
+        return _bad_request("Les dates doivent être au format AAAA-MM-JJ")
+    params = {'bucket': bucket}
+    if since is not None:
+        params['since'] = since
+    if until is not None:
+        params['until'] = until
+    return _serve('posts-per-period', params)
+
+
+@stats_bp.route('/top-commenters', methods=['GET'])
+@jwt_required()
+def get_top_commenters():
+    """
+    Utilisateurs ayant le plus commenté (?limit=)
+    """
+    limit = _limit_arg()
+    if limit is None:
+        return _bad_request("limit doit être un entier positif")
+    return _serve('top-commenters', {'limit': limit})
+
+
+@stats_bp.route('/comments-per-post', methods=['GET'])
+@jwt_required()
+def get_comments_per_post():
+    """
+    Publications les plus commentées (?limit=)
+    """
+    limit = _limit_arg()
+    if limit is None:
+        return _bad_request("limit doit être un entier positif")
+    return _serve('comments-per-post', {'limit': limit})
+
+
+def refresh_rollups():
+    """
+    Recalcule les statistiques par défaut et les enregistre dans stats_rollup.
+    """
+    now = datetime.datetime.now()
+    for name, params in ROLLUP_DEFAULTS.items():
+        db.session.merge(StatsRollup(
+            name=name,
+            params=_params_key(params),
+            payload=json.dumps(STATS[name](**params)),
+            refreshed_at=now,
+        ))
+    db.session.commit()
+    return len(ROLLUP_DEFAULTS)
+
+
+@stats_cli.command('refresh')
+def refresh_command():
+    """
+    Rafraîchit la table de cumul (à planifier, ex. cron toutes les minutes).
+    """
+    click.echo(f"{refresh_rollups()} statistiques rafraîchies.")
+
+
+def init_stats(app):
+    app.extensions['stats_cache'] = TTLCache(app.config['STATS_CACHE_TTL'], app.config['STATS_CACHE_MAX_ENTRIES'])
+    app.register_blueprint(stats_bp, url_prefix='/stats')
+    app.cli.add_command(stats_cli)
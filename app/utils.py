@@ -1,4 +1,22 @@
 from flasgger import Swagger
 
-def setup_swagger(app):
-    Swagger(app)
+
+class LazySwagger(Swagger):
+    """
+    Swagger dont le fichier de spécification n'est lu qu'à la première
+    requête sur /apispec.json, et non au démarrage de l'application.
+    """
+
+    def init_app(self, app, decorators=None):
+        template_file, self.template_file = self.template_file, None
+        super().init_app(app, decorators)
+        self.template_file = template_file
+
+    def get_apispecs(self, endpoint='apispec_1'):
+        if self.template is None and self.template_file is not None:
+            self.template = self.load_swagger_file(self.template_file)
+        return super().get_apispecs(endpoint)
+
+
+def setup_swagger(app, template_file='Schemas/swagger.json'):
+    return LazySwagger(app, template_file=template_file)
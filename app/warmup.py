@@ -0,0 +1,62 @@
+from flask import current_app
+from sqlalchemy.orm import configure_mappers
+from extensions import db
+from .compression import precompress_assets
+
+
+def warm_schemas():
+    """
+    Instancie chaque schéma et sérialise un objet vide pour initialiser
+    les champs générés par marshmallow-sqlalchemy.
+    """
+    from .models import User, Post, Comment, Category
+    from .schemas import UserSchema, PostSchema, CommentSchema, CategorySchema
+
+    for schema_class, model in ((UserSchema, User), (PostSchema, Post),
+                                (CommentSchema, Comment), (CategorySchema, Category)):
+        schema_class().dump(model())
+        schema_class(many=True).dump([])
+
+
+def warm_templates(app):
+    """
+    Compile les templates Jinja une fois pour toutes (cache de l'environnement).
+    """
+    for name in app.config['WARMUP_TEMPLATES']:
+        app.jinja_env.get_template(name)
+
+
+def warmup(app):
+    """
+    Prépare l'application avant le fork des workers : mappers, schémas,
+    templates et ressources précompressées sont construits une seule fois
+    dans le processus maître et partagés en copy-on-write.
+    Aucune connexion à la base n'est ouverte ici.
+    """
+    with app.app_context():
+        configure_mappers()
+        warm_schemas()
+        warm_templates(app)
+        if app.config['COMPRESS_ENABLED'] and not app.extensions['compression']:
+            precompress_assets(app)
+
+
+def prime_connection_pool(app, size=None):
+    """
+    À appeler dans chaque worker après le fork : abandonne les connexions
+    héritées du maître sans les fermer (elles appartiennent au maître),
+    puis ouvre `size` connexions pour que les premières requêtes
+    n'attendent pas l'établissement d'une connexion. Avec SHARD_URIS, le
+    pool de chaque shard est préparé de la même façon.
+    """
+    with app.app_context():
+        size = current_app.config['WARMUP_POOL_SIZE'] if size is None else size
+        router = current_app.extensions.get('shards')
+        engines = [db.engine] + ([router.engine(shard_id) for shard_id in router.shard_ids] if router else [])
+        connections = []
+        for engine in engines:
+            engine.dispose(close=False)
+            connections.extend(engine.connect() for _ in range(size))
+        for connection in connections:
+            connection.close()
+        return len(connections)
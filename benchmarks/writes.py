@@ -0,0 +1,66 @@
+"""
+Débit d'écriture (écritures/s) de POST /posts et POST /comments.
+
+    python benchmarks/writes.py --requests 2000
+
+La base est une SQLite en mémoire (ou SQLALCHEMY_DATABASE_URI) ; la
+limitation de débit et le journal des requêtes lentes sont désactivés
+pour ne mesurer que le chemin d'écriture.
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///:memory:')
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from app import create_app, db  # noqa: E402
+from app.models import User, Category  # noqa: E402
+
+
+def setup():
+    app = create_app({
+        'TESTING': True,
+        'RATELIMIT_ENABLED': False,
+        'SLOW_QUERY_ENABLED': False,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(username="bench", email="bench@example.com", password="x"),
+                            Category(name="Benchmark")])
+        db.session.commit()
+        headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+    return app, headers
+
+
+def measure(client, path, payload, headers, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        response = client.post(path, json=payload, headers=headers)
+        assert response.status_code == 201, response.get_data(as_text=True)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    args = parser.parse_args()
+
+    app, headers = setup()
+    client = app.test_client()
+    post = {"title": "Benchmark", "content": "Contenu de la publication " * 20, "user_id": 1, "category_id": 1}
+    comment = {"content": "Un commentaire de test", "user_id": 1, "post_id": 1}
+
+    measure(client, '/posts', post, headers, args.warmup)
+    measure(client, '/comments', comment, headers, args.warmup)
+    for path, payload in (('/posts', post), ('/comments', comment)):
+        rate = measure(client, path, payload, headers, args.requests)
+        print(f"POST {path:<10} {rate:8.0f} écritures/s ({args.requests} requêtes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,113 @@
-from dotenv import load_dotenv
 import os
 
-load_dotenv()
+# Chargement du .env sans recherche dans l'arborescence ni import inutile de dotenv
+_DOTENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+if os.path.exists(_DOTENV_PATH):
+    from dotenv import load_dotenv
+    load_dotenv(_DOTENV_PATH)
 
 class Config:
     FLASK_APP=os.getenv("FLASK_APP")
     FLASK_DEBUG=os.getenv("FLASK_DEBUG")
     FLASK_ENV=os.getenv("FLASK_ENV")
     SQLALCHEMY_DATABASE_URI=os.getenv("SQLALCHEMY_DATABASE_URI")
+
+    # Démarrage optimisé : imports lourds différés, compression des ressources au premier accès
+    STARTUP_OPTIMIZED = os.getenv("STARTUP_OPTIMIZED", "false").lower() == "true"
+    # Préchauffage des workers (voir gunicorn.conf.py)
+    WARMUP_TEMPLATES = ['index.html']
+    WARMUP_POOL_SIZE = int(os.getenv("WARMUP_POOL_SIZE", 2))
+
+    # Limitation de débit : seaux à jetons par client (identité JWT ou IP),
+    # règles par route ("blueprint.fonction") ou par blueprint, "" pour exempter
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_STORAGE = os.getenv("RATELIMIT_STORAGE")  # "module:Classe", mémoire par défaut
+    RATELIMIT_MAX_KEYS = int(os.getenv("RATELIMIT_MAX_KEYS", 100000))
+    RATELIMIT_DEFAULT = os.getenv("RATELIMIT_DEFAULT", "300/minute")
+    RATELIMIT_LIMITS = {
+        'auth.login': os.getenv("RATELIMIT_LOGIN", "10/minute"),
+        'auth.register': os.getenv("RATELIMIT_REGISTER", "10/minute"),
+        'api.get_comments': os.getenv("RATELIMIT_COMMENTS_LIST", "60/minute"),
+    }
+    # Plafond de requêtes simultanées par processus (0 = désactivé) ;
+    # à régler sous la taille du pool SQLAlchemy (pool_size + max_overflow)
+    RATELIMIT_MAX_IN_FLIGHT = int(os.getenv("RATELIMIT_MAX_IN_FLIGHT", 0))
+    RATELIMIT_SHED_RETRY_AFTER = int(os.getenv("RATELIMIT_SHED_RETRY_AFTER", 1))
+    # Connexions longues (SSE) non comptées dans le plafond
+    RATELIMIT_IN_FLIGHT_EXEMPT = ['events.stream_events']
+
+    # Journal des requêtes SQL lentes (rapport : flask queries report)
+    SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+    # NDJSON partagé par les workers ; instance/slow_queries.ndjson par défaut, "" pour désactiver
+    SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE")
+    SLOW_QUERY_REDACT_PARAMS = os.getenv("SLOW_QUERY_REDACT_PARAMS", "true").lower() == "true"
+    # Proportion de requêtes lentes dont le plan est capturé (PostgreSQL, SELECT uniquement)
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0))
+    SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "true").lower() == "true"
+
+    # Statistiques (/stats) : cache TTL et table de cumul rafraîchie par `flask stats refresh`
+    STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", 60))
+    STATS_CACHE_MAX_ENTRIES = int(os.getenv("STATS_CACHE_MAX_ENTRIES", 1024))
+    STATS_MAX_LIMIT = int(os.getenv("STATS_MAX_LIMIT", 100))
+    STATS_USE_ROLLUP = os.getenv("STATS_USE_ROLLUP", "false").lower() == "true"
+    STATS_ROLLUP_MAX_AGE = int(os.getenv("STATS_ROLLUP_MAX_AGE", 300))
+
+    # Nombre maximal d'identifiants par requête groupée (?ids=1,2,3)
+    BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", 100))
+
+    # Endpoint /batch : nombre de sous-requêtes par lot, lectures exécutées en parallèle
+    # (tous lots confondus) et part maximale de ces threads occupée par un même lot
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", 20))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 4))
+    BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", 2))
+
+    # Flux SSE /events : taille du tampon de reprise (Last-Event-ID), battement et
+    # durée maximale d'une connexion avant reconnexion du client
+    EVENTS_BUFFER_SIZE = int(os.getenv("EVENTS_BUFFER_SIZE", 1000))
+    EVENTS_HEARTBEAT = int(os.getenv("EVENTS_HEARTBEAT", 15))
+    EVENTS_MAX_DURATION = int(os.getenv("EVENTS_MAX_DURATION", 300))
+    # Flux SSE simultanés par worker (503 au-delà, 0 = sans limite). Avec gthread,
+    # chaque abonné occupe un des GUNICORN_THREADS threads : garder la limite bien
+    # en dessous pour que les requêtes de l'API trouvent toujours un thread libre.
+    # Sans limite par défaut avec gevent, où un abonné inactif ne coûte qu'une greenlet.
+    EVENTS_MAX_STREAMS = int(os.getenv(
+        "EVENTS_MAX_STREAMS",
+        0 if os.getenv("GUNICORN_WORKER_CLASS") == "gevent" else int(os.getenv("GUNICORN_THREADS", 32)) // 4))
+
+    # Suppressions logiques (deleted_at) et purge différée (`flask purge deleted`)
+    SOFT_DELETE_ENABLED = os.getenv("SOFT_DELETE_ENABLED", "true").lower() == "true"
+    SOFT_DELETE_RETENTION_DAYS = int(os.getenv("SOFT_DELETE_RETENTION_DAYS", 30))
+    SOFT_DELETE_PURGE_BATCH = int(os.getenv("SOFT_DELETE_PURGE_BATCH", 1000))
+
+    # Cache des lignes lues par clé primaire : LRU du processus (TTL court, borne
+    # la péremption entre workers) devant un cache partagé optionnel ("module:Classe")
+    ENTITY_CACHE_ENABLED = os.getenv("ENTITY_CACHE_ENABLED", "true").lower() == "true"
+    ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", 10000))
+    ENTITY_CACHE_TTL = int(os.getenv("ENTITY_CACHE_TTL", 5))
+    ENTITY_CACHE_SHARED = os.getenv("ENTITY_CACHE_SHARED")
+    ENTITY_CACHE_SHARED_TTL = int(os.getenv("ENTITY_CACHE_SHARED_TTL", 300))
+    ENTITY_CACHE_LOCK_TIMEOUT = float(os.getenv("ENTITY_CACHE_LOCK_TIMEOUT", 5))
+
+    # Partitions mensuelles de comment (PostgreSQL) : mois créés d'avance et
+    # rétention en mois (vide : aucune partition détachée)
+    PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+    PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", 0)) or None
+
+    # Répartition par utilisateur (vide : une seule base) : URI des shards séparées par
+    # des virgules, slots de hachage (fixés au déploiement), identifiants réservés par
+    # bloc, relecture de l'attribution des slots et lectures parallèles (0 : une par shard)
+    SHARD_URIS = [uri for uri in os.getenv("SHARD_URIS", "").split(",") if uri]
+    SHARD_SLOTS = int(os.getenv("SHARD_SLOTS", 256))
+    SHARD_ID_BLOCK = int(os.getenv("SHARD_ID_BLOCK", 100))
+    SHARD_MAP_TTL = int(os.getenv("SHARD_MAP_TTL", 30))
+    SHARD_FANOUT_WORKERS = int(os.getenv("SHARD_FANOUT_WORKERS", 0))
+
+    # Taille maximale d'un corps de requête (413 au-delà)
+    MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", 1024 * 1024))
+
+    # Documentation Swagger (flasgger n'est importé que si elle est activée)
+    DOCS_ENABLED = os.getenv("DOCS_ENABLED", "true").lower() == "true"
     SWAGGER = {
     'title': 'Ferrand MALELA API avec Flask et Swagger',
     'uiversion': 3,
@@ -33,4 +133,19 @@ class Config:
 
     JWT_SECRET_KEY = 'your-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = 3600
-    JWT_REFRESH_TOKEN_EXPIRES = 86400
\ No newline at end of file
+    JWT_REFRESH_TOKEN_EXPIRES = 86400
+
+    # Compression des réponses (gzip, ou brotli si le paquet est installé)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    COMPRESS_BR_LEVEL = int(os.getenv("COMPRESS_BR_LEVEL", 4))
+    COMPRESS_MIMETYPES = [
+        'application/json',
+        'text/html',
+        'text/css',
+        'text/plain',
+        'application/javascript',
+    ]
+    # Réponses statiques générées et compressées une seule fois au démarrage
+    COMPRESS_PRECOMPRESS_ENDPOINTS = ['api.accueil', 'flasgger.apispec', 'flasgger.apidocs']
\ No newline at end of file
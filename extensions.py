@@ -1,9 +1,53 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from flask_sqlalchemy.session import Session
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import Session as BaseSession
 
-db = SQLAlchemy()
-migrate = Migrate()
+
+class RoutingSession(ShardedSession, Session):
+    """
+    Session de `db` : celle de Flask-SQLAlchemy sans SHARD_URIS ; sinon chaque
+    instruction est envoyée au shard choisi par le routeur de app.sharding.
+    """
+
+    def __init__(self, db, **kwargs):
+        self.router = current_app.extensions.get('shards') if has_app_context() else None
+        if self.router is None:
+            Session.__init__(self, db, **kwargs)
+            # Pas de connexion choisie ligne à ligne au flush
+            self.connection_callable = None
+        else:
+            ShardedSession.__init__(self, self.router.shard_chooser, self.router.identity_chooser,
+                                    self.router.execute_chooser, db=db, **kwargs)
+
+    def _identity_lookup(self, mapper, primary_key_identity, identity_token=None, **kw):
+        if self.router is None:
+            return BaseSession._identity_lookup(self, mapper, primary_key_identity,
+                                                identity_token=identity_token, **kw)
+        return ShardedSession._identity_lookup(self, mapper, primary_key_identity,
+                                               identity_token=identity_token, **kw)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, shard_id=None, instance=None, **kwargs):
+        if self.router is None or bind is not None:
+            return Session.get_bind(self, mapper, clause=clause, bind=bind, **kwargs)
+        if shard_id is None:
+            shard_id = (self._choose_shard_and_assign(mapper, instance, clause=clause) if instance is not None
+                        else self.router.shard_chooser(mapper, None, clause=clause))
+        return self.router.engine(shard_id)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
-ma = Marshmallow()
\ No newline at end of file
+ma = Marshmallow()
+
+
+def __getattr__(name):
+    # Flask-Migrate importe alembic (~100 ms) : il n'est chargé qu'à la première utilisation
+    if name == 'migrate':
+        from flask_migrate import Migrate
+        globals()['migrate'] = Migrate()
+        return globals()['migrate']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
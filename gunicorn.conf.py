@@ -0,0 +1,43 @@
+# Configuration gunicorn : gunicorn -c gunicorn.conf.py run:app
+import gc
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", 2 * os.cpu_count() + 1))
+# Le flux SSE /events garde une connexion ouverte par client : un worker sync
+# serait bloqué par un seul abonné. gthread sert chaque connexion dans l'un des
+# GUNICORN_THREADS threads du worker ; EVENTS_MAX_STREAMS (GUNICORN_THREADS / 4
+# par défaut) borne les flux par worker pour laisser des threads à l'API, soit
+# workers x EVENTS_MAX_STREAMS abonnés au total. Pour des milliers d'abonnés,
+# utiliser gevent (GUNICORN_WORKER_CLASS=gevent, voir requirements.txt) : un
+# abonné inactif n'y coûte qu'une greenlet, dans la limite de worker_connections.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 0))
+
+# L'application est chargée une seule fois dans le maître, puis partagée
+# en copy-on-write avec les workers.
+preload_app = True
+
+
+def when_ready(server):
+    """
+    Maître : préchauffe l'application puis gèle les objets existants pour
+    que le ramasse-miettes ne les touche plus (sinon chaque collecte dans un
+    worker écrit dans leurs en-têtes et duplique les pages mémoire).
+    """
+    from app.warmup import warmup
+
+    warmup(server.app.wsgi())
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """
+    Worker : remplace les connexions héritées du maître par un pool neuf.
+    """
+    from app.warmup import prime_connection_pool
+
+    prime_connection_pool(server.app.wsgi())
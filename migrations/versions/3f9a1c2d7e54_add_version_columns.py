@@ -0,0 +1,30 @@
+"""Add version columns for optimistic concurrency.
+
+Revision ID: 3f9a1c2d7e54
+Revises: b8d834284e1e
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2d7e54'
+down_revision = 'b8d834284e1e'
+branch_labels = None
+depends_on = None
+
+TABLES = ('user', 'post', 'comment', 'category')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
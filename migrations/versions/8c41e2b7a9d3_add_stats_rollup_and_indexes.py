@@ -0,0 +1,47 @@
+"""Add stats rollup table and aggregation indexes.
+
+Revision ID: 8c41e2b7a9d3
+Revises: 3f9a1c2d7e54
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e2b7a9d3'
+down_revision = '3f9a1c2d7e54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stats_rollup',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('params', sa.String(length=200), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'params')
+    )
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_post_date_posted'), ['date_posted'], unique=False)
+        batch_op.create_index(batch_op.f('ix_post_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_post_category_id'), ['category_id'], unique=False)
+
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_comment_user_id'), ['user_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_comment_post_id'), ['post_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comment', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comment_post_id'))
+        batch_op.drop_index(batch_op.f('ix_comment_user_id'))
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_post_category_id'))
+        batch_op.drop_index(batch_op.f('ix_post_user_id'))
+        batch_op.drop_index(batch_op.f('ix_post_date_posted'))
+
+    op.drop_table('stats_rollup')
@@ -0,0 +1,34 @@
+"""Add shard id sequences and slot assignment tables.
+
+Revision ID: a3d8f6b2c9e4
+Revises: f4b9c3d1e7a2
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d8f6b2c9e4'
+down_revision = 'f4b9c3d1e7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('shard_sequence',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('shard_slot',
+    sa.Column('slot', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('shard', sa.String(length=50), nullable=False),
+    sa.PrimaryKeyConstraint('slot')
+    )
+
+
+def downgrade():
+    op.drop_table('shard_slot')
+    op.drop_table('shard_sequence')
@@ -0,0 +1,70 @@
+"""Add post excerpt, word count and reading time.
+
+Revision ID: c5d7f1a2b8e6
+Revises: 8c41e2b7a9d3
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import math
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d7f1a2b8e6'
+down_revision = '8c41e2b7a9d3'
+branch_labels = None
+depends_on = None
+
+# Copie figée de app.models.summarize au moment de la migration
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+BATCH_SIZE = 1000
+
+
+def summarize(content):
+    words = content.split()
+    text = ' '.join(words)
+    excerpt = text
+    if len(text) > EXCERPT_LENGTH:
+        cut = text[:EXCERPT_LENGTH + 1]
+        cut = cut.rsplit(' ', 1)[0] if ' ' in cut else text[:EXCERPT_LENGTH]
+        excerpt = cut.rstrip('.,;:!?') + '…'
+    return {
+        'excerpt': excerpt,
+        'word_count': len(words),
+        'reading_time': max(1, math.ceil(len(words) / WORDS_PER_MINUTE)),
+    }
+
+
+def upgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('excerpt', sa.String(length=201), nullable=True))
+        batch_op.add_column(sa.Column('word_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('reading_time', sa.Integer(), nullable=True))
+
+    # Calcul des colonnes pour les publications existantes, par lots
+    post = sa.table('post', sa.column('id', sa.Integer), sa.column('content', sa.Text),
+                    sa.column('excerpt', sa.String), sa.column('word_count', sa.Integer),
+                    sa.column('reading_time', sa.Integer))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(post.c.id, post.c.content).where(post.c.id > last_id).order_by(post.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            post.update().where(post.c.id == sa.bindparam('post_id')),
+            [{'post_id': row.id, **summarize(row.content)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_column('reading_time')
+        batch_op.drop_column('word_count')
+        batch_op.drop_column('excerpt')
@@ -0,0 +1,35 @@
+"""Add shard_slot.moving and the user_identity reservation table.
+
+Revision ID: d7e3a9c1f5b8
+Revises: a3d8f6b2c9e4
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3a9c1f5b8'
+down_revision = 'a3d8f6b2c9e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shard_slot', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('moving', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+    op.create_table('user_identity',
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=120), nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=True),
+    sa.PrimaryKeyConstraint('kind', 'value')
+    )
+
+
+def downgrade():
+    op.drop_table('user_identity')
+
+    with op.batch_alter_table('shard_slot', schema=None) as batch_op:
+        batch_op.drop_column('moving')
@@ -0,0 +1,52 @@
+"""Add deleted_at columns and partial indexes on active rows.
+
+The partial indexes on post replace the full ix_post_date_posted and
+ix_post_user_id indexes created by 8c41e2b7a9d3.
+
+Revision ID: e2a8b4c6d9f1
+Revises: c5d7f1a2b8e6
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8b4c6d9f1'
+down_revision = 'c5d7f1a2b8e6'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('deleted_at IS NULL')
+
+
+def upgrade():
+    for table in ('user', 'post', 'comment'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    op.create_index('ix_post_active_date_posted', 'post', ['date_posted'], unique=False,
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+    op.create_index('ix_post_active_user_id', 'post', ['user_id'], unique=False,
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+    op.create_index('ix_comment_active_post_id', 'comment', ['post_id', 'date_commented'], unique=False,
+                    postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_user_id')
+        batch_op.drop_index('ix_post_date_posted')
+
+
+def downgrade():
+    with op.batch_alter_table('post', schema=None) as batch_op:
+        batch_op.create_index('ix_post_date_posted', ['date_posted'], unique=False)
+        batch_op.create_index('ix_post_user_id', ['user_id'], unique=False)
+
+    op.drop_index('ix_comment_active_post_id', table_name='comment')
+    op.drop_index('ix_post_active_user_id', table_name='post')
+    op.drop_index('ix_post_active_date_posted', table_name='post')
+
+    for table in ('comment', 'post', 'user'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('deleted_at')
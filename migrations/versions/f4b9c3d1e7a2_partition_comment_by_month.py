@@ -0,0 +1,114 @@
+"""Partition the comment table by month of date_commented (PostgreSQL).
+
+Revision ID: f4b9c3d1e7a2
+Revises: e2a8b4c6d9f1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b9c3d1e7a2'
+down_revision = 'e2a8b4c6d9f1'
+branch_labels = None
+depends_on = None
+
+# Partitions créées d'avance ; `flask partitions maintain` prend ensuite le relais
+MONTHS_AHEAD = 3
+ACTIVE = sa.text('deleted_at IS NULL')
+COLUMNS = 'id, content, date_commented, user_id, post_id, version, deleted_at'
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def create_indexes():
+    op.create_index('ix_comment_user_id', 'comment', ['user_id'], unique=False)
+    op.create_index('ix_comment_post_id', 'comment', ['post_id'], unique=False)
+    op.create_index('ix_comment_active_post_id', 'comment', ['post_id', 'date_commented'], unique=False,
+                    postgresql_where=ACTIVE)
+
+
+def drop_indexes(table_name):
+    op.drop_index('ix_comment_active_post_id', table_name=table_name)
+    op.drop_index('ix_comment_post_id', table_name=table_name)
+    op.drop_index('ix_comment_user_id', table_name=table_name)
+
+
+def upgrade():
+    connection = op.get_bind()
+    op.execute("UPDATE comment SET date_commented = CURRENT_TIMESTAMP WHERE date_commented IS NULL")
+    if connection.dialect.name != 'postgresql':
+        # SQLite et autres : la table reste non partitionnée
+        with op.batch_alter_table('comment', schema=None) as batch_op:
+            batch_op.alter_column('date_commented', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    op.execute("ALTER TABLE comment RENAME TO comment_unpartitioned")
+    op.execute("ALTER TABLE comment_unpartitioned RENAME CONSTRAINT comment_pkey TO comment_unpartitioned_pkey")
+    drop_indexes('comment_unpartitioned')
+
+    # La clé primaire d'une table partitionnée inclut la clé de partitionnement
+    op.execute("""
+        CREATE TABLE comment (
+            id INTEGER NOT NULL DEFAULT nextval('comment_id_seq'),
+            content TEXT NOT NULL,
+            date_commented TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            user_id INTEGER NOT NULL REFERENCES "user" (id),
+            post_id INTEGER NOT NULL REFERENCES post (id),
+            version INTEGER NOT NULL DEFAULT 1,
+            deleted_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT comment_pkey PRIMARY KEY (id, date_commented)
+        ) PARTITION BY RANGE (date_commented)
+    """)
+    op.execute("ALTER SEQUENCE comment_id_seq OWNED BY comment.id")
+    op.execute("CREATE TABLE comment_default PARTITION OF comment DEFAULT")
+
+    oldest = connection.execute(sa.text("SELECT min(date_commented) FROM comment_unpartitioned")).scalar()
+    now = datetime.datetime.now()
+    month = datetime.datetime((oldest or now).year, (oldest or now).month, 1)
+    last = add_months(datetime.datetime(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(f"CREATE TABLE comment_p{month:%Y_%m} PARTITION OF comment "
+                   f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')")
+        month = add_months(month, 1)
+
+    op.execute(f"INSERT INTO comment ({COLUMNS}) SELECT {COLUMNS} FROM comment_unpartitioned")
+    op.execute("DROP TABLE comment_unpartitioned")
+    create_indexes()
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql':
+        with op.batch_alter_table('comment', schema=None) as batch_op:
+            batch_op.alter_column('date_commented', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute("ALTER TABLE comment RENAME TO comment_partitioned")
+    op.execute("ALTER TABLE comment_partitioned RENAME CONSTRAINT comment_pkey TO comment_partitioned_pkey")
+    drop_indexes('comment_partitioned')
+
+    op.create_table('comment',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('comment_id_seq')"), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('date_commented', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['post_id'], ['post.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id', name='comment_pkey')
+    )
+    op.execute("ALTER SEQUENCE comment_id_seq OWNED BY comment.id")
+    # Les partitions détachées par la rétention ne sont pas réintégrées
+    op.execute(f"INSERT INTO comment ({COLUMNS}) SELECT {COLUMNS} FROM comment_partitioned")
+    op.execute("DROP TABLE comment_partitioned")
+    create_indexes()
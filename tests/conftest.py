@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def app_config():
+    """
+    Réglages propres à un module de tests, fusionnés dans la configuration de `app`.
+    """
+    return {}
+
+
+@pytest.fixture
+def app(app_config):
+    """
+    Application de test sur SQLite en mémoire, schéma créé. Un module ajoute
+    ses données en redéfinissant `app` (fixture du même nom qui la reçoit).
+    """
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        **app_config,
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+
+
+@pytest.fixture
+def statements(app):
+    """
+    Premier mot de chaque requête SQL exécutée sur la base principale.
+    """
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0])
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
@@ -0,0 +1,80 @@
+import pytest
+from app import db
+from app.models import User, Post, Comment
+from flask_jwt_extended import create_access_token, decode_token
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app(app):
+    db.session.add_all([
+        User(username="alice", email="alice@example.com", password=generate_password_hash("motdepasse1")),
+        User(username="bob", email="bob@example.com", password="x"),
+        User(username="admin", email="admin@example.com", password="x", role="admin"),
+    ])
+    db.session.flush()
+    db.session.add(Post(title="Post d'Alice", content="Contenu du post", user_id=1))
+    db.session.add(Post(title="Sans commentaire", content="Contenu du post", user_id=1))
+    db.session.add(Comment(content="Commentaire", user_id=1, post_id=1))
+    db.session.commit()
+    return app
+
+
+def headers(identity, role=None):
+    claims = {'role': role} if role else None
+    return {"Authorization": f"Bearer {create_access_token(identity=identity, additional_claims=claims)}"}
+
+
+def test_login_embeds_role_claim(client):
+    response = client.post('/auth/login', json={"email": "alice@example.com", "password": "motdepasse1"})
+    claims = decode_token(response.json['access_token'])
+    assert claims['sub'] == 1
+    assert claims['role'] == 'user'
+
+
+def test_only_author_or_admin_can_modify_post(client):
+    body = {"title": "Nouveau titre", "content": "Nouveau contenu", "user_id": 1}
+    assert client.put('/posts/1', json=body, headers=headers(2)).status_code == 403
+    assert client.put('/posts/1', json=body, headers=headers(1)).status_code == 200
+    assert client.put('/posts/1', json=body, headers=headers(3, role='admin')).status_code == 200
+
+
+@pytest.mark.parametrize('path', ['/posts/2', '/comments/1'])
+def test_only_author_or_admin_can_delete(client, path):
+    assert client.delete(path, headers=headers(2)).status_code == 403
+    assert client.delete(path, headers=headers(3, role='admin')).status_code == 204
+    assert client.delete(path, headers=headers(3, role='admin')).status_code == 404
+
+
+def test_ownership_checked_in_loading_query(client, statements):
+    assert client.delete('/posts/1', headers=headers(2)).status_code == 403
+    assert statements == ['SELECT']
+
+
+def test_patch_checks_ownership_in_update(client, statements):
+    patch = {'json': {"title": "Titre modifié"}}
+    response = client.patch('/posts/1', headers={**headers(1), 'If-Match': '"1"'}, **patch)
+    assert response.status_code == 200
+    assert statements == ['UPDATE']
+
+    assert client.patch('/posts/1', headers={**headers(2), 'If-Match': '"2"'}, **patch).status_code == 403
+    assert client.patch('/posts/1', headers={**headers(1), 'If-Match': '"1"'}, **patch).status_code == 412
+    assert client.patch('/posts/9', headers={**headers(1), 'If-Match': '"1"'}, **patch).status_code == 404
+
+
+def test_cannot_write_as_another_user(client):
+    body = {"title": "Usurpation", "content": "Contenu du post", "user_id": 1}
+    assert client.post('/posts', json=body, headers=headers(2)).status_code == 403
+    assert client.post('/posts', json=body, headers=headers(3, role='admin')).status_code == 201
+    comment = {"content": "Bonjour", "user_id": 1, "post_id": 1}
+    assert client.post('/comments', json=comment, headers=headers(2)).status_code == 403
+
+
+def test_only_admin_changes_roles(client):
+    response = client.patch('/users/2', json={"role": "admin"}, headers={**headers(2), 'If-Match': '"1"'})
+    assert response.status_code == 403
+    assert client.delete('/users/1', headers=headers(2)).status_code == 403
+    response = client.patch('/users/2', json={"role": "admin"},
+                            headers={**headers(3, role='admin'), 'If-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.json['role'] == 'admin'
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+from app import batch as batch_module
+from app import create_app, db
+from app.models import Category
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'batch.db'}",
+        'BATCH_MAX_REQUESTS': 5,
+        'BATCH_MAX_PARALLEL': 2,
+    })
+
+    @app.route('/_boom')
+    def boom():
+        raise RuntimeError("boom")
+
+    @app.route('/_stream')
+    def endless():
+        return app.response_class(iter(lambda: ": ping\n\n", None), mimetype='text/event-stream')
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Category(name="Technologie"), Category(name="Cuisine")])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def category_names(app):
+    with app.app_context():
+        return sorted(c.name for c in Category.query.all())
+
+
+def test_batch_reads_and_writes(client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json={'requests': [
+        {'path': '/categories/1'},
+        {'path': '/categories?ids=1,2'},
+        {'method': 'POST', 'path': '/categories', 'body': {'name': 'Sciences'}},
+        {'path': '/categories'},
+        {'path': '/users/42'},
+    ]})
+    assert response.status_code == 200
+    responses = response.json['responses']
+    assert [r['status'] for r in responses] == [405, 200, 201, 200, 404]
+    assert [c['name'] for c in responses[1]['body']['items']] == ['Technologie', 'Cuisine']
+    # La lecture qui suit l'écriture la voit
+    assert len(responses[3]['body']) == 3
+
+
+def test_subrequests_are_authenticated(client):
+    response = client.post('/batch', json={'requests': [{'path': '/categories'}]})
+    assert response.json['responses'][0]['status'] == 401
+
+
+def test_transaction_commits(app, client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json={'transaction': True, 'requests': [
+        {'method': 'POST', 'path': '/categories', 'body': {'name': 'Sciences'}},
+        {'method': 'PUT', 'path': '/categories/1', 'body': {'name': 'Informatique'}},
+    ]})
+    assert response.json['committed'] is True
+    assert category_names(app) == ['Cuisine', 'Informatique', 'Sciences']
+
+
+def test_transaction_rolls_back_on_error(app, client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json={'transaction': True, 'requests': [
+        {'method': 'POST', 'path': '/categories', 'body': {'name': 'Sciences'}},
+        {'method': 'PATCH', 'path': '/categories/1', 'body': {'name': 'Informatique'},
+         'headers': {'If-Match': '"7"'}},
+        {'method': 'DELETE', 'path': '/categories/2'},
+    ]})
+    assert response.json['committed'] is False
+    assert [r['status'] for r in response.json['responses']] == [201, 412, 424]
+    assert category_names(app) == ['Cuisine', 'Technologie']
+
+
+def test_batch_validation(client, auth_headers):
+    assert client.post('/batch', json={'requests': []}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/categories'}] * 6}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/batch'}]}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/', 'method': 'TRACE'}]}).status_code == 400
+    assert client.post('/batch', json={'requests': [{'path': '/events?post_id=1'}]}).status_code == 400
+
+
+def test_batch_rejects_malformed_method_and_headers(client, auth_headers):
+    for bad in ({'path': '/categories', 'method': 1}, {'path': '/categories', 'headers': []},
+                {'path': '/categories', 'headers': {'X-Test': 1}}):
+        response = client.post('/batch', headers=auth_headers, json={'requests': [{'path': '/categories'}, bad]})
+        assert response.status_code == 400
+        assert response.json['msg'].startswith("Sous-requête 1 :")
+
+
+def test_unhandled_error_fails_only_its_subrequest(client, auth_headers):
+    response = client.post('/batch', headers=auth_headers, json={'requests': [
+        {'path': '/_boom'},
+        {'path': '/_stream'},
+        {'path': '/categories'},
+    ]})
+    assert response.status_code == 200
+    assert [r['status'] for r in response.json['responses']] == [500, 400, 200]
+
+
+def test_batch_parallelism_is_capped(app, client, auth_headers, monkeypatch):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def isolated(app, sub, headers, environ_base):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {'status': 200, 'headers': {}, 'body': None}
+
+    monkeypatch.setattr(batch_module, '_isolated', isolated)
+    response = client.post('/batch', headers=auth_headers, json={'requests': [{'path': '/categories/1'}] * 5})
+    assert [r['status'] for r in response.json['responses']] == [200] * 5
+    # Le pool a 4 threads, mais un lot n'en occupe que BATCH_MAX_PARALLEL
+    assert peak[0] == 2
@@ -0,0 +1,86 @@
+import gzip
+import pytest
+from app import db
+from app.models import User, Post, Category
+
+
+@pytest.fixture
+def app_config():
+    # Seuil de compression bas pour les tests
+    return {'COMPRESS_MIN_SIZE': 200}
+
+
+@pytest.fixture
+def app(app):
+    for i in range(20):
+        db.session.add(Category(name=f"Categorie {i}"))
+    db.session.commit()
+
+    @app.route('/_stream_test')
+    def stream_test():
+        def generate():
+            for i in range(100):
+                yield f'{{"ligne": {i}}}\n'
+        return app.response_class(generate(), mimetype='text/plain')
+
+    return app
+
+
+def test_large_json_is_gzipped(client, auth_headers):
+    response = client.get('/categories', headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert b'Categorie 19' in gzip.decompress(response.data)
+
+
+def test_no_compression_without_accept_encoding(client, auth_headers):
+    response = client.get('/categories', headers=auth_headers)
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.json) == 20
+
+
+def test_small_response_below_threshold(client, auth_headers):
+    category = Category.query.first()
+    response = client.put(f'/categories/{category.id}', json={"name": "Courte"},
+                          headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streamed_response_is_compressed(client):
+    response = client.get('/_stream_test', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data).count(b'ligne') == 100
+
+
+def test_precompressed_spec(app, client):
+    asset = app.extensions['compression']['flasgger.apispec']
+    response = client.get('/apispec.json', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.data == asset.variants['gzip']
+
+    response = client.get('/apispec.json', headers={'If-None-Match': f'"{asset.etag}"'})
+    assert response.status_code == 304
+    response = client.get('/apispec.json', headers={'Accept-Encoding': 'gzip',
+                                                    'If-None-Match': f'"{asset.etag}-gzip"'})
+    assert response.status_code == 304
+
+
+def test_compressed_representation_has_its_own_etag(client, auth_headers):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.flush()
+    db.session.add(Post(title="Long", content="Contenu du post " * 40, user_id=1))
+    db.session.commit()
+
+    assert client.get('/posts/1', headers=auth_headers).headers['ETag'] == '"1"'
+    response = client.get('/posts/1', headers={**auth_headers, 'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == '"1-gzip"'
+
+    # Le validateur d'une représentation compressée reste accepté par If-Match
+    response = client.patch('/posts/1', json={"title": "Modifié"},
+                            headers={**auth_headers, 'If-Match': response.headers['ETag']})
+    assert response.status_code == 200
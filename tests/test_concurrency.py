@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
+from app.models import Category
+
+
+@pytest.fixture
+def category(app):
+    category = Category(name="Technologie")
+    db.session.add(category)
+    db.session.commit()
+    return category
+
+
+def test_new_rows_start_at_version_1(category):
+    assert category.version == 1
+
+
+def test_put_with_if_match(client, auth_headers, category):
+    response = client.put(f'/categories/{category.id}', json={"name": "Sciences"},
+                          headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.json['version'] == 2
+    assert response.headers['ETag'] == '"2"'
+
+    response = client.put(f'/categories/{category.id}', json={"name": "Cuisine"},
+                          headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 412
+
+
+def test_concurrent_commit_raises_stale_data(app, category):
+    assert category.version == 1
+    # Une autre transaction incrémente la version après le chargement de la ligne
+    db.session.execute(update(Category.__table__).values(version=2))
+    category.name = "Sciences"
+    with pytest.raises(StaleDataError):
+        db.session.commit()
+    db.session.rollback()
+
+
+def test_patch_requires_if_match(client, auth_headers, category):
+    response = client.patch(f'/categories/{category.id}', json={"name": "Sciences"}, headers=auth_headers)
+    assert response.status_code == 428
+
+
+def test_patch_single_update(client, auth_headers, category):
+    response = client.patch(f'/categories/{category.id}', json={"name": "Sciences"},
+                            headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.json == {'id': category.id, 'name': "Sciences", 'version': 2}
+    assert response.headers['ETag'] == '"2"'
+
+    response = client.patch(f'/categories/{category.id}', json={"name": "Cuisine"},
+                            headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 412
+    assert db.session.get(Category, category.id).name == "Sciences"
+
+
+def test_patch_validation_and_missing_row(client, auth_headers, category):
+    response = client.patch(f'/categories/{category.id}', json={"name": "x"},
+                            headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 400
+
+    response = client.patch('/categories/999', json={"name": "Sciences"},
+                            headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 404
+
+
+def test_patch_writes_loaded_values_only(client, auth_headers, category):
+    response = client.patch(f'/categories/{category.id}', json={"name": "Sciences", "id": 5},
+                            headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 200
+    assert response.json['id'] == category.id
+
+    response = client.patch(f'/categories/{category.id}', json={"name": "Cuisine", "version": 9},
+                            headers={**auth_headers, 'If-Match': '"2"'})
+    assert response.status_code == 400
@@ -0,0 +1,113 @@
+import json
+import os
+import pytest
+from app import create_app, db
+from app.datatransfer import dependency_levels, get_tables
+from app.models import User, Post, Comment, Category
+
+
+def make_app(path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}",
+    })
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def source(tmp_path):
+    app = make_app(tmp_path / 'source.db')
+    with app.app_context():
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", password="x") for i in range(5)]
+        category = Category(name="Technologie")
+        db.session.add_all(users + [category])
+        db.session.flush()
+        posts = [Post(title=f"Post {i}", content="Ligne 1\nLigne 2\t\"citée\"", user_id=users[i % 5].id,
+                      category_id=category.id if i % 2 else None)
+                 for i in range(7)]
+        db.session.add_all(posts)
+        db.session.flush()
+        db.session.add_all([Comment(content=f"Commentaire {i}", user_id=users[0].id, post_id=posts[i].id)
+                            for i in range(7)])
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def target(tmp_path):
+    return make_app(tmp_path / 'target.db')
+
+
+def snapshot(app):
+    with app.app_context():
+        return {model.__tablename__: [
+                    {c.name: getattr(row, c.name) for c in model.__table__.c}
+                    for row in model.query.order_by(model.id)]
+                for model in (User, Category, Post, Comment)}
+
+
+def test_dependency_levels(source):
+    with source.app_context():
+        levels = dependency_levels(get_tables(['comment', 'post', 'user', 'category']))
+    assert [sorted(t.name for t in level) for level in levels] == [['category', 'user'], ['post'], ['comment']]
+
+
+@pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+def test_round_trip(source, target, tmp_path, fmt):
+    dump = tmp_path / 'dump'
+    result = source.test_cli_runner().invoke(
+        args=['data', 'export', str(dump), '--format', fmt, '--chunk-size', '3', '--jobs', '2'])
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(dump / 'post')) == [
+        '_export.json', f'part-00001.{fmt}.gz', f'part-00002.{fmt}.gz', f'part-00003.{fmt}.gz']
+
+    result = target.test_cli_runner().invoke(args=['data', 'import', str(dump)])
+    assert result.exit_code == 0, result.output
+    assert snapshot(target) == snapshot(source)
+
+
+def test_resume_after_interruption(source, target, tmp_path):
+    dump = tmp_path / 'dump'
+    runner = source.test_cli_runner()
+    runner.invoke(args=['data', 'export', str(dump), '--chunk-size', '3'])
+
+    # Simule un export interrompu après le premier morceau
+    state_path = dump / 'post' / '_export.json'
+    state = json.loads(state_path.read_text())
+    first = state['parts'][0]
+    state.update(parts=[first], last_id=first['last_id'], rows=first['rows'], done=False)
+    state_path.write_text(json.dumps(state))
+    os.remove(dump / 'post' / 'part-00003.ndjson.gz')
+
+    runner.invoke(args=['data', 'export', str(dump), '--chunk-size', '3'])
+    state = json.loads(state_path.read_text())
+    assert state['done'] and state['rows'] == 7 and len(state['parts']) == 3
+
+    # Un import interrompu puis rejoué ne duplique aucune ligne
+    target.test_cli_runner().invoke(args=['data', 'import', str(dump)])
+    (dump / 'post' / '_import.json').write_text(json.dumps({'parts': ['part-00001.ndjson.gz']}))
+    result = target.test_cli_runner().invoke(args=['data', 'import', str(dump)])
+    assert result.exit_code == 0, result.output
+    assert snapshot(target) == snapshot(source)
+
+
+def test_import_keeps_rows_missing_from_export(source, target, tmp_path):
+    with source.app_context():
+        db.session.add_all([Category(name="Cuisine"), Category(name="Voyages")])
+        db.session.commit()
+        db.session.delete(db.session.get(Category, 2))
+        db.session.commit()
+    with target.app_context():
+        db.session.add_all([Category(name="Temporaire"), Category(name="Locale")])
+        db.session.commit()
+
+    dump = tmp_path / 'dump'
+    source.test_cli_runner().invoke(args=['data', 'export', str(dump), '--tables', 'category'])
+    result = target.test_cli_runner().invoke(args=['data', 'import', str(dump), '--tables', 'category'])
+    assert result.exit_code == 0, result.output
+    with target.app_context():
+        # Les identifiants exportés (1 et 3) sont remplacés, le 2 local reste en place
+        assert [(c.id, c.name) for c in Category.query.order_by(Category.id)] == [
+            (1, "Technologie"), (2, "Locale"), (3, "Voyages")]
@@ -0,0 +1,107 @@
+import json
+import pytest
+from flask import Flask
+from app import create_app, db
+from app.diagnostics import fingerprint, normalize_statement, redact_parameters
+from app.models import Category
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    """
+    Seuil à 0 ms : toutes les requêtes sont consignées.
+    """
+    return {
+        'SLOW_QUERY_THRESHOLD_MS': 0,
+        'SLOW_QUERY_LOG_FILE': str(tmp_path / 'slow.ndjson'),
+        'SLOW_QUERY_EXPLAIN_SAMPLE_RATE': 1.0,
+    }
+
+
+def test_normalize_statement():
+    a = "SELECT * FROM post WHERE id IN (?, ?, ?) AND title = 'abc'"
+    b = "SELECT  *  FROM post\nWHERE id IN (%(id_1)s, %(id_2)s) AND title = 'x''y'"
+    assert normalize_statement(a) == "SELECT * FROM post WHERE id IN (?+) AND title = ?"
+    assert fingerprint(a) == fingerprint(b)
+    # Les conversions PostgreSQL ne sont pas des paramètres
+    assert normalize_statement("SELECT :since::date, '1'::int") == "SELECT ?::date, ?::int"
+
+
+class FakeCursor:
+    def __init__(self, executed, fail):
+        self.executed, self.fail, self.connection = executed, fail, self
+
+    def cursor(self):
+        return self
+
+    def execute(self, statement, parameters=None):
+        self.executed.append(statement.split(' (')[0])
+        if self.fail and statement.startswith('EXPLAIN'):
+            raise RuntimeError("syntax error")
+
+    def fetchall(self):
+        return [("Seq Scan on post",)]
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_explain_runs_under_savepoint(app, fail):
+    executed = []
+    plan = app.extensions['query_diagnostics'].explain(FakeCursor(executed, fail), "SELECT * FROM post", ())
+    assert plan == (None if fail else "Seq Scan on post")
+    assert executed == ['SAVEPOINT slow_query_explain', 'EXPLAIN', 'ROLLBACK TO SAVEPOINT slow_query_explain',
+                        'RELEASE SAVEPOINT slow_query_explain']
+
+
+def test_redact_parameters():
+    assert redact_parameters(('secret', 3, None)) == ['<str:6>', '<int>', None]
+    assert redact_parameters({'email': 'a@b.c'}) == {'email': '<str:5>'}
+
+
+def test_slow_query_logged_with_context(app):
+    db.session.add(Category(name="Technologie"))
+    db.session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+    assert app.test_client().get('/categories', headers=headers).status_code == 200
+
+    with open(app.config['SLOW_QUERY_LOG_FILE']) as f:
+        records = [json.loads(line) for line in f]
+    select = next(r for r in records if r['endpoint'] == 'api.get_categories')
+    assert select['call_site'].startswith('routes.py:')
+    assert select['plan'] is None  # EXPLAIN réservé à PostgreSQL
+
+    insert = next(r for r in records if r['statement'].startswith('INSERT'))
+    assert insert['parameters'][0] == '<str:11>'
+
+    log = app.extensions['query_diagnostics'].log
+    assert log.entries[select['fingerprint']]['endpoints'] == {'api.get_categories'}
+
+
+def test_report_command(app):
+    Category.query.all()
+    Category.query.all()
+
+    result = app.test_cli_runner().invoke(args=['queries', 'report', '--sort', 'count'])
+    assert result.exit_code == 0
+    assert '2 appels' in result.output
+    assert 'FROM category' in result.output
+
+
+def test_report_reads_default_log_in_instance_folder(tmp_path, monkeypatch):
+    # Sans SLOW_QUERY_LOG_FILE : journal dans le dossier instance, lu par le rapport
+    monkeypatch.setattr(Flask, 'auto_find_instance_path', lambda self: str(tmp_path / 'instance'))
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                      'SLOW_QUERY_THRESHOLD_MS': 0, 'SLOW_QUERY_LOG_FILE': None})
+    assert app.config['SLOW_QUERY_LOG_FILE'] == str(tmp_path / 'instance' / 'slow_queries.ndjson')
+    runner = app.test_cli_runner()
+    assert "Aucune requête lente" in runner.invoke(args=['queries', 'report']).output
+
+    with app.app_context():
+        db.create_all()
+        Category.query.all()
+    result = runner.invoke(args=['queries', 'report'])
+    assert result.exit_code == 0
+    assert 'FROM category' in result.output
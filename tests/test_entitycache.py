@@ -0,0 +1,183 @@
+import threading
+import time
+
+import pytest
+from app import db
+from app.entitycache import EntityCache, LRUCache
+from app.models import User, Post
+
+
+@pytest.fixture
+def app_config():
+    return {'ENTITY_CACHE_TTL': 60}
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.flush()
+    db.session.add(Post(title="Premier", content="Contenu du post", user_id=1))
+    db.session.commit()
+    return app
+
+
+class DictStore:
+    # Cache partagé minimal pour les tests
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.data[key] = value
+
+    def delete(self, keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_repeated_get_served_from_cache(client, auth_headers, statements):
+    first = client.get('/posts/1', headers=auth_headers)
+    second = client.get('/posts/1', headers=auth_headers)
+    assert first.json == second.json
+    assert second.headers['ETag'] == '"1"'
+    assert statements == ['SELECT']
+
+
+def test_writes_invalidate(client, auth_headers):
+    client.get('/posts/1', headers=auth_headers)
+    body = {"title": "Modifié", "content": "Contenu du post", "user_id": 1}
+    assert client.put('/posts/1', json=body, headers=auth_headers).status_code == 200
+    assert client.get('/posts/1', headers=auth_headers).json['title'] == "Modifié"
+
+    # PATCH : UPDATE émis directement, sans passer par l'ORM
+    response = client.patch('/posts/1', json={"title": "Patché"}, headers={**auth_headers, 'If-Match': '"2"'})
+    assert response.status_code == 200
+    response = client.get('/posts/1', headers=auth_headers)
+    assert response.json['title'] == "Patché"
+    assert response.headers['ETag'] == '"3"'
+
+    assert client.delete('/posts/1', headers=auth_headers).status_code == 204
+    assert client.get('/posts/1', headers=auth_headers).status_code == 404
+
+
+def test_rollback_keeps_cache(app, client, auth_headers, statements):
+    client.get('/users/1', headers=auth_headers)
+    user = db.session.get(User, 1)
+    user.username = "alicia"
+    db.session.flush()
+    db.session.rollback()
+    assert client.get('/users/1', headers=auth_headers).json['username'] == "alice"
+    assert statements.count('SELECT') == 2
+
+
+def test_single_loader_per_key(app):
+    cache = EntityCache(app)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {'id': 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load('k', loader))) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{'id': 1}] * 10
+
+
+def test_write_during_load_is_not_cached(app):
+    cache = EntityCache(app)
+
+    def loader():
+        cache.invalidate({'entity:post:1'})
+        return {'title': "ancien"}
+
+    assert cache.get_or_load('entity:post:1', loader) == {'title': "ancien"}
+    assert cache.local.get('entity:post:1') is None
+
+
+def test_shared_tier(app):
+    cache = EntityCache(app)
+    cache.shared = DictStore()
+    assert cache.get_or_load('entity:post:1', lambda: {'id': 1}) == {'id': 1}
+    assert cache.shared.data == {'entity:post:1@0.0': '{"id": 1}'}
+
+    # Un autre processus trouve la valeur dans le cache partagé
+    other = EntityCache(app)
+    other.shared = cache.shared
+    assert other.get_or_load('entity:post:1', lambda: pytest.fail("chargé en base")) == {'id': 1}
+
+    cache.invalidate({'entity:post:1'})
+    assert list(cache.shared.data) == ['entity-version:entity:post:1']
+
+
+def test_write_from_other_process_during_load_is_not_shared(app):
+    cache, other = EntityCache(app), EntityCache(app)
+    cache.shared = other.shared = DictStore()
+
+    def loader():
+        # Un autre processus valide une écriture pendant le chargement
+        other.invalidate({'entity:post:1'})
+        return {'title': "ancien"}
+
+    assert cache.get_or_load('entity:post:1', loader) == {'title': "ancien"}
+    third = EntityCache(app)
+    third.shared = cache.shared
+    assert third.get_or_load('entity:post:1', lambda: {'title': "nouveau"}) == {'title': "nouveau"}
+
+
+def test_table_invalidation_reaches_shared_tier(app):
+    cache, other = EntityCache(app), EntityCache(app)
+    cache.shared = other.shared = DictStore()
+    cache.get_or_load('entity:comment:1', lambda: {'content': "ancien"})
+    cache.get_or_load('entity:post:1', lambda: {'title': "Premier"})
+
+    # UPDATE sans identifiants (cascade de suppression logique) : toute la table
+    cache.invalidate(set(), {'comment'})
+    assert other.get_or_load('entity:comment:1', lambda: {'content': "nouveau"}) == {'content': "nouveau"}
+    assert other.get_or_load('entity:post:1', lambda: pytest.fail("chargé en base")) == {'title': "Premier"}
+
+
+def test_loader_error_reaches_waiting_requests(app):
+    cache = EntityCache(app)
+    started = threading.Event()
+
+    def loader():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("base indisponible")
+
+    errors = []
+
+    def follower():
+        started.wait()
+        try:
+            cache.get_or_load('entity:post:1', lambda: pytest.fail("chargé deux fois"))
+        except RuntimeError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_load('entity:post:1', loader)
+    thread.join()
+    assert [str(error) for error in errors] == ["base indisponible"]
+
+
+def test_lru_eviction_and_ttl():
+    now = [0.0]
+    cache = LRUCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    now[0] = 11
+    assert cache.get('a') is None
@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+from app import create_app, db
+from app import events as events_module
+from app.events import EventBroker, LISTEN_MAX_BACKOFF, LISTEN_MAX_FAILURES, RECONNECT_DELAY, _ensure_listener
+from app.models import User, Post, Comment, Category
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'events.db'}",
+        'EVENTS_BUFFER_SIZE': 10,
+        'EVENTS_HEARTBEAT': 0.05,
+        'EVENTS_MAX_DURATION': 0.2,
+    })
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            User(username="alice", email="alice@example.com", password="x"),
+            Category(name="Technologie"),
+            Category(name="Cuisine"),
+        ])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def add_post(app, title, category_id=1):
+    with app.app_context():
+        post = Post(title=title, content="Contenu", user_id=1, category_id=category_id)
+        db.session.add(post)
+        db.session.commit()
+        return post.id
+
+
+def published(app):
+    return list(app.extensions['events']._events)
+
+
+def test_events_published_after_commit(app):
+    post_id = add_post(app, "Premier")
+    with app.app_context():
+        db.session.add(Comment(content="Bravo", user_id=1, post_id=post_id))
+        db.session.flush()
+        # Rien n'est publié avant le commit
+        assert len(published(app)) == 1
+        db.session.commit()
+
+    events = [data for _, data in published(app)]
+    assert [e['type'] for e in events] == ['post.created', 'comment.created']
+    assert events[0]['data']['title'] == "Premier"
+    assert events[1]['data']['post_id'] == post_id
+
+
+def test_rollback_discards_events(app):
+    with app.app_context():
+        db.session.add(Post(title="Annulé", content="Contenu", user_id=1))
+        db.session.flush()
+        db.session.rollback()
+    assert published(app) == []
+
+
+def test_stream_requires_authentication(client):
+    assert client.get('/events').status_code == 401
+
+
+def test_stream_replays_after_last_event_id(app, client, auth_headers):
+    add_post(app, "Premier")
+    first = published(app)[0][1]['id']
+    add_post(app, "Deuxième", category_id=2)
+    add_post(app, "Troisième", category_id=1)
+
+    response = client.get('/events', headers={**auth_headers, 'Last-Event-ID': first})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: 3000\n\n")
+    assert "Premier" not in body
+    assert "Deuxième" in body and "Troisième" in body
+    assert ": ping" in body
+
+    response = client.get('/events?category_id=2', headers={**auth_headers, 'Last-Event-ID': first})
+    body = response.get_data(as_text=True)
+    assert "Deuxième" in body and "Troisième" not in body
+
+
+def test_unknown_last_event_id_sends_reset(app, client, auth_headers):
+    add_post(app, "Premier")
+    response = client.get('/events', headers={**auth_headers, 'Last-Event-ID': 'inconnu'})
+    body = response.get_data(as_text=True)
+    assert "event: reset" in body
+    assert "Premier" in body
+
+
+def test_broker_evicts_oldest_events():
+    broker = EventBroker(2)
+    for i in range(3):
+        broker.publish({'id': str(i), 'type': 'post.created', 'data': {'post_id': i}})
+    assert broker.position('0') is None
+    assert broker.position('2') == 3
+    events, seq = broker.wait(1, timeout=0)
+    assert [e['id'] for e in events] == ['1', '2'] and seq == 3
+    events, _ = broker.wait(3, timeout=0.01)
+    assert events == []
+
+
+def test_listener_reconnects_then_gives_up(app, monkeypatch):
+    attempts, sleeps = [], []
+
+    def listen(app, broker, connected):
+        attempts.append(1)
+        if len(attempts) == 2:
+            connected()  # une connexion réussie remet le compteur d'échecs à zéro
+        raise OSError("connexion perdue")
+
+    monkeypatch.setattr(events_module, '_listen', listen)
+    monkeypatch.setattr(events_module.time, 'sleep', sleeps.append)
+    _ensure_listener(app)
+    state = app.extensions['events_listener']
+    thread = state['thread']
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert len(attempts) == LISTEN_MAX_FAILURES + 1
+    assert sleeps[:3] == [1, 1, 2] and max(sleeps) == LISTEN_MAX_BACKOFF
+    # Le thread libère sa place : le prochain abonnement relance l'écoute
+    assert state['thread'] is None
+
+
+def test_streams_capped_per_worker(app, client, auth_headers):
+    app.extensions['events_streams'] = threading.BoundedSemaphore(1)
+    first = client.get('/events', headers=auth_headers, buffered=False)
+    assert first.status_code == 200
+    response = client.get('/events', headers=auth_headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(RECONNECT_DELAY)
+
+    # La fermeture du premier flux libère sa place
+    first.close()
+    assert client.get('/events', headers=auth_headers).status_code == 200
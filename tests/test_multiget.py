@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import User, Post, Category
+
+
+@pytest.fixture
+def app_config():
+    return {'BATCH_GET_MAX_IDS': 5}
+
+
+@pytest.fixture
+def app(app):
+    db.session.add_all([User(username=f"user{i}", email=f"user{i}@example.com", password="x")
+                        for i in range(1, 5)])
+    db.session.add(Category(name="Technologie"))
+    db.session.add(Post(title="Post", content="Contenu du post", user_id=1))
+    db.session.commit()
+    return app
+
+
+def test_users_by_ids_single_query(client, auth_headers):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/users?ids=3,1,9,3', headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    assert [user['username'] for user in response.json['items']] == ['user3', 'user1']
+    assert response.json['missing'] == [9]
+    assert len([s for s in statements if 'FROM user' in s]) == 1
+
+
+def test_other_resources_by_ids(client, auth_headers):
+    assert client.get('/categories?ids=1', headers=auth_headers).json['items'][0]['name'] == "Technologie"
+    assert client.get('/comments?ids=1', headers=auth_headers).json == {'items': [], 'missing': [1]}
+
+    post = client.get('/posts?ids=1', headers=auth_headers).json['items'][0]
+    assert 'content' not in post and post['excerpt'] == "Contenu du post"
+
+
+def test_ids_validation(client, auth_headers):
+    response = client.get('/users?ids=1,a', headers=auth_headers)
+    assert response.status_code == 400
+    assert 'msg' in response.json
+    assert client.get('/users?ids=1,2,3,4,5,6', headers=auth_headers).status_code == 400
+    assert client.get('/users?ids=', headers=auth_headers).status_code == 400
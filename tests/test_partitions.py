@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from app import db
+from app.models import User, Post, Comment
+from app.partitions import (add_months, create_future_partitions, create_partition_sql, detach_old_partitions,
+                            month_start, partitioned_tables)
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.flush()
+    db.session.add(Post(title="Premier", content="Contenu du post", user_id=1))
+    db.session.flush()
+    db.session.add_all([
+        Comment(content="Ancien", user_id=1, post_id=1, date_commented=datetime.datetime(2024, 1, 15)),
+        Comment(content="Récent", user_id=1, post_id=1, date_commented=datetime.datetime(2026, 10, 2)),
+    ])
+    db.session.commit()
+    return app
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self.rows
+
+
+class FakeConnection:
+    """
+    Connexion PostgreSQL simulée : catalogue des partitions et DDL exécutés.
+    """
+    dialect = postgresql.dialect()
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if sql.startswith('SELECT'):
+            return FakeResult(self.partitions)
+        self.executed.append(sql)
+
+
+def test_month_arithmetic():
+    assert month_start(datetime.datetime(2026, 10, 19, 15, 30)) == datetime.datetime(2026, 10, 1)
+    assert add_months(datetime.datetime(2026, 11, 1), 2) == datetime.datetime(2027, 1, 1)
+    assert add_months(datetime.datetime(2026, 1, 1), -1) == datetime.datetime(2025, 12, 1)
+
+
+def test_comment_declares_partition_key(app):
+    assert {table.name: column for table, column in partitioned_tables().items()} == {'comment': 'date_commented'}
+
+
+def test_create_partition_sql():
+    sql = create_partition_sql(postgresql.dialect().identifier_preparer, 'comment', datetime.datetime(2026, 12, 1))
+    assert sql == ("CREATE TABLE IF NOT EXISTS comment_p2026_12 PARTITION OF comment "
+                   "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')")
+
+
+def test_create_future_partitions_skips_existing():
+    conn = FakeConnection(['comment_p2026_10', 'comment_default'])
+    created = create_future_partitions(conn, 'comment', datetime.datetime(2026, 10, 19), ahead=2)
+    assert created == ['comment_p2026_11', 'comment_p2026_12']
+    assert len(conn.executed) == 2
+
+
+def test_detach_old_partitions():
+    conn = FakeConnection(['comment_p2025_09', 'comment_p2025_10', 'comment_p2025_11', 'comment_default'])
+    removed = detach_old_partitions(conn, 'comment', datetime.datetime(2025, 11, 1), drop=True)
+    assert removed == ['comment_p2025_09', 'comment_p2025_10']
+    assert conn.executed == [
+        "ALTER TABLE comment DETACH PARTITION comment_p2025_09", "DROP TABLE comment_p2025_09",
+        "ALTER TABLE comment DETACH PARTITION comment_p2025_10", "DROP TABLE comment_p2025_10",
+    ]
+
+
+def test_maintain_falls_back_to_batched_delete_on_sqlite(app):
+    result = app.test_cli_runner().invoke(args=['partitions', 'maintain', '--retention', '12', '--batch-size', '1'])
+    assert "comment : table non partitionnée (sqlite)" in result.output
+    assert "comment : 1 lignes" in result.output
+    assert [c.content for c in Comment.query.all()] == ["Récent"]
+
+
+def test_get_comments_by_period(client, auth_headers):
+    response = client.get('/comments?since=2026-01-01', headers=auth_headers)
+    assert [c['content'] for c in response.json] == ["Récent"]
+    response = client.get('/comments?until=2026-01-01', headers=auth_headers)
+    assert [c['content'] for c in response.json] == ["Ancien"]
+    assert client.get('/comments?since=hier', headers=auth_headers).status_code == 400
+
+
+def test_date_commented_set_at_insert(app):
+    before = datetime.datetime.now()
+    comment = Comment(content="Maintenant", user_id=1, post_id=1)
+    db.session.add(comment)
+    db.session.commit()
+    assert comment.date_commented >= before
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import event
+from app import db
+from app.models import User, Post
+
+
+@pytest.fixture
+def app_config():
+    return {'MAX_CONTENT_LENGTH': 2048}
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.commit()
+    return app
+
+
+def test_create_post_inserts_without_reloading(client, auth_headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    response = client.post('/posts', json={"title": "Bonjour", "content": "Contenu du post", "user_id": 1},
+                           headers=auth_headers)
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 201
+    # Auteur vérifié (actif), puis insertion sans relecture
+    assert statements == ['SELECT', 'INSERT']
+    assert response.json['id'] == 1
+    assert response.json['version'] == 1
+    assert response.json['excerpt'] == "Contenu du post"
+    assert db.session.get(Post, 1).title == "Bonjour"
+
+
+def test_validation_errors_are_400(client, auth_headers):
+    response = client.post('/posts', json={"title": "Hi", "user_id": 1}, headers=auth_headers)
+    assert response.status_code == 400
+    assert set(response.json) == {'title', 'content'}
+    response = client.post('/comments', json={"content": "Bonjour", "user_id": 1, "post_id": 1, "id": 7},
+                           headers=auth_headers)
+    assert response.status_code == 400
+    assert 'id' in response.json
+
+
+def test_put_validation_errors_are_400(client, auth_headers):
+    post = client.post('/posts', json={"title": "Bonjour", "content": "Contenu du post", "user_id": 1},
+                       headers=auth_headers).json
+    response = client.put(f"/posts/{post['id']}", json={"title": "Hi", "content": "Contenu du post", "user_id": 1},
+                          headers=auth_headers)
+    assert response.status_code == 400
+    assert set(response.json) == {'title'}
+    response = client.put('/users/1', json={"username": "alice", "email": "pas-un-email", "password": "motdepasse1"},
+                          headers=auth_headers)
+    assert response.status_code == 400
+    assert 'email' in response.json
+
+
+@pytest.mark.parametrize('body', ['{"title": ', '[1, 2]', 'null'])
+def test_malformed_json_is_400(client, auth_headers, body):
+    response = client.post('/posts', data=body, content_type='application/json', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json['msg'] == "Le corps de la requête doit être un objet JSON"
+
+
+def test_oversized_body_is_413(client, auth_headers):
+    response = client.post('/posts', json={"title": "Long", "content": "x" * 4096, "user_id": 1},
+                           headers=auth_headers)
+    assert response.status_code == 413
+    assert "2048" in response.json['msg']
+
+
+def test_register_validates_once(client):
+    response = client.post('/auth/register', json={"username": "bob", "email": "pas-un-email",
+                                                   "password": "motdepasse1"})
+    assert response.status_code == 400
+    assert 'email' in response.json
+    response = client.post('/auth/register', json={"username": "bob", "email": "bob@example.com",
+                                                   "password": "motdepasse1", "role": "admin"})
+    assert response.status_code == 400
+    response = client.post('/auth/register', json={"username": "bob", "email": "bob@example.com",
+                                                   "password": "motdepasse1"})
+    assert response.status_code == 201
+    assert response.json['role'] == 'user'
+
+
+@pytest.mark.parametrize('method', ['PUT', 'PATCH'])
+def test_user_password_is_hashed(client, auth_headers, method):
+    body = {"password": "nouveau-secret1"}
+    if method == 'PUT':
+        body.update(username="alice", email="alice@example.com")
+    response = client.open('/users/1', method=method, json=body, headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 200
+    db.session.expire_all()
+    user = db.session.get(User, 1)
+    assert user.password != "nouveau-secret1"
+    assert user.check_password("nouveau-secret1")
@@ -0,0 +1,57 @@
+import pytest
+from app import db
+from app.models import User, Post, summarize, EXCERPT_LENGTH
+
+LONG_CONTENT = ' '.join(f"mot{i}" for i in range(450))
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.commit()
+    return app
+
+
+def test_summarize():
+    summary = summarize("Un  contenu\ncourt.")
+    assert summary == {'excerpt': "Un contenu court.", 'word_count': 3, 'reading_time': 1}
+
+    summary = summarize(LONG_CONTENT)
+    assert summary['word_count'] == 450
+    assert summary['reading_time'] == 3
+    assert summary['excerpt'].endswith('…')
+    assert len(summary['excerpt']) <= EXCERPT_LENGTH + 1
+    assert LONG_CONTENT.startswith(summary['excerpt'][:-1])
+
+    assert len(summarize('x' * 500)['excerpt']) == EXCERPT_LENGTH + 1
+
+
+def test_summary_computed_on_write(client, auth_headers):
+    response = client.post('/posts', json={"title": "Long", "content": LONG_CONTENT, "user_id": 1},
+                           headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json['word_count'] == 450
+
+    post_id = response.json['id']
+    response = client.put(f'/posts/{post_id}', json={"title": "Court", "content": "Dix caractères", "user_id": 1},
+                          headers=auth_headers)
+    assert response.json['excerpt'] == "Dix caractères"
+    assert response.json['word_count'] == 2
+
+    response = client.patch(f'/posts/{post_id}', json={"content": "Un contenu corrigé"},
+                            headers={**auth_headers, 'If-Match': response.headers['ETag']})
+    assert response.status_code == 200
+    assert response.json['word_count'] == 3
+    assert db.session.get(Post, post_id).excerpt == "Un contenu corrigé"
+
+
+def test_listing_excludes_content(client, auth_headers):
+    client.post('/posts', json={"title": "Long", "content": LONG_CONTENT, "user_id": 1}, headers=auth_headers)
+
+    listing = client.get('/posts', headers=auth_headers).json
+    assert 'content' not in listing[0]
+    assert listing[0]['reading_time'] == 3
+
+    full = client.get('/posts?include_content=true', headers=auth_headers).json
+    assert full[0]['content'] == LONG_CONTENT
+    assert client.get(f"/posts/{listing[0]['id']}", headers=auth_headers).json['content'] == LONG_CONTENT
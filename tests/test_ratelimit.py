@@ -0,0 +1,81 @@
+import pytest
+from app.ratelimit import MemoryStore, parse_limit
+from flask_jwt_extended import create_access_token
+
+
+@pytest.fixture
+def app_config():
+    """
+    Limites basses pour les tests.
+    """
+    return {
+        'RATELIMIT_LIMITS': {'auth.login': '2/minute', 'api': '3/minute', 'api.accueil': ''},
+        'RATELIMIT_MAX_IN_FLIGHT': 4,
+    }
+
+
+def auth_headers(identity):
+    return {"Authorization": f"Bearer {create_access_token(identity=identity)}"}
+
+
+def test_parse_limit():
+    assert parse_limit("10/minute") == (10 / 60, 10)
+    assert parse_limit("5/seconds") == (5, 5)
+    with pytest.raises(ValueError):
+        parse_limit("5/fortnight")
+
+
+def test_token_bucket_refill():
+    now = [0.0]
+    store = MemoryStore(clock=lambda: now[0])
+    assert store.consume('k', rate=1, capacity=2)[0]
+    assert store.consume('k', rate=1, capacity=2)[0]
+    allowed, _, retry_after = store.consume('k', rate=1, capacity=2)
+    assert not allowed and retry_after == 1
+
+    now[0] = 1.0
+    assert store.consume('k', rate=1, capacity=2)[0]
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryStore(max_keys=2)
+    for key in ('a', 'b', 'a', 'c'):
+        store.consume(key, rate=1, capacity=1)
+    assert list(store._buckets) == ['a', 'c']
+
+
+def test_login_rate_limited(client):
+    credentials = {'email': 'inconnu@example.com', 'password': 'x'}
+    assert client.post('/auth/login', json=credentials).status_code == 401
+    assert client.post('/auth/login', json=credentials).status_code == 401
+
+    response = client.post('/auth/login', json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+
+
+def test_blueprint_limit_keyed_by_identity(client):
+    alice, bob = auth_headers(1), auth_headers(2)
+    for remaining in (2, 1, 0):
+        response = client.get('/categories', headers=alice)
+        assert response.status_code == 200
+        assert response.headers['X-RateLimit-Remaining'] == str(remaining)
+    assert client.get('/categories', headers=alice).status_code == 429
+    assert client.get('/categories', headers=bob).status_code == 200
+
+    # Route exemptée
+    assert client.get('/').status_code == 200
+    assert 'X-RateLimit-Limit' not in client.get('/').headers
+
+
+def test_load_shedding(app, client):
+    limiter = app.extensions['ratelimit']
+    limiter.in_flight = limiter.max_in_flight
+
+    response = client.get('/')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    limiter.in_flight = 0
+    assert client.get('/').status_code == 200
+    assert limiter.in_flight == 0
@@ -0,0 +1,318 @@
+import datetime
+import pytest
+from sqlalchemy import event, func, select, update
+from app import create_app, db
+from app.models import User, Post, Comment, Category, ShardSlot, UserIdentity
+from app.softdelete import soft_delete
+from app.sharding import plan_rebalance, shard_metadata
+from flask_jwt_extended import create_access_token
+
+
+def make_app(tmp_path, shards):
+    return create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'global.db'}",
+        'SHARD_URIS': [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(shards)],
+        'SHARD_SLOTS': 12,
+        'RATELIMIT_ENABLED': False,
+    })
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path, 3)
+    with app.app_context():
+        db.create_all()
+        app.test_cli_runner().invoke(args=['shards', 'init'])
+        users = [User(username=f"user{index}", email=f"user{index}@example.com", password="x") for index in range(8)]
+        db.session.add_all(users)
+        db.session.add(Category(name="Technologie"))
+        db.session.commit()
+        for user in users:
+            db.session.add(Post(title=f"Post de {user.username}", content="Contenu du post", user_id=user.id))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def admin_headers(app):
+    return {"Authorization": f"Bearer {create_access_token(identity=1, additional_claims={'role': 'admin'})}"}
+
+
+@pytest.fixture
+def statements(app):
+    # Requêtes exécutées, par shard
+    executed = {}
+    listeners = []
+    for key, engine in {'global': db.engine, **app.extensions['shards'].engines}.items():
+        def record(conn, cursor, statement, parameters, context, executemany, key=key):
+            executed.setdefault(key, []).append(statement.split()[0])
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    yield executed
+    for engine, record in listeners:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def rows_by_shard(router, model):
+    counts = {}
+    for shard_id in router.shard_ids:
+        with router.engine(shard_id).connect() as conn:
+            counts[shard_id] = conn.execute(select(model.__table__.c.id)).scalars().all()
+    return counts
+
+
+def test_rows_colocated_with_their_user(app):
+    router = app.extensions['shards']
+    users = rows_by_shard(router, User)
+    posts = rows_by_shard(router, Post)
+    assert sum(len(ids) for ids in users.values()) == 8
+    assert len([ids for ids in users.values() if ids]) > 1
+    for shard_id, ids in users.items():
+        assert all(router.shard_for_id(id) == shard_id for id in ids)
+    for user in User.query.all():
+        post = Post.query.filter_by(user_id=user.id).one()
+        assert router.shard_for_id(post.id) == router.shard_for_id(user.id)
+        assert post.id in posts[router.shard_for_id(user.id)]
+    # La base principale garde les tables globales
+    assert Category.query.count() == 1
+    with router.engine('global').connect() as conn:
+        assert conn.execute(select(func.count()).select_from(User.__table__)).scalar() == 0
+
+
+def test_lookup_by_id_reads_one_shard(app, client, admin_headers, statements):
+    router = app.extensions['shards']
+    post = Post.query.first()
+    db.session.remove()
+    statements.clear()
+    response = client.get(f'/posts/{post.id}', headers=admin_headers)
+    assert response.json['title'] == post.title
+    assert statements == {router.shard_for_id(post.id): ['SELECT']}
+
+
+def test_list_fans_out_and_merges_in_id_order(app, client, admin_headers, statements):
+    statements.clear()
+    response = client.get('/posts', headers=admin_headers)
+    ids = [post['id'] for post in response.json]
+    assert len(ids) == 8 and ids == sorted(ids)
+    assert sorted(statements) == app.extensions['shards'].shard_ids
+
+
+def test_register_login_and_write_through_routes(app, client):
+    body = {"username": "bob", "email": "bob@example.com", "password": "motdepasse1"}
+    user_id = client.post('/auth/register', json=body).json['id']
+    assert client.post('/auth/register', json=body).status_code == 400
+
+    token = client.post('/auth/login', json={"email": "bob@example.com", "password": "motdepasse1"}).json
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    post = client.post('/posts', json={"title": "Bonjour", "content": "Contenu du post", "user_id": user_id},
+                       headers=headers).json
+    comment = client.post('/comments', json={"content": "Premier !", "user_id": user_id, "post_id": post['id']},
+                          headers=headers).json
+
+    router = app.extensions['shards']
+    assert router.shard_for_id(post['id']) == router.shard_for_id(comment['id']) == router.shard_for_id(user_id)
+    response = client.patch(f"/posts/{post['id']}", json={"title": "Modifié"}, headers={**headers, 'If-Match': '"1"'})
+    assert response.json['title'] == "Modifié"
+    assert client.delete(f"/comments/{comment['id']}", headers=headers).status_code == 204
+    assert client.get(f"/comments/{comment['id']}", headers=headers).status_code == 404
+
+
+def test_shard_schema_keeps_only_local_foreign_keys():
+    tables = shard_metadata().tables
+    assert {fk.target_fullname for fk in tables['post'].foreign_keys} == {'user.id'}
+    assert {fk.target_fullname for fk in tables['comment'].foreign_keys} == {'user.id'}
+    assert 'category' not in tables
+
+
+def test_plan_rebalance_moves_fewest_slots():
+    assignment = ['a', 'b', 'c'] * 4
+    moves = plan_rebalance(assignment, ['a', 'b', 'c', 'd'])
+    assert len(moves) == 3
+    assert all(target == 'd' for _, _, target in moves)
+    assert {source for _, source, _ in moves} == {'a', 'b', 'c'}
+    assert plan_rebalance(assignment, ['a', 'b', 'c']) == []
+    with pytest.raises(ValueError):
+        plan_rebalance(assignment, ['a', 'b'])
+
+
+def test_rebalance_onto_new_shard(app, tmp_path):
+    titles = sorted(post.title for post in Post.query.all())
+    db.session.remove()
+
+    bigger = make_app(tmp_path, 4)
+    with bigger.app_context():
+        runner = bigger.test_cli_runner()
+        runner.invoke(args=['shards', 'init'])
+        result = runner.invoke(args=['shards', 'rebalance', '--grace', '0'])
+        assert "3 slots déplacés" in result.output
+
+        router = bigger.extensions['shards']
+        assert sorted(ShardSlot.query.with_entities(ShardSlot.shard).distinct().all()) == [
+            ('shard0',), ('shard1',), ('shard2',), ('shard3',)]
+        for model in (User, Post):
+            placed = rows_by_shard(router, model)
+            assert sum(len(ids) for ids in placed.values()) == 8
+            for shard_id, ids in placed.items():
+                assert all(router.shard_for_id(id) == shard_id for id in ids)
+        assert sorted(post['title'] for post in bigger.test_client().get(
+            '/posts', headers={"Authorization": f"Bearer {create_access_token(identity=1)}"}).json) == titles
+        assert "déjà équilibrés" in runner.invoke(args=['shards', 'rebalance']).output
+
+
+@pytest.fixture
+def activity(app):
+    # Commentaires croisés entre utilisateurs de shards différents, dates et catégories variées
+    users = User.query.order_by(User.id).all()
+    posts = {post.user_id: post for post in Post.query.all()}
+    category = Category.query.one()
+    start = datetime.datetime(2024, 1, 1)
+    for index, user in enumerate(users):
+        post = posts[user.id]
+        post.date_posted = start + datetime.timedelta(days=index % 3)
+        post.category_id = category.id if index % 2 else None
+        for count in range(index % 4):
+            target = posts[users[(index + count + 1) % len(users)].id]
+            db.session.add(Comment(content="Bien vu", user_id=user.id, post_id=target.id))
+    db.session.commit()
+    return users, posts
+
+
+def test_stats_merge_partial_aggregates_across_shards(app, client, admin_headers, activity):
+    users, posts = activity
+    comments = Comment.query.all()
+
+    by_category = client.get('/stats/posts-per-category', headers=admin_headers).json
+    assert by_category == [{'category_id': None, 'name': None, 'count': 4},
+                           {'category_id': Category.query.one().id, 'name': "Technologie", 'count': 4}]
+
+    by_day = client.get('/stats/posts-per-period?bucket=day', headers=admin_headers).json
+    assert by_day == [{'period': '2024-01-01', 'count': 3}, {'period': '2024-01-02', 'count': 3},
+                      {'period': '2024-01-03', 'count': 2}]
+
+    expected = sorted(((-sum(c.user_id == user.id for c in comments), user.id) for user in users))
+    top = client.get('/stats/top-commenters?limit=3', headers=admin_headers).json
+    assert [(-row['count'], row['user_id']) for row in top] == expected[:3]
+
+    expected = sorted((-sum(c.post_id == post.id for c in comments), post.id) for post in posts.values())
+    most = client.get('/stats/comments-per-post?limit=8', headers=admin_headers).json
+    assert [(-row['count'], row['post_id']) for row in most] == expected
+    titles = {post.id: post.title for post in posts.values()}
+    assert all(row['title'] == titles[row['post_id']] for row in most)
+
+
+def test_purge_runs_on_every_shard(app, activity):
+    router = app.extensions['shards']
+    users, posts = activity
+    victim, victim_post = users[0].id, posts[users[0].id].id
+    # Publication supprimée seule, encore commentée depuis un autre shard : conservée
+    kept = posts[users[1].id].id
+    commenter = Comment.query.filter_by(post_id=kept).first().user_id
+    assert router.shard_for_id(commenter) != router.shard_for_id(kept)
+    soft_delete(users[0])
+    db.session.execute(update(Post).where(Post.id == kept).values(deleted_at=datetime.datetime.now()))
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['purge', 'deleted', '--older-than', '-1', '--pause', '0'])
+    assert "user : 1 lignes purgées" in result.output
+    remaining = {name: rows_by_shard(router, model) for name, model in (('user', User), ('post', Post))}
+    assert victim not in sum(remaining['user'].values(), [])
+    assert victim_post not in sum(remaining['post'].values(), [])
+    assert kept in sum(remaining['post'].values(), [])
+    # Email et nom libérés avec l'utilisateur
+    assert UserIdentity.query.filter_by(user_id=victim).count() == 0
+
+
+def test_partition_retention_deletes_on_every_shard(app, activity):
+    router = app.extensions['shards']
+    old = datetime.datetime.now() - datetime.timedelta(days=400)
+    # Un commentaire ancien par shard
+    first = {}
+    for comment in Comment.query.all():
+        first.setdefault(router.shard_for_id(comment.id), comment.id)
+    assert len(first) > 1
+    db.session.execute(update(Comment).where(Comment.id.in_(list(first.values()))).values(date_commented=old))
+    db.session.commit()
+    before = len(Comment.query.all())
+    recent = old + datetime.timedelta(days=1)
+
+    result = app.test_cli_runner().invoke(args=['partitions', 'maintain', '--retention', '6'])
+    assert "table répartie entre les shards" in result.output
+    db.session.remove()
+    assert len(Comment.query.all()) == before - len(first)
+    assert Comment.query.filter(Comment.date_commented < recent).all() == []
+
+
+def test_export_import_round_trip_between_sharded_deployments(app, activity, tmp_path):
+    router = app.extensions['shards']
+    placed = {model: rows_by_shard(router, model) for model in (User, Post, Comment)}
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['data', 'export', str(tmp_path / 'export'), '--chunk-size', '3'])
+    assert "comment : " in result.output and "user : 8 lignes" in result.output
+    db.session.remove()
+
+    (tmp_path / 'copy').mkdir()
+    copy = make_app(tmp_path / 'copy', 3)
+    with copy.app_context():
+        db.create_all()
+        runner = copy.test_cli_runner()
+        runner.invoke(args=['shards', 'init'])
+        assert "post : 8 lignes importées" in runner.invoke(args=['data', 'import', str(tmp_path / 'export')]).output
+        copied = copy.extensions['shards']
+        for model, shards in placed.items():
+            assert rows_by_shard(copied, model) == shards
+        # Séquences avancées : un nouvel utilisateur ne réutilise pas d'identifiant importé
+        user = User(username="nouveau", email="nouveau@example.com", password="x")
+        db.session.add(user)
+        db.session.commit()
+        assert user.id not in sum(placed[User].values(), [])
+        db.session.remove()
+
+
+def test_batch_transaction_refused_with_shards(app, client, admin_headers):
+    response = client.post('/batch', json={"transaction": True, "requests": [
+        {"method": "GET", "path": "/posts"}]}, headers=admin_headers)
+    assert response.status_code == 400
+    assert "SHARD_URIS" in response.json['msg']
+
+
+def test_writes_to_moving_slot_wait_for_rebalance(app, client, admin_headers):
+    router = app.extensions['shards']
+    posts = Post.query.order_by(Post.id).all()
+    frozen = posts[0]
+    other = next(post for post in posts if post.id % router.slots != frozen.id % router.slots)
+    db.session.remove()
+    router.freeze_slots([frozen.id % router.slots])
+
+    headers = {**admin_headers, 'If-Match': '"1"'}
+    response = client.patch(f'/posts/{frozen.id}', json={"title": "Gelé"}, headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(router.map_ttl)
+    assert client.get(f'/posts/{frozen.id}', headers=admin_headers).status_code == 200
+    assert client.patch(f'/posts/{other.id}', json={"title": "Libre"}, headers=headers).status_code == 200
+
+    # Sans déplacement à faire, la commande dégèle les restes d'une exécution interrompue
+    assert "déjà équilibrés" in app.test_cli_runner().invoke(args=['shards', 'rebalance', '--grace', '0']).output
+    assert client.patch(f'/posts/{frozen.id}', json={"title": "Dégelé"}, headers=headers).status_code == 200
+
+
+def test_identities_reserved_on_main_database(app, client):
+    # Utilisateurs du jeu de données créés sans passer par /auth/register
+    assert "16 identités réservées" in app.test_cli_runner().invoke(args=['shards', 'init']).output
+    db.session.add(UserIdentity(kind='email', value="bob@example.com", user_id=None))
+    db.session.commit()
+    body = {"username": "bob", "email": "bob@example.com", "password": "motdepasse1"}
+    response = client.post('/auth/register', json=body)
+    assert response.status_code == 400 and response.json['msg'] == "Email déjà utilisé"
+    assert UserIdentity.query.filter_by(kind='username', value="bob").count() == 0
+
+    user_id = client.post('/auth/register', json={**body, "email": "bobby@example.com"}).json['id']
+    headers = {"Authorization": f"Bearer {create_access_token(identity=user_id)}", 'If-Match': '"1"'}
+    response = client.patch(f'/users/{user_id}', json={"email": "user1@example.com"}, headers=headers)
+    assert response.status_code == 400 and response.json['msg'] == "Email déjà utilisé"
+
+    response = client.patch(f'/users/{user_id}', json={"email": "robert@example.com"}, headers=headers)
+    assert response.status_code == 200
+    emails = UserIdentity.query.filter_by(kind='email', user_id=user_id).with_entities(UserIdentity.value).all()
+    assert emails == [("robert@example.com",)]
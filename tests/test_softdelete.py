@@ -0,0 +1,138 @@
+import datetime
+
+import pytest
+from sqlalchemy import select, text
+from app import db
+from app.models import User, Post, Comment
+from app.softdelete import purge_deleted
+
+
+@pytest.fixture
+def app(app):
+    db.session.add(User(username="alice", email="alice@example.com", password="x"))
+    db.session.flush()
+    db.session.add_all([
+        Post(title="Premier", content="Contenu du post", user_id=1),
+        Post(title="Deuxième", content="Contenu du post", user_id=1),
+    ])
+    db.session.flush()
+    db.session.add_all([
+        Comment(content="Bravo", user_id=1, post_id=1),
+        Comment(content="Merci", user_id=1, post_id=2),
+    ])
+    db.session.commit()
+    return app
+
+
+def all_rows(model):
+    return db.session.scalars(select(model).execution_options(include_deleted=True)).all()
+
+
+def test_deleted_post_is_hidden_everywhere(client, auth_headers):
+    assert client.delete('/posts/1', headers=auth_headers).status_code == 204
+    db.session.remove()
+
+    assert client.get('/posts/1', headers=auth_headers).status_code == 404
+    assert [p['id'] for p in client.get('/posts', headers=auth_headers).json] == [2]
+    assert client.get('/posts?ids=1,2', headers=auth_headers).json['missing'] == [1]
+    # Les commentaires de la publication sont masqués avec elle
+    assert [c['id'] for c in client.get('/comments', headers=auth_headers).json] == [2]
+    response = client.patch('/posts/1', json={"title": "Retour"}, headers={**auth_headers, 'If-Match': '"2"'})
+    assert response.status_code == 404
+    assert client.delete('/posts/1', headers=auth_headers).status_code == 404
+
+    # Les lignes restent en base jusqu'à la purge
+    assert [p.deleted_at is not None for p in all_rows(Post)] == [True, False]
+    assert [c.deleted_at is not None for c in all_rows(Comment)] == [True, False]
+
+
+def test_relationships_hide_deleted_rows(app):
+    comment = db.session.get(Comment, 1)
+    comment.deleted_at = datetime.datetime.now()
+    db.session.commit()
+    db.session.expunge_all()
+    assert [c.id for c in db.session.get(Post, 1).comments] == []
+
+
+def test_hard_delete_when_disabled(app, client, auth_headers):
+    app.config['SOFT_DELETE_ENABLED'] = False
+    assert client.delete('/comments/1', headers=auth_headers).status_code == 204
+    db.session.remove()
+    assert [c.id for c in all_rows(Comment)] == [2]
+
+
+def test_purge_removes_old_deleted_rows_in_batches(app):
+    old = datetime.datetime.now() - datetime.timedelta(days=40)
+    for post in all_rows(Post):
+        post.deleted_at = old
+    db.session.get(Comment, 1).deleted_at = old
+    db.session.commit()
+
+    purged = purge_deleted(datetime.datetime.now() - datetime.timedelta(days=30), batch_size=1)
+    # Le post 2 a encore un commentaire actif : il n'est pas purgé
+    assert purged == {'comment': 1, 'post': 1, 'user': 0}
+    db.session.remove()
+    assert [p.id for p in all_rows(Post)] == [2]
+    assert [c.id for c in all_rows(Comment)] == [2]
+
+
+def test_purge_command_respects_retention(app):
+    db.session.get(Comment, 1).deleted_at = datetime.datetime.now()
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=['purge', 'deleted', '--pause', '0'])
+    assert "comment : 0 lignes purgées" in result.output
+    result = app.test_cli_runner().invoke(args=['purge', 'deleted', '--older-than', '0', '--pause', '0'])
+    assert "comment : 1 lignes purgées" in result.output
+
+
+def test_partial_indexes_on_active_rows(app):
+    sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'ix_post_active_date_posted'")).scalar()
+    assert sql.endswith("WHERE deleted_at IS NULL")
+    # Pas d'index complet en double sur les mêmes colonnes
+    names = db.session.execute(text("SELECT name FROM sqlite_master WHERE tbl_name = 'post' AND type = 'index'"))
+    assert {'ix_post_date_posted', 'ix_post_user_id'}.isdisjoint(names.scalars())
+
+
+def test_deleted_user_hides_posts_and_comments(client, auth_headers):
+    db.session.add(User(username="bob", email="bob@example.com", password="x"))
+    db.session.flush()
+    db.session.add(Post(title="Chez Bob", content="Contenu du post", user_id=2))
+    db.session.flush()
+    db.session.add_all([
+        Comment(content="Bob chez Alice", user_id=2, post_id=1),
+        Comment(content="Alice chez Bob", user_id=1, post_id=3),
+        Comment(content="Bob chez Bob", user_id=2, post_id=3),
+    ])
+    db.session.commit()
+
+    assert client.delete('/users/1', headers=auth_headers).status_code == 204
+    db.session.remove()
+    assert [p['id'] for p in client.get('/posts', headers=auth_headers).json] == [3]
+    # Commentaires d'Alice et commentaires sous ses publications
+    assert [c['content'] for c in client.get('/comments', headers=auth_headers).json] == ["Bob chez Bob"]
+
+
+def test_register_with_deleted_email_is_rejected(client, auth_headers):
+    assert client.delete('/users/1', headers=auth_headers).status_code == 204
+    body = {"username": "alice2", "email": "alice@example.com", "password": "motdepasse1"}
+    response = client.post('/auth/register', json=body)
+    assert response.status_code == 400
+    assert response.json == {"msg": "Email déjà utilisé"}
+    response = client.post('/auth/register', json={**body, "email": "alice2@example.com", "username": "alice"})
+    assert response.status_code == 400
+
+
+def test_no_new_rows_under_deleted_parents(client, auth_headers):
+    assert client.delete('/posts/1', headers=auth_headers).status_code == 204
+    db.session.remove()
+
+    response = client.post('/comments', json={"content": "Encore là ?", "user_id": 1, "post_id": 1},
+                           headers=auth_headers)
+    assert response.status_code == 400 and response.json['msg'] == "Publication introuvable"
+    response = client.patch('/comments/2', json={"post_id": 1}, headers={**auth_headers, 'If-Match': '"1"'})
+    assert response.status_code == 400
+    response = client.post('/posts', json={"title": "Nouveau", "content": "Contenu du post", "user_id": 1,
+                                           "category_id": 7}, headers=auth_headers)
+    assert response.status_code == 400 and response.json['msg'] == "Catégorie introuvable"
+    # Aucun enfant actif ne retient la publication supprimée : elle reste purgeable
+    assert [c.post_id for c in all_rows(Comment) if c.deleted_at is None] == [2]
@@ -0,0 +1,70 @@
+import os
+import re
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget d'import (ms) pour create_app() en mode démarrage optimisé
+IMPORT_BUDGET_MS = int(os.getenv("STARTUP_IMPORT_BUDGET_MS", 1500))
+
+# Modules qui ne doivent pas être chargés au démarrage d'un worker
+DEFERRED_MODULES = ('flasgger', 'flask_migrate', 'alembic', 'dotenv')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def run_importtime():
+    """
+    Lance create_app() dans un nouvel interpréteur avec `python -X importtime`
+    et retourne la liste des modules importés avec leur temps cumulé (µs).
+    """
+    env = dict(os.environ,
+               STARTUP_OPTIMIZED='true',
+               DOCS_ENABLED='false',
+               SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+            modules.append((name, cumulative, indent == 1))
+    return modules
+
+
+def test_startup_import_budget():
+    modules = run_importtime()
+    names = {name.split('.')[0] for name, _, _ in modules}
+    for module in DEFERRED_MODULES:
+        assert module not in names, f"{module} est importé au démarrage"
+
+    total_ms = sum(cumulative for _, cumulative, top_level in modules if top_level) / 1000
+    assert total_ms < IMPORT_BUDGET_MS, f"imports au démarrage : {total_ms:.0f} ms"
+
+
+@pytest.mark.parametrize('app_config', [{'STARTUP_OPTIMIZED': True}])
+def test_swagger_spec_loaded_lazily(app):
+    assert app.swag.template is None
+    assert app.extensions['compression'] == {}
+
+    response = app.test_client().get('/apispec.json')
+    assert response.status_code == 200
+    assert response.json['info']['title'] == "API de Blog avec Authentification"
+    assert app.swag.template is not None
+    assert 'flasgger.apispec' in app.extensions['compression']
+
+
+@pytest.mark.parametrize('app_config', [{'DOCS_ENABLED': False}])
+def test_docs_disabled(app):
+    assert 'flasgger' not in app.blueprints
+
+    client = app.test_client()
+    assert client.get('/apispec.json').status_code == 404
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Aller vers Swagger' not in response.data
@@ -0,0 +1,112 @@
+import datetime
+import pytest
+from app import db
+from app.models import User, Post, Comment, Category, StatsRollup
+from app.stats import TTLCache, refresh_rollups
+
+
+@pytest.fixture
+def app(app):
+    seed()
+    return app
+
+
+def seed():
+    alice = User(username="alice", email="alice@example.com", password="x")
+    bob = User(username="bob", email="bob@example.com", password="x")
+    tech = Category(name="Technologie")
+    db.session.add_all([alice, bob, tech])
+    db.session.flush()
+
+    dates = [datetime.datetime(2024, 10, 7, 9), datetime.datetime(2024, 10, 7, 18),
+             datetime.datetime(2024, 10, 9, 12), datetime.datetime(2024, 11, 2, 8)]
+    posts = [Post(title=f"Post {i}", content="Contenu de test", date_posted=date, user_id=alice.id,
+                  category_id=tech.id if i < 3 else None)
+             for i, date in enumerate(dates)]
+    db.session.add_all(posts)
+    db.session.flush()
+
+    db.session.add_all(
+        [Comment(content="Bravo !", user_id=bob.id, post_id=posts[0].id) for _ in range(3)]
+        + [Comment(content="Merci !", user_id=alice.id, post_id=posts[1].id)]
+    )
+    db.session.commit()
+
+
+def test_posts_per_category(client, auth_headers):
+    response = client.get('/stats/posts-per-category', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json == [
+        {'category_id': 1, 'name': 'Technologie', 'count': 3},
+        {'category_id': None, 'name': None, 'count': 1},
+    ]
+
+
+def test_posts_per_period(client, auth_headers):
+    response = client.get('/stats/posts-per-period', headers=auth_headers)
+    assert response.json == [
+        {'period': '2024-10-07', 'count': 2},
+        {'period': '2024-10-09', 'count': 1},
+        {'period': '2024-11-02', 'count': 1},
+    ]
+
+    response = client.get('/stats/posts-per-period?bucket=week&until=2024-11-01', headers=auth_headers)
+    assert response.json == [{'period': '2024-10-07', 'count': 3}]
+
+    response = client.get('/stats/posts-per-period?bucket=month&since=2024-11-01', headers=auth_headers)
+    assert response.json == [{'period': '2024-11-01', 'count': 1}]
+
+    assert client.get('/stats/posts-per-period?bucket=year', headers=auth_headers).status_code == 400
+    assert client.get('/stats/posts-per-period?since=hier', headers=auth_headers).status_code == 400
+
+
+def test_top_commenters_and_comments_per_post(client, auth_headers):
+    response = client.get('/stats/top-commenters?limit=1', headers=auth_headers)
+    assert response.json == [{'user_id': 2, 'username': 'bob', 'count': 3}]
+
+    response = client.get('/stats/comments-per-post?limit=2', headers=auth_headers)
+    assert [row['count'] for row in response.json] == [3, 1]
+    assert client.get('/stats/comments-per-post?limit=0', headers=auth_headers).status_code == 400
+
+
+def test_results_are_cached(client, auth_headers):
+    first = client.get('/stats/top-commenters', headers=auth_headers)
+    assert first.headers['X-Stats-Source'] == 'live'
+
+    db.session.add(Comment(content="Encore", user_id=1, post_id=1))
+    db.session.commit()
+    second = client.get('/stats/top-commenters', headers=auth_headers)
+    assert second.headers['X-Stats-Source'] == 'cache'
+    assert second.json == first.json
+
+
+def test_served_from_rollup(app, client, auth_headers):
+    app.config['STATS_USE_ROLLUP'] = True
+    assert refresh_rollups() == 4
+    assert db.session.query(StatsRollup).count() == 4
+
+    response = client.get('/stats/posts-per-category', headers=auth_headers)
+    assert response.headers['X-Stats-Source'] == 'rollup'
+    assert response.json[0]['count'] == 3
+
+    # Paramètres non précalculés : calcul en direct
+    response = client.get('/stats/top-commenters?limit=1', headers=auth_headers)
+    assert response.headers['X-Stats-Source'] == 'live'
+
+
+def test_ttl_cache_is_bounded():
+    now = [0]
+    cache = TTLCache(ttl=10, max_size=2, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    # 'b' est la moins récemment lue
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+    now[0] = 20
+    cache.set('d', 4)
+    # Au-delà de la borne, éviction en tête ; les entrées expirées disparaissent à la lecture
+    assert len(cache) == 2
+    assert (cache.get('c'), cache.get('d')) == (None, 4)
+    assert len(cache) == 1
@@ -0,0 +1,43 @@
+import pytest
+from app import create_app, db
+from app.warmup import warmup, prime_connection_pool
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Application sur une base SQLite fichier (QueuePool, comme en production).
+    """
+    return create_app({
+        'TESTING': True,
+        'STARTUP_OPTIMIZED': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'warmup.db'}",
+    })
+
+
+def test_warmup_precompiles_without_connecting(app):
+    warmup(app)
+
+    assert any(key[1] == 'index.html' for key in app.jinja_env.cache)
+    assert 'api.accueil' in app.extensions['compression']
+    with app.app_context():
+        assert db.engine.pool.checkedout() == 0
+        assert db.engine.pool.checkedin() == 0
+
+
+def test_prime_connection_pool(app):
+    assert prime_connection_pool(app, size=3) == 3
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 3
+        assert db.engine.pool.checkedout() == 0
+
+
+def test_prime_connection_pool_with_shards(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'global.db'}",
+        'SHARD_URIS': [f"sqlite:///{tmp_path / f'shard{index}.db'}" for index in range(2)],
+    })
+    assert prime_connection_pool(app, size=2) == 6
+    for engine in app.extensions['shards'].engines.values():
+        assert engine.pool.checkedin() == 2